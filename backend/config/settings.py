@@ -3,6 +3,7 @@ from datetime import timedelta
 from pathlib import Path
 
 from django.core.exceptions import ImproperlyConfigured
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -121,6 +122,13 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Exam PDF delivery. 'django' streams the file from the worker (with Range
+# support); 'x-accel' (Nginx) and 'x-sendfile' (Apache/Caddy) only run the
+# permission checks and let the front proxy send the bytes. For 'x-accel',
+# PDF_ACCEL_PREFIX must be an `internal` location aliased to MEDIA_ROOT.
+PDF_DELIVERY = os.environ.get('PDF_DELIVERY', 'django').lower()
+PDF_ACCEL_PREFIX = os.environ.get('PDF_ACCEL_PREFIX', '/protected-media/')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # CORS
@@ -129,6 +137,9 @@ CORS_ALLOWED_ORIGINS = [
 ]
 if DEBUG and not CORS_ALLOWED_ORIGINS:
     CORS_ALLOW_ALL_ORIGINS = True
+# pdf.js loads exam PDFs cross-origin with Range requests
+CORS_ALLOW_HEADERS = (*default_headers, 'range')
+CORS_EXPOSE_HEADERS = ['Accept-Ranges', 'Content-Range', 'Content-Length']
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -160,6 +171,13 @@ TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHANNEL_ID = os.environ.get('TELEGRAM_CHANNEL_ID')
 TELEGRAM_WEBAPP_URL = os.environ.get('TELEGRAM_WEBAPP_URL', 'https://math.xlog.uz')
 TELEGRAM_WEBHOOK_SECRET = os.environ.get('TELEGRAM_WEBHOOK_SECRET', '')
+# Route the webhook to the native async view; enable when serving through config/asgi.py
+TELEGRAM_WEBHOOK_ASYNC = os.environ.get('TELEGRAM_WEBHOOK_ASYNC', 'False').lower() in ('true', '1', 'yes')
+
+# New-exam DM broadcast; the rate stays below Telegram's ~30 messages/s per bot
+TELEGRAM_BROADCAST_RATE = float(os.environ.get('TELEGRAM_BROADCAST_RATE', '25'))
+TELEGRAM_BROADCAST_CONCURRENCY = int(os.environ.get('TELEGRAM_BROADCAST_CONCURRENCY', '20'))
+TELEGRAM_BROADCAST_CHUNK_SIZE = int(os.environ.get('TELEGRAM_BROADCAST_CHUNK_SIZE', '500'))
 
 _redis_host = os.environ.get('REDIS_HOST', 'localhost')
 _redis_port = os.environ.get('REDIS_PORT', '6379')
@@ -171,11 +189,30 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Also schedule a per-session auto-submit task at its deadline (ETA) when the
+# exam starts; the beat sweep below stays on as the safety net.
+AUTO_SUBMIT_ETA_TASKS = os.environ.get('AUTO_SUBMIT_ETA_TASKS', 'False').lower() in ('true', '1', 'yes')
+
+# Sessions per auto_submit_chunk task when many expire at once (window close)
+AUTO_SUBMIT_CHUNK_SIZE = int(os.environ.get('AUTO_SUBMIT_CHUNK_SIZE', '25'))
+
 CELERY_BEAT_SCHEDULE = {
     'auto-submit-expired-sessions': {
         'task': 'exams.tasks.auto_submit_expired_sessions',
         'schedule': 60.0,
     },
+    'flush-answer-buffers': {
+        'task': 'exams.tasks.flush_answer_buffers',
+        'schedule': 15.0,
+    },
+    'requeue-unprocessed-submissions': {
+        'task': 'exams.tasks.requeue_unprocessed_submissions',
+        'schedule': 300.0,
+    },
+    'process-telegram-updates': {
+        'task': 'exams.tasks.process_telegram_updates',
+        'schedule': 30.0,
+    },
 }
 
 # Cache
@@ -186,6 +223,25 @@ CACHES = {
     }
 }
 
+# Write-behind answer buffer: save_answer writes to a per-session Redis hash
+# (same Redis as the cache) and answers are flushed to Postgres in bulk.
+ANSWER_BUFFER_ENABLED = os.environ.get('ANSWER_BUFFER_ENABLED', 'False').lower() in ('true', '1', 'yes')
+ANSWER_BUFFER_REDIS_URL = CACHES['default']['LOCATION']
+
+# Telegram webhook updates are queued in Redis and answered by Celery in batches
+TELEGRAM_UPDATE_QUEUE_REDIS_URL = CACHES['default']['LOCATION']
+TELEGRAM_UPDATE_BATCH_SIZE = int(os.environ.get('TELEGRAM_UPDATE_BATCH_SIZE', '100'))
+TELEGRAM_UPDATE_BATCH_DELAY = int(os.environ.get('TELEGRAM_UPDATE_BATCH_DELAY', '1'))  # Seconds
+
+# Authenticated Student lookups: per-process LRU in front of the Redis copy.
+# Name changes reach other workers within the TTL (seconds).
+STUDENT_AUTH_LOCAL_CACHE_SIZE = int(os.environ.get('STUDENT_AUTH_LOCAL_CACHE_SIZE', '4096'))
+STUDENT_AUTH_LOCAL_CACHE_TTL = int(os.environ.get('STUDENT_AUTH_LOCAL_CACHE_TTL', '30'))
+
+# Leaderboard rankings kept in Redis sorted sets (rebuild with rebuild_leaderboard)
+LEADERBOARD_REDIS_ENABLED = os.environ.get('LEADERBOARD_REDIS_ENABLED', 'False').lower() in ('true', '1', 'yes')
+LEADERBOARD_REDIS_URL = CACHES['default']['LOCATION']
+
 # Security headers for production
 if not DEBUG:
     SECURE_BROWSER_XSS_FILTER = True
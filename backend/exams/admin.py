@@ -1,8 +1,14 @@
 from django.contrib import admin
+from django.db import transaction
+
+from . import question_sampler
+from .dashboard_views import invalidate_upcoming_exam
+from .permissions import invalidate_student_auth
+from .results_cache import invalidate_exam
 from .models import (
-    MockExam, CorrectAnswer, Student, ExamSession, StudentAnswer,
-    StudentRating, EloHistory, ItemDifficulty, Question, PracticeSession,
-    Achievement, StudentAchievement, StudentStreak,
+    MockExam, ExamPdfPage, CorrectAnswer, Student, ExamSession, StudentAnswer,
+    StudentRating, EloHistory, ItemDifficulty, ScoreConversion, ExamScoreAggregate, Question, PracticeSession,
+    Achievement, StudentAchievement, StudentStreak, BroadcastDelivery,
 )
 
 
@@ -10,6 +16,21 @@ from .models import (
 class MockExamAdmin(admin.ModelAdmin):
     list_display = ['title', 'scheduled_start', 'scheduled_end', 'created_at']
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_upcoming_exam()
+        if 'pdf_file' in form.changed_data:
+            from .tasks import prepare_exam_pdf
+            transaction.on_commit(lambda: prepare_exam_pdf.delay(str(obj.id)))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_upcoming_exam()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_upcoming_exam()
+
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
@@ -21,14 +42,61 @@ class QuestionAdmin(admin.ModelAdmin):
         return obj.text[:80]
     text_short.short_description = 'Savol'
 
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        question_sampler.invalidate()  # Bulk delete skips Question.delete()
+
+
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_student_auth(obj.id)
+
+    def delete_model(self, request, obj):
+        student_id = obj.id
+        super().delete_model(request, obj)
+        invalidate_student_auth(student_id)
+
+    def delete_queryset(self, request, queryset):
+        student_ids = list(queryset.values_list('id', flat=True))
+        super().delete_queryset(request, queryset)
+        for student_id in student_ids:
+            invalidate_student_auth(student_id)
+
+
+@admin.register(CorrectAnswer)
+class CorrectAnswerAdmin(admin.ModelAdmin):
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        invalidate_exam(obj.exam_id)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_exam(obj.exam_id)
+
+    def delete_queryset(self, request, queryset):
+        exam_ids = set(queryset.values_list('exam_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for exam_id in exam_ids:
+            invalidate_exam(exam_id)
+
+
+@admin.register(BroadcastDelivery)
+class BroadcastDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['broadcast', 'telegram_id', 'status', 'attempts', 'created_at']
+    list_filter = ['status']
+    search_fields = ['broadcast']
+
 
-admin.site.register(CorrectAnswer)
-admin.site.register(Student)
 admin.site.register(ExamSession)
 admin.site.register(StudentAnswer)
 admin.site.register(StudentRating)
 admin.site.register(EloHistory)
 admin.site.register(ItemDifficulty)
+admin.site.register(ExamPdfPage)
+admin.site.register(ScoreConversion)
+admin.site.register(ExamScoreAggregate)
 admin.site.register(PracticeSession)
 admin.site.register(Achievement)
 admin.site.register(StudentAchievement)
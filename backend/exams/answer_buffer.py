@@ -0,0 +1,219 @@
+"""
+Write-behind buffer for live exam answers.
+
+When ANSWER_BUFFER_ENABLED is set, save_answer writes each answer into a
+per-session Redis hash and returns immediately instead of locking the
+ExamSession row. Buffered answers reach StudentAnswer in bulk from the
+periodic flush_answer_buffers task, and always inside _submit_session
+before grading, so submission grades exactly what the student saved.
+
+A flush reads the hash but removes the flushed fields only in
+transaction.on_commit, and only if they were not overwritten meanwhile, so
+a rolled-back flush leaves the buffer intact. Submission first closes the
+buffer: buffer_answers() then returns False and the caller falls back to
+the locked path, which waits for the submit and rejects the answer, instead
+of reporting it saved and dropping it.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+PENDING_SESSIONS_KEY = 'answer_buffer:pending'
+BUFFER_TTL_SECONDS = 24 * 60 * 60  # Safety net; buffers are normally drained within seconds
+
+_client = None
+
+
+def is_enabled():
+    return getattr(settings, 'ANSWER_BUFFER_ENABLED', False)
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.ANSWER_BUFFER_REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _buffer_key(session_id):
+    return f'answer_buffer:{session_id}'
+
+
+def _closed_key(session_id):
+    return f'answer_buffer:closed:{session_id}'
+
+
+def _field(question_number, sub_part):
+    return f'{question_number}:{sub_part or ""}'
+
+
+def _parse_field(field):
+    question_number, sub_part = field.split(':', 1)
+    return int(question_number), sub_part or None
+
+
+def buffer_answer(session_id, question_number, sub_part, answer):
+    """Record an answer in the session's hash (latest write per question wins)."""
+    return buffer_answers(session_id, {(question_number, sub_part): answer})
+
+
+def buffer_answers(session_id, answers):
+    """Record {(question_number, sub_part): answer} in one round-trip.
+
+    Returns False without writing if the buffer was closed for submission.
+    """
+    import redis
+
+    key = _buffer_key(session_id)
+    closed_key = _closed_key(session_id)
+    with _get_client().pipeline() as pipe:
+        while True:
+            try:
+                # A close() between the check and EXEC aborts the write
+                pipe.watch(closed_key)
+                if pipe.exists(closed_key):
+                    return False
+                pipe.multi()
+                pipe.hset(key, mapping={
+                    _field(question_number, sub_part): answer
+                    for (question_number, sub_part), answer in answers.items()
+                })
+                pipe.expire(key, BUFFER_TTL_SECONDS)
+                pipe.sadd(PENDING_SESSIONS_KEY, str(session_id))
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                continue
+
+
+def close(session_id):
+    """Refuse further buffered writes for a session that is being submitted."""
+    _get_client().set(_closed_key(session_id), 1, ex=BUFFER_TTL_SECONDS)
+
+
+def pending_session_ids():
+    return list(_get_client().smembers(PENDING_SESSIONS_KEY))
+
+
+def _read(session_id):
+    return _get_client().hgetall(_buffer_key(session_id))
+
+
+def _drain(session_id):
+    """Atomically take everything buffered for a session."""
+    key = _buffer_key(session_id)
+    pipe = _get_client().pipeline()
+    pipe.hgetall(key)
+    pipe.delete(key)
+    pipe.srem(PENDING_SESSIONS_KEY, str(session_id))
+    buffered, _, _ = pipe.execute()
+    return buffered
+
+
+def _ack(session_id, flushed):
+    """Remove flushed fields that still hold the flushed value; newer writes stay buffered."""
+    import redis
+
+    key = _buffer_key(session_id)
+    with _get_client().pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                current = pipe.hgetall(key)
+                done = [field for field, answer in flushed.items() if current.get(field) == answer]
+                pipe.multi()
+                if done:
+                    pipe.hdel(key, *done)
+                if len(done) == len(current):
+                    pipe.srem(PENDING_SESSIONS_KEY, str(session_id))
+                pipe.execute()
+                return
+            except redis.WatchError:
+                continue
+
+
+def write_answers(session, answers):
+    """Upsert {(question_number, sub_part): answer} into StudentAnswer in bulk.
+
+    Expects the session row to be locked by the caller. Uses a lookup plus
+    bulk_update/bulk_create rather than ON CONFLICT because Postgres treats
+    NULL sub_part values as distinct in the unique constraint.
+    """
+    from .models import StudentAnswer
+
+    if not answers:
+        return 0
+
+    existing = {
+        (a.question_number, a.sub_part): a
+        for a in StudentAnswer.objects.filter(session=session).only(
+            'id', 'question_number', 'sub_part', 'answer',
+        )
+    }
+    to_update = []
+    to_create = []
+    for (question_number, sub_part), answer in answers.items():
+        row = existing.get((question_number, sub_part))
+        if row is None:
+            to_create.append(StudentAnswer(
+                session=session, question_number=question_number,
+                sub_part=sub_part, answer=answer,
+            ))
+        elif row.answer != answer:
+            row.answer = answer
+            to_update.append(row)
+
+    if to_update:
+        StudentAnswer.objects.bulk_update(to_update, ['answer'], batch_size=100)
+    if to_create:
+        StudentAnswer.objects.bulk_create(to_create, batch_size=100)
+    return len(answers)
+
+
+def flush_session(session, closing=False):
+    """Move a session's buffered answers into StudentAnswer.
+
+    Must run inside a transaction with the session row locked via
+    select_for_update() (as _submit_session does), so a concurrent flush
+    cannot interleave. The buffer is trimmed only after that transaction
+    commits. closing=True (submission) closes the buffer first, so no
+    answer can be buffered after this read.
+    """
+    from .models import ExamSession
+
+    if session.status == ExamSession.Status.SUBMITTED:
+        # Nothing can be buffered after close(); this only clears leftovers
+        buffered = _drain(session.id)
+        if buffered:
+            logger.warning('Discarding %d buffered answers for submitted session %s', len(buffered), session.id)
+        return 0
+
+    if closing:
+        close(session.id)
+    buffered = _read(session.id)
+    if not buffered:
+        return 0
+
+    answers = {_parse_field(field): answer for field, answer in buffered.items()}
+    written = write_answers(session, answers)
+    session_id = session.id
+    transaction.on_commit(lambda: _ack(session_id, buffered))
+    return written
+
+
+def flush_session_by_id(session_id):
+    """Lock a session and flush its buffer; used by the periodic task."""
+    from .models import ExamSession
+
+    with transaction.atomic():
+        try:
+            session = ExamSession.objects.select_for_update().get(id=session_id)
+        except ExamSession.DoesNotExist:
+            _drain(session_id)
+            return 0
+        return flush_session(session)
@@ -21,7 +21,7 @@ from rest_framework_simplejwt.utils import datetime_from_epoch
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from .models import Student
-from .permissions import StudentJWTAuthentication, IsStudent
+from .permissions import StudentJWTAuthentication, IsStudent, invalidate_student_auth
 
 logger = logging.getLogger(__name__)
 
@@ -174,6 +174,7 @@ def auth_telegram(request):
     if not created and student.full_name != full_name:
         student.full_name = full_name
         student.save(update_fields=['full_name'])
+        invalidate_student_auth(student.id)
 
     return Response(_get_tokens_for_student(student))
 
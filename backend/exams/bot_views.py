@@ -3,62 +3,156 @@ import hmac
 import json
 import logging
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-logger = logging.getLogger(__name__)
+from . import telegram_client, update_queue
 
+logger = logging.getLogger(__name__)
 
-@csrf_exempt
-@require_POST
-def telegram_webhook(request):
-    """Handle incoming Telegram Bot API webhook updates."""
+def _read_update(request):
+    """Check the webhook secret and parse the update. Returns (data, error_response)."""
     expected_secret = getattr(settings, 'TELEGRAM_WEBHOOK_SECRET', '')
     if expected_secret:
         token = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
         if not hmac.compare_digest(token, expected_secret):
-            return JsonResponse({'error': 'unauthorized'}, status=403)
+            return None, JsonResponse({'error': 'unauthorized'}, status=403)
     elif not settings.DEBUG:
         logger.error("TELEGRAM_WEBHOOK_SECRET is not set; rejecting webhook request")
-        return JsonResponse({'error': 'webhook secret not configured'}, status=500)
+        return None, JsonResponse({'error': 'webhook secret not configured'}, status=500)
 
     try:
         data = json.loads(request.body)
     except (json.JSONDecodeError, ValueError):
-        return JsonResponse({'error': 'invalid json'}, status=400)
+        return None, JsonResponse({'error': 'invalid json'}, status=400)
+    if not isinstance(data, dict) or not isinstance(data.get('update_id'), int):
+        return None, JsonResponse({'error': 'update_id required'}, status=400)
+    return data, None
 
-    message = data.get('message')
-    if message:
-        chat = message.get('chat')
-        if not chat or 'id' not in chat:
-            return JsonResponse({'ok': True})
 
-        chat_id = chat['id']
-        text = message.get('text', '')
+def _enqueue(data):
+    """Queue the update and make sure a drain task is on its way."""
+    from .tasks import process_telegram_updates
+
+    if update_queue.enqueue(data) and update_queue.claim_drain():
+        # Updates arriving within the delay are handled by the same task
+        process_telegram_updates.apply_async(countdown=settings.TELEGRAM_UPDATE_BATCH_DELAY)
 
-        if text.startswith('/start'):
-            _run_async(_send_welcome(chat_id))
-        elif text.startswith('/help'):
-            _run_async(_send_help(chat_id))
 
+@csrf_exempt
+@require_POST
+def telegram_webhook(request):
+    """Handle incoming Telegram Bot API webhook updates (queued, answered by a worker)."""
+    data, error = _read_update(request)
+    if error:
+        return error
+    _enqueue(data)
     return JsonResponse({'ok': True})
 
 
-def _run_async(coro):
-    """Run an async coroutine from sync Django context."""
-    loop = asyncio.new_event_loop()
-    try:
-        loop.run_until_complete(coro)
-    finally:
-        loop.close()
+@csrf_exempt
+@require_POST
+async def telegram_webhook_async(request):
+    """telegram_webhook as a native async view (ASGI)."""
+    data, error = _read_update(request)
+    if error:
+        return error
+    await sync_to_async(_enqueue)(data)
+    return JsonResponse({'ok': True})
+
+
+def process_updates(updates, on_handled=None):
+    """Handle a batch of queued updates: reachability in two UPDATEs, replies concurrently.
+
+    on_handled(indexes) is called as soon as updates are done with, so the caller
+    can acknowledge them one by one. Returns the indexes of updates whose reply failed.
+    """
+    from .broadcast import set_reachability
+
+    reachable = {}
+    for data in updates:
+        chat_id, is_reachable = _reachability(data)
+        if chat_id is not None:
+            reachable[chat_id] = is_reachable  # Latest update per chat wins
+    set_reachability(
+        [chat_id for chat_id, ok in reachable.items() if ok],
+        [chat_id for chat_id, ok in reachable.items() if not ok],
+    )
+
+    replies = {}
+    for index, data in enumerate(updates):
+        reply = _reply_for(data)
+        if reply:
+            replies[index] = reply
+    if on_handled:
+        on_handled([index for index in range(len(updates)) if index not in replies])
+    if not replies:
+        return []
+    return telegram_client.run(_send_replies(replies, on_handled))
+
+
+async def _send_replies(replies, on_handled):
+    """Send {index: reply} under the rate limit; returns the indexes that failed."""
+    from .broadcast import TokenBucket
+
+    # Same per-bot budget as broadcasts, so a burst of /start cannot trip flood control
+    bucket = TokenBucket(settings.TELEGRAM_BROADCAST_RATE)
+
+    async def _limited(index, reply):
+        await bucket.acquire()
+        try:
+            await reply
+        except Exception:
+            logger.exception('Failed to answer queued Telegram update')
+            return index
+        if on_handled:
+            await asyncio.to_thread(on_handled, [index])
+        return None
+
+    results = await asyncio.gather(*(_limited(index, reply) for index, reply in replies.items()))
+    return [index for index in results if index is not None]
+
+
+def _reply_for(data):
+    """Coroutine answering the update's command, or None."""
+    message = data.get('message')
+    if not message:
+        return None
+    chat = message.get('chat')
+    if not chat or 'id' not in chat:
+        return None
+
+    text = message.get('text', '')
+    if text.startswith('/start'):
+        return _send_welcome(chat['id'])
+    if text.startswith('/help'):
+        return _send_help(chat['id'])
+    return None
+
+
+def _reachability(data):
+    """(chat_id, reachable) for private-chat updates that reveal it, else (None, None)."""
+    member_update = data.get('my_chat_member')
+    if member_update and member_update.get('chat', {}).get('type') == 'private':
+        # Sent by Telegram when the user blocks ('kicked') or unblocks ('member') the bot
+        new_status = member_update.get('new_chat_member', {}).get('status')
+        if new_status in ('kicked', 'member'):
+            return member_update['chat']['id'], new_status == 'member'
+        return None, None
+
+    chat = (data.get('message') or {}).get('chat') or {}
+    if chat.get('type') == 'private' and 'id' in chat:
+        return chat['id'], True
+    return None, None
 
 
 async def _send_welcome(chat_id):
-    from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 
-    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    bot = telegram_client.get_bot()
     webapp_url = settings.TELEGRAM_WEBAPP_URL
 
     keyboard = InlineKeyboardMarkup([
@@ -87,9 +181,9 @@ async def _send_welcome(chat_id):
 
 
 async def _send_help(chat_id):
-    from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 
-    bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    bot = telegram_client.get_bot()
     webapp_url = settings.TELEGRAM_WEBAPP_URL
 
     keyboard = InlineKeyboardMarkup([
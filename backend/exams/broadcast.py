@@ -0,0 +1,202 @@
+"""
+Rate-limited Telegram broadcast to every student.
+
+Student telegram_ids are read in keyset chunks. Each chunk is sent
+concurrently (TELEGRAM_BROADCAST_CONCURRENCY) through a token bucket refilled
+at TELEGRAM_BROADCAST_RATE messages/s, below Telegram's global per-bot
+limit. Every chat receives one message, so the ~1 message/s per-chat limit
+only matters for retries. A RetryAfter (flood control) pauses the whole
+bucket for the requested time, because the limit applies to the bot.
+
+Progress is checkpointed in the cache after every chunk. A retried Celery
+task resumes after the last finished chunk instead of messaging everyone
+again; at most the interrupted chunk is repeated.
+
+Every student outcome is stored in BroadcastDelivery. Blocked and missing
+chats are also marked on the Student (telegram_unreachable_at), and later
+broadcasts skip them until the student writes to the bot again.
+"""
+
+import asyncio
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+SENT = 'sent'
+BLOCKED = 'blocked'
+CHAT_NOT_FOUND = 'chat_not_found'
+FAILED = 'failed'
+UNREACHABLE = (BLOCKED, CHAT_NOT_FOUND)  # Permanent: retrying later does not help
+
+MAX_ATTEMPTS = 3
+CHECKPOINT_TIMEOUT = 60 * 60 * 48
+
+
+class TokenBucket:
+    """Async token bucket: acquire() waits for a token; pause() stops all senders for a while."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:  # Waiters are served in order
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+def _seconds(retry_after):
+    # python-telegram-bot returns int seconds, newer versions a timedelta
+    return retry_after.total_seconds() if hasattr(retry_after, 'total_seconds') else float(retry_after)
+
+
+async def send_one(bot, bucket, chat_id, text, reply_markup=None):
+    """Send one message with retries; returns (outcome constant, attempts made)."""
+    from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        await bucket.acquire()
+        try:
+            await bot.send_message(chat_id=chat_id, text=text, parse_mode='HTML', reply_markup=reply_markup)
+            return SENT, attempt
+        except RetryAfter as e:
+            logger.warning('Telegram flood control: pausing broadcast for %ss', e.retry_after)
+            bucket.pause(_seconds(e.retry_after))
+        except Forbidden:
+            return BLOCKED, attempt  # User blocked the bot or deleted the account
+        except BadRequest as e:
+            if 'chat not found' in str(e).lower():
+                return CHAT_NOT_FOUND, attempt
+            logger.warning('DM to %s rejected: %s', chat_id, e)
+            return FAILED, attempt
+        except NetworkError as e:
+            logger.warning('DM to %s failed (attempt %d): %s', chat_id, attempt, e)
+            await asyncio.sleep(2 ** (attempt - 1))
+    return FAILED, MAX_ATTEMPTS
+
+
+async def _send_chunk(bot, bucket, chat_ids, text, reply_markup):
+    semaphore = asyncio.Semaphore(settings.TELEGRAM_BROADCAST_CONCURRENCY)
+
+    async def _bounded(chat_id):
+        async with semaphore:
+            return await send_one(bot, bucket, chat_id, text, reply_markup)
+
+    return await asyncio.gather(*(_bounded(chat_id) for chat_id in chat_ids))
+
+
+def _checkpoint_key(key):
+    return f'broadcast_checkpoint_{key}'
+
+
+def _record_chunk(key, chat_ids, results):
+    """Store the chunk's outcomes and mark permanently unreachable students."""
+    from django.utils import timezone
+    from .models import BroadcastDelivery, Student
+
+    # A resumed run repeats the interrupted chunk; keep the latest outcome
+    BroadcastDelivery.objects.bulk_create(
+        [
+            BroadcastDelivery(broadcast=key, telegram_id=chat_id, status=outcome, attempts=attempts)
+            for chat_id, (outcome, attempts) in zip(chat_ids, results)
+        ],
+        update_conflicts=True,
+        unique_fields=['broadcast', 'telegram_id'],
+        update_fields=['status', 'attempts'],
+    )
+    unreachable = [chat_id for chat_id, (outcome, _) in zip(chat_ids, results) if outcome in UNREACHABLE]
+    if unreachable:
+        Student.objects.filter(telegram_id__in=unreachable).update(telegram_unreachable_at=timezone.now())
+
+
+def set_reachability(reachable_ids, unreachable_ids):
+    """Apply chat state seen by the webhook: unblocked/active students rejoin broadcasts."""
+    from django.utils import timezone
+    from .models import Student
+
+    if reachable_ids:
+        Student.objects.filter(
+            telegram_id__in=reachable_ids, telegram_unreachable_at__isnull=False,
+        ).update(telegram_unreachable_at=None)
+    if unreachable_ids:
+        Student.objects.filter(
+            telegram_id__in=unreachable_ids, telegram_unreachable_at__isnull=True,
+        ).update(telegram_unreachable_at=timezone.now())
+
+
+def broadcast(bot, key, text, reply_markup=None, channel_id=None):
+    """Send text to the channel and every student, resuming from the checkpoint for `key`.
+
+    Sends run on the shared bot loop (telegram_client), so `bot` should be
+    telegram_client.get_bot() or a stand-in.
+
+    Returns outcome counts for the recipients handled in this run; `retried`
+    counts recipients that needed more than one attempt.
+    """
+    from .models import Student
+    from .telegram_client import run
+
+    checkpoint = cache.get(_checkpoint_key(key)) or {'channel_sent': False, 'last_telegram_id': None}
+    if checkpoint.get('done'):
+        logger.info('Broadcast %s already completed, skipping', key)
+        return {}
+    if checkpoint['last_telegram_id'] is not None:
+        logger.info('Resuming broadcast %s after telegram_id %s', key, checkpoint['last_telegram_id'])
+
+    counts = {SENT: 0, BLOCKED: 0, CHAT_NOT_FOUND: 0, FAILED: 0, 'retried': 0}
+    bucket = TokenBucket(settings.TELEGRAM_BROADCAST_RATE)
+
+    if channel_id and not checkpoint['channel_sent']:
+        outcome, _ = run(send_one(bot, bucket, channel_id, text, reply_markup))
+        if outcome != SENT:
+            logger.error('Channel notification to %s failed: %s', channel_id, outcome)
+        checkpoint['channel_sent'] = True
+        cache.set(_checkpoint_key(key), checkpoint, timeout=CHECKPOINT_TIMEOUT)
+
+    students = (
+        Student.objects.filter(telegram_unreachable_at__isnull=True)
+        .order_by('telegram_id').values_list('telegram_id', flat=True)
+    )
+    while True:
+        chunk = students
+        if checkpoint['last_telegram_id'] is not None:
+            chunk = chunk.filter(telegram_id__gt=checkpoint['last_telegram_id'])
+        chat_ids = list(chunk[:settings.TELEGRAM_BROADCAST_CHUNK_SIZE])
+        if not chat_ids:
+            break
+
+        results = run(_send_chunk(bot, bucket, chat_ids, text, reply_markup))
+        for outcome, attempts in results:
+            counts[outcome] += 1
+            if attempts > 1:
+                counts['retried'] += 1
+        _record_chunk(key, chat_ids, results)
+        checkpoint['last_telegram_id'] = chat_ids[-1]
+        cache.set(_checkpoint_key(key), checkpoint, timeout=CHECKPOINT_TIMEOUT)
+
+    checkpoint['done'] = True
+    cache.set(_checkpoint_key(key), checkpoint, timeout=CHECKPOINT_TIMEOUT)
+    logger.info('Broadcast %s finished: %s', key, counts)
+    return counts
+
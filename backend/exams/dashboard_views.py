@@ -1,22 +1,80 @@
+import base64
+import binascii
+import uuid
+from datetime import datetime
+
+from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
 
 from .models import (
-    StudentRating, StudentStreak, StudentAchievement,
-    Achievement, MockExam, ExamSession, EloHistory, StudentAnswer,
+    Student, StudentRating, StudentStreak, StudentAchievement,
+    Achievement, MockExam, ExamSession, EloHistory,
 )
 from .permissions import StudentJWTAuthentication, IsStudent
-from .scoring import compute_score
+from .scoring import stored_score
 
 student_auth = [StudentJWTAuthentication]
 student_perm = [IsStudent]
 
+DASHBOARD_CACHE_TIMEOUT = 60 * 60  # Safety net; entries are invalidated by events
+UPCOMING_EXAM_CACHE_KEY = 'dashboard_upcoming_exam'
+UPCOMING_EXAM_CACHE_TIMEOUT = 300
+HISTORY_PAGE_SIZE = 20
+
+
+def _dashboard_cache_key(student_id):
+    return f'dashboard_{student_id}'
+
+
+def _history_cache_key(student_id):
+    return f'history_first_page_{student_id}'
+
+
+def invalidate_dashboard(*student_ids):
+    """Drop cached dashboards and first history pages (after submission, calibration or new achievements)."""
+    keys = []
+    for sid in student_ids:
+        keys += [_dashboard_cache_key(sid), _history_cache_key(sid)]
+    cache.delete_many(keys)
+
+
+def invalidate_upcoming_exam():
+    """Drop the shared upcoming-exam entry (after exams are created, edited or deleted)."""
+    cache.delete(UPCOMING_EXAM_CACHE_KEY)
+
+
+def _upcoming_exam(now):
+    """Next exam that has not ended yet, shared by every student."""
+    cached = cache.get(UPCOMING_EXAM_CACHE_KEY)
+    if cached is not None and (cached['exam'] is None or cached['exam']['scheduled_end'] > now):
+        return cached['exam']
+
+    upcoming = MockExam.objects.filter(
+        scheduled_end__gt=now
+    ).order_by('scheduled_start').only('id', 'title', 'scheduled_start', 'scheduled_end').first()
+
+    exam = None
+    if upcoming:
+        exam = {
+            'id': str(upcoming.id),
+            'title': upcoming.title,
+            'scheduled_start': upcoming.scheduled_start,
+            'scheduled_end': upcoming.scheduled_end,
+        }
+    cache.set(UPCOMING_EXAM_CACHE_KEY, {'exam': exam}, timeout=UPCOMING_EXAM_CACHE_TIMEOUT)
+    return exam
+
+
+def _build_student_summary(student):
+    """Rating, streak and achievements for one student (two queries)."""
+    profile = Student.objects.select_related('rating', 'streak').get(id=student.id)
 
-def _get_dashboard_data(student):
-    """Assemble dashboard data for a student."""
     try:
-        rating = student.rating
+        rating = profile.rating
         elo = rating.elo
         rasch_scaled = rating.rasch_scaled
         exams_taken = rating.exams_taken
@@ -26,7 +84,7 @@ def _get_dashboard_data(student):
         exams_taken = 0
 
     try:
-        streak = student.streak
+        streak = profile.streak
         current_streak = streak.current_streak
         longest_streak = streak.longest_streak
     except StudentStreak.DoesNotExist:
@@ -46,25 +104,6 @@ def _get_dashboard_data(student):
         for sa in earned
     ]
 
-    now = timezone.now()
-    upcoming = MockExam.objects.filter(
-        scheduled_end__gt=now
-    ).order_by('scheduled_start').first()
-
-    upcoming_exam = None
-    if upcoming:
-        has_session = ExamSession.objects.filter(
-            student=student, exam=upcoming
-        ).exists()
-        upcoming_exam = {
-            'id': str(upcoming.id),
-            'title': upcoming.title,
-            'scheduled_start': upcoming.scheduled_start.isoformat(),
-            'scheduled_end': upcoming.scheduled_end.isoformat(),
-            'has_started': now >= upcoming.scheduled_start,
-            'already_taken': has_session,
-        }
-
     return {
         'elo': elo,
         'rasch_scaled': rasch_scaled,
@@ -72,10 +111,49 @@ def _get_dashboard_data(student):
         'current_streak': current_streak,
         'longest_streak': longest_streak,
         'achievements': achievements,
-        'upcoming_exam': upcoming_exam,
+        'taken_exams': {},  # exam_id -> has a session; filled lazily per upcoming exam
     }
 
 
+def _get_dashboard_data(student):
+    """Assemble dashboard data for a student.
+
+    The per-student part is cached until a submission, calibration or
+    achievement invalidates it; the upcoming exam comes from a shared entry.
+    Time-dependent fields (has_started) are computed on every request.
+    """
+    cache_key = _dashboard_cache_key(student.id)
+    summary = cache.get(cache_key)
+    if summary is None:
+        summary = _build_student_summary(student)
+        cache.set(cache_key, summary, timeout=DASHBOARD_CACHE_TIMEOUT)
+
+    now = timezone.now()
+    upcoming = _upcoming_exam(now)
+
+    upcoming_exam = None
+    if upcoming:
+        has_session = summary['taken_exams'].get(upcoming['id'])
+        if has_session is None:
+            has_session = ExamSession.objects.filter(
+                student=student, exam_id=upcoming['id']
+            ).exists()
+            summary['taken_exams'][upcoming['id']] = has_session
+            cache.set(cache_key, summary, timeout=DASHBOARD_CACHE_TIMEOUT)
+        upcoming_exam = {
+            'id': upcoming['id'],
+            'title': upcoming['title'],
+            'scheduled_start': upcoming['scheduled_start'].isoformat(),
+            'scheduled_end': upcoming['scheduled_end'].isoformat(),
+            'has_started': now >= upcoming['scheduled_start'],
+            'already_taken': has_session,
+        }
+
+    data = {key: value for key, value in summary.items() if key != 'taken_exams'}
+    data['upcoming_exam'] = upcoming_exam
+    return data
+
+
 @api_view(['GET'])
 @authentication_classes(student_auth)
 @permission_classes(student_perm)
@@ -84,45 +162,73 @@ def dashboard(request):
     return Response(data)
 
 
-def _get_exam_history(student):
-    """Get list of past exams with scores."""
-    sessions = list(
-        ExamSession.objects.filter(
-            student=student,
-            status='submitted',
-        ).select_related('exam').order_by('-submitted_at')
+def _encode_cursor(entry):
+    raw = f"{entry['submitted_at']}|{entry['session_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """Return (submitted_at, session_id) or raise ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        submitted_at, session_id = raw.split('|', 1)
+        submitted_at = datetime.fromisoformat(submitted_at)
+        session_id = uuid.UUID(session_id)
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise ValueError('invalid cursor') from exc
+    if timezone.is_naive(submitted_at):
+        raise ValueError('invalid cursor')
+    return submitted_at, session_id
+
+
+def _get_exam_history(student, before=None, limit=None):
+    """Get past exams with scores, newest first.
+
+    Keyset pagination: `before` is a (submitted_at, session_id) pair and only
+    older sessions are returned, so deep pages cost the same as the first.
+    """
+    sessions = ExamSession.objects.filter(
+        student=student,
+        status='submitted',
+        submitted_at__isnull=False,
     )
+    if before is not None:
+        submitted_at, session_id = before
+        sessions = sessions.filter(
+            Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=session_id)
+        )
+    sessions = sessions.select_related('exam').only(
+        'id', 'submitted_at', 'is_auto_submitted', 'points', 'exercises_correct',
+        'rasch_scaled', 'exam__id', 'exam__title',
+    ).order_by('-submitted_at', '-id')
+    if limit is not None:
+        sessions = sessions[:limit]
+    sessions = list(sessions)
 
     if not sessions:
         return []
 
-    session_ids = [s.id for s in sessions]
-
-    # Batch-fetch all answers grouped by session to avoid N+1
-    all_answers = StudentAnswer.objects.filter(session_id__in=session_ids)
-    answers_by_session = {}
-    for a in all_answers:
-        answers_by_session.setdefault(a.session_id, []).append(a)
-
-    # Batch-fetch EloHistory
+    # Batch-fetch EloHistory for this page only
     elo_entries = {
         e.session_id: e
-        for e in EloHistory.objects.filter(session_id__in=session_ids)
+        for e in EloHistory.objects.filter(session_id__in=[s.id for s in sessions])
     }
 
     history = []
     for session in sessions:
-        prefetched = answers_by_session.get(session.id, [])
-        score = compute_score(session, prefetched_answers=prefetched)
+        score = stored_score(session)
         elo_entry = elo_entries.get(session.id)
+        rasch_scaled = session.rasch_scaled
+        if rasch_scaled is None and elo_entry:
+            rasch_scaled = elo_entry.rasch_after
         history.append({
             'session_id': str(session.id),
             'exam_id': str(session.exam.id),
             'exam_title': session.exam.title,
-            'submitted_at': session.submitted_at.isoformat() if session.submitted_at else None,
+            'submitted_at': session.submitted_at.isoformat(),
             'exercises_correct': score['exercises_correct'],
             'exercises_total': score['exercises_total'],
-            'rasch_scaled': elo_entry.rasch_after if elo_entry else None,
+            'rasch_scaled': rasch_scaled,
             'elo_delta': elo_entry.elo_delta if elo_entry else None,
             'is_auto_submitted': session.is_auto_submitted,
         })
@@ -130,12 +236,39 @@ def _get_exam_history(student):
     return history
 
 
+def _get_history_page(student, cursor=None):
+    """One page of history plus the cursor for the next one (None on the last page)."""
+    before = _decode_cursor(cursor) if cursor else None
+    entries = _get_exam_history(student, before=before, limit=HISTORY_PAGE_SIZE + 1)
+    has_more = len(entries) > HISTORY_PAGE_SIZE
+    entries = entries[:HISTORY_PAGE_SIZE]
+    next_cursor = _encode_cursor(entries[-1]) if has_more else None
+    return {'results': entries, 'next_cursor': next_cursor}
+
+
 @api_view(['GET'])
 @authentication_classes(student_auth)
 @permission_classes(student_perm)
 def exam_history(request):
-    history = _get_exam_history(request.user)
-    return Response(history)
+    cursor = request.query_params.get('cursor')
+    if not cursor and not request.query_params.get('paginate'):
+        # Original contract for clients that do not page (bot, older app builds): a bare list
+        return Response(_get_exam_history(request.user))
+
+    # Paged contract, opted into with ?paginate=1: {results, next_cursor}
+    if cursor:
+        try:
+            return Response(_get_history_page(request.user, cursor))
+        except ValueError:
+            return Response({'error': "Noto'g'ri cursor"}, status=status.HTTP_400_BAD_REQUEST)
+
+    # First page is what the history screen opens with; cached until the next submission
+    cache_key = _history_cache_key(request.user.id)
+    page = cache.get(cache_key)
+    if page is None:
+        page = _get_history_page(request.user)
+        cache.set(cache_key, page, timeout=DASHBOARD_CACHE_TIMEOUT)
+    return Response(page)
 
 
 @api_view(['GET'])
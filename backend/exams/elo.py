@@ -1,7 +1,9 @@
 from django.db import transaction
-from django.db.models import Avg, Count, Q
+from django.db.models import F
+from django.utils import timezone
 
-from .models import StudentRating, EloHistory, ExamSession, StudentAnswer
+from . import leaderboard_store
+from .models import StudentRating, EloHistory, ExamSession, StudentAnswer, ExamScoreAggregate
 from .scoring import POINTS_TOTAL
 
 # ELO rating system constants
@@ -13,10 +15,66 @@ K_FACTOR_THRESHOLD = 5   # Exams needed before K-factor drops
 ELO_SCALE_FACTOR = 800   # How much exam difficulty affects opponent rating
 
 
+def _correct_count(session):
+    if session.points is not None:
+        return session.points
+    return StudentAnswer.objects.filter(session=session, is_correct=True).count()
+
+
 def _score_percent(session):
     """Calculate score as fraction of total points."""
-    correct = StudentAnswer.objects.filter(session=session, is_correct=True).count()
-    return correct / POINTS_TOTAL
+    return _correct_count(session) / POINTS_TOTAL
+
+
+def record_graded_session(exam_id, correct_count):
+    """Add a freshly graded session to its exam's running totals.
+
+    Must run in the same transaction that marks the session submitted: the
+    F() update row-locks the aggregate until commit, so concurrent
+    submissions serialize on it and reconcile_exam_aggregate never misses one.
+    """
+    for _ in range(2):
+        updated = ExamScoreAggregate.objects.filter(exam_id=exam_id).update(
+            submitted_count=F('submitted_count') + 1,
+            correct_sum=F('correct_sum') + correct_count,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            return
+        # First graded session of this exam; get_or_create tolerates a concurrent insert
+        ExamScoreAggregate.objects.get_or_create(exam_id=exam_id)
+
+
+@transaction.atomic
+def reconcile_exam_aggregate(exam_id):
+    """Recompute an exam's running totals from StudentAnswer.
+
+    Returns (before, after) as (submitted_count, correct_sum) tuples.
+    """
+    ExamScoreAggregate.objects.get_or_create(exam_id=exam_id)
+    aggregate = ExamScoreAggregate.objects.select_for_update().get(exam_id=exam_id)
+    before = (aggregate.submitted_count, aggregate.correct_sum)
+
+    aggregate.submitted_count = ExamSession.objects.filter(
+        exam_id=exam_id, status=ExamSession.Status.SUBMITTED,
+    ).count()
+    aggregate.correct_sum = StudentAnswer.objects.filter(
+        session__exam_id=exam_id,
+        session__status=ExamSession.Status.SUBMITTED,
+        is_correct=True,
+    ).count()
+    aggregate.save()
+    return before, (aggregate.submitted_count, aggregate.correct_sum)
+
+
+def _exam_average(session, own_correct):
+    """Average score fraction of the exam's other submitted sessions (0.5 if none)."""
+    aggregate = ExamScoreAggregate.objects.filter(exam_id=session.exam_id).first()
+    if aggregate is None or aggregate.submitted_count <= 1:
+        return 0.5
+    # The aggregate already includes this session (counted when it was graded)
+    others_correct = aggregate.correct_sum - own_correct
+    return others_correct / (aggregate.submitted_count - 1) / POINTS_TOTAL
 
 
 def update_elo_after_submission(session):
@@ -46,18 +104,11 @@ def _compute_and_save(session):
         defaults={'elo': ELO_INITIAL, 'exams_taken': 0},
     )
 
-    student_score = _score_percent(session)
+    own_correct = _correct_count(session)
+    student_score = own_correct / POINTS_TOTAL
 
-    # Compute exam average with a single aggregated DB query
-    result = (
-        ExamSession.objects
-        .filter(exam=session.exam, status=ExamSession.Status.SUBMITTED)
-        .exclude(id=session.id)
-        .annotate(correct_count=Count('answers', filter=Q(answers__is_correct=True)))
-        .aggregate(avg_correct=Avg('correct_count'))
-    )
-    avg_correct = result['avg_correct']
-    exam_avg = (avg_correct / POINTS_TOTAL) if avg_correct is not None else 0.5
+    # Exam average from the running aggregate: O(1) instead of scanning every session
+    exam_avg = _exam_average(session, own_correct)
 
     # Elo calculation
     k_factor = K_FACTOR_NEW if rating.exams_taken < K_FACTOR_THRESHOLD else K_FACTOR_ESTABLISHED
@@ -74,6 +125,10 @@ def _compute_and_save(session):
     rating.exams_taken += 1
     rating.save()
 
+    transaction.on_commit(lambda: leaderboard_store.record_rating(
+        rating.student_id, rating.elo, rating.exams_taken, new_elo - elo_before,
+    ))
+
     # Create history record
     history = EloHistory.objects.create(
         student=session.student,
@@ -58,6 +58,23 @@ def check_streak_broken(student, exam):
         streak.save()
 
 
+def record_exam_streak(student, exam):
+    """
+    Apply the streak-break check and count the exam towards the streak.
+    Safe to re-run: does nothing once the exam's date is already counted.
+    """
+    last_exam_date = (
+        StudentStreak.objects.filter(student=student)
+        .values_list('last_exam_date', flat=True)
+        .first()
+    )
+    if last_exam_date == exam.scheduled_start.date():
+        return
+
+    check_streak_broken(student, exam)
+    update_streak(student, exam)
+
+
 def check_and_award_achievements(student, session):
     """
     Check all achievement conditions and award any newly earned ones.
@@ -0,0 +1,152 @@
+"""
+Redis sorted-set rankings for the leaderboard.
+
+When LEADERBOARD_REDIS_ENABLED is set, each leaderboard tab is a sorted set
+of student ids updated after every Elo change, so top-N, a student's own
+rank and the students around them are O(log N) Redis calls instead of
+scans over StudentRating/EloHistory. rebuild() reconstructs every board from
+Postgres; it runs from the rebuild_leaderboard command and automatically
+when the boards are missing (e.g. after a Redis restart). That automatic
+rebuild is done by one request at a time; the others read Postgres until
+it finishes.
+
+The rendered leaderboard is cached in Django's cache under a version number
+(current_version); bump_version() is called whenever Elo or Rasch values
+change, so cached boards are replaced on change rather than on a timer.
+"""
+
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BOARD_KEYS = {
+    'top_rated': 'leaderboard:top_rated',
+    'most_active': 'leaderboard:most_active',
+    'most_improved': 'leaderboard:most_improved',
+}
+READY_KEY = 'leaderboard:ready'
+VERSION_CACHE_KEY = 'leaderboard_version'
+ACTIVE_SCORE_SCALE = 10000  # most_active orders by (exams_taken, elo); Elo stays below this
+REBUILD_CHUNK_SIZE = 1000
+REBUILD_LOCK_KEY = 'leaderboard:rebuilding'
+REBUILD_LOCK_TIMEOUT = 5 * 60
+
+_client = None
+
+
+def is_enabled():
+    return getattr(settings, 'LEADERBOARD_REDIS_ENABLED', False)
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL, decode_responses=True)
+    return _client
+
+
+def current_version():
+    from django.core.cache import cache
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+        version = cache.get(VERSION_CACHE_KEY, 1)
+    return version
+
+
+def bump_version():
+    """Invalidate every cached leaderboard (after Elo/Rasch changes)."""
+    from django.core.cache import cache
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.add(VERSION_CACHE_KEY, 1, timeout=None)
+
+
+def active_score(exams_taken, elo):
+    return exams_taken * ACTIVE_SCORE_SCALE + elo
+
+
+def ensure_built():
+    """True once the boards exist; False while another caller is rebuilding them."""
+    client = _get_client()
+    if client.exists(READY_KEY):
+        return True
+    if not client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+        return False
+    try:
+        rebuild()
+    finally:
+        client.delete(REBUILD_LOCK_KEY)
+    return True
+
+
+def available():
+    """True if rankings should be read from Redis right now. Check before the readers below."""
+    return is_enabled() and ensure_built()
+
+
+def top(board, start, stop):
+    """Members ranked start..stop-1 (0-based) as [(student_id, score)], best first."""
+    return _get_client().zrevrange(BOARD_KEYS[board], start, stop - 1, withscores=True)
+
+
+def score(board, student_id):
+    return _get_client().zscore(BOARD_KEYS[board], str(student_id))
+
+
+def position(board, student_id):
+    """0-based place of a member in the board (ties broken by id), or None."""
+    return _get_client().zrevrank(BOARD_KEYS[board], str(student_id))
+
+
+def count_at_least(board, min_score, exclusive=False):
+    """Number of members scoring >= min_score (> min_score when exclusive)."""
+    low = f'({min_score}' if exclusive else min_score
+    return _get_client().zcount(BOARD_KEYS[board], low, '+inf')
+
+
+def record_rating(student_id, elo, exams_taken, elo_delta):
+    """Apply one Elo update to all boards (called after the Elo transaction commits)."""
+    if is_enabled():
+        sid = str(student_id)
+        try:
+            pipe = _get_client().pipeline()
+            pipe.zadd(BOARD_KEYS['top_rated'], {sid: elo})
+            if exams_taken > 0:
+                pipe.zadd(BOARD_KEYS['most_active'], {sid: active_score(exams_taken, elo)})
+            pipe.zincrby(BOARD_KEYS['most_improved'], elo_delta, sid)
+            pipe.execute()
+        except Exception:
+            # Rankings drift until the next rebuild; never fail the Elo update for it
+            logger.exception('Failed to update leaderboard for student %s', sid)
+    bump_version()
+
+
+def rebuild():
+    """Rebuild every board from Postgres in one MULTI/EXEC (readers never see a partial board)."""
+    from .models import StudentRating
+
+    boards = {board: {} for board in BOARD_KEYS}
+    ratings = StudentRating.objects.values_list('student_id', 'elo', 'exams_taken', 'improvement_total')
+    for student_id, elo, exams_taken, improvement_total in ratings.iterator(chunk_size=2000):
+        boards['top_rated'][str(student_id)] = elo
+        if exams_taken > 0:
+            boards['most_active'][str(student_id)] = active_score(exams_taken, elo)
+            boards['most_improved'][str(student_id)] = improvement_total
+
+    pipe = _get_client().pipeline()
+    for board, members in boards.items():
+        key = BOARD_KEYS[board]
+        pipe.delete(key)
+        items = list(members.items())
+        for i in range(0, len(items), REBUILD_CHUNK_SIZE):
+            pipe.zadd(key, dict(items[i:i + REBUILD_CHUNK_SIZE]))
+    pipe.set(READY_KEY, 1)
+    pipe.execute()
+    bump_version()
+
+    return {board: len(members) for board, members in boards.items()}
@@ -1,14 +1,27 @@
-from django.db.models import Sum
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from . import leaderboard_store
 from .models import StudentRating, EloHistory, Student
 from .permissions import StudentJWTAuthentication, IsStudent
 
 student_auth = [StudentJWTAuthentication]
 student_perm = [IsStudent]
 
+BOARD_CACHE_PREFIXES = {
+    'top_rated': 'leaderboard_top',
+    'most_improved': 'leaderboard_improved',
+    'most_active': 'leaderboard_active',
+}
+TREND_WINDOW = 3  # Recent Elo deltas averaged for the trend arrow
+MAX_AROUND = 10  # Neighbours shown on each side of the current user
+MAX_LIMIT = 100  # One list of this size is cached per tab; every ?limit slices it
+LEADERBOARD_CACHE_TIMEOUT = 60 * 60  # Safety net; versions are bumped on every change
+REBUILD_LOCK_TIMEOUT = 30
+
 
 def _mask_name(full_name):
     """Mask name for privacy: 'Alisher Toshmatov' -> 'A***r T.'"""
@@ -33,22 +46,23 @@ def _prefetch_trends(student_ids):
     if not student_ids:
         return {}
 
-    # Fetch recent elo_delta values per student (only needed fields)
+    # Only the last TREND_WINDOW deltas per student leave the database
     history_qs = (
         EloHistory.objects
         .filter(student_id__in=student_ids)
-        .only('student_id', 'elo_delta', 'created_at')
-        .order_by('student_id', '-created_at')
+        .annotate(recent_rank=Window(
+            RowNumber(),
+            partition_by=F('student_id'),
+            order_by=F('created_at').desc(),
+        ))
+        .filter(recent_rank__lte=TREND_WINDOW)
+        .values_list('student_id', 'elo_delta', 'recent_rank')
     )
 
-    # Group by student
+    # Group by student, most recent first
     student_deltas = {}
-    for h in history_qs:
-        sid = h.student_id
-        if sid not in student_deltas:
-            student_deltas[sid] = []
-        if len(student_deltas[sid]) < 3:
-            student_deltas[sid].append(h.elo_delta)
+    for sid, elo_delta, recent_rank in sorted(history_qs, key=lambda row: row[2]):
+        student_deltas.setdefault(sid, []).append(elo_delta)
 
     result = {}
     for sid in student_ids:
@@ -82,6 +96,7 @@ def _build_entry(rating, rank, trend_data, current_student_id=None, improvement=
     }
     if improvement is not None:
         entry['improvement'] = improvement
+        entry['recent_improvement'] = rating.improvement_recent
     return entry
 
 
@@ -90,202 +105,194 @@ def _build_entry(rating, rank, trend_data, current_student_id=None, improvement=
 @permission_classes([AllowAny])
 def leaderboard(request):
     try:
-        limit = min(int(request.query_params.get('limit', 50)), 100)
+        limit = min(int(request.query_params.get('limit', 50)), MAX_LIMIT)
     except (TypeError, ValueError):
         limit = 50
+    try:
+        around = max(0, min(int(request.query_params.get('around', 0)), MAX_AROUND))
+    except (TypeError, ValueError):
+        around = 0
     current_student = request.user if request.user and hasattr(request.user, 'id') and not getattr(request.user, 'is_anonymous', True) else None
 
     tab = request.query_params.get('tab', 'top_rated')
-    if tab == 'most_improved':
-        return _most_improved(current_student, limit)
-    elif tab == 'most_active':
-        return _most_active(current_student, limit)
-    else:
-        return _top_rated(current_student, limit)
-
+    if tab not in BOARD_CACHE_PREFIXES:
+        tab = 'top_rated'
+    return _board_response(tab, current_student, limit, around)
 
-def _top_rated(current_student, limit):
-    from django.core.cache import cache
 
-    cache_key = f'leaderboard_top_{limit}'
-    cached = cache.get(cache_key)
+def _ranked(tab, start, stop, use_store):
+    """Student ids ranked start..stop-1 (0-based) on a tab as [(student_id, score)]."""
+    if use_store:
+        return leaderboard_store.top(tab, start, stop)
 
-    if cached is not None:
-        # Use cached entries but personalize is_current_user
-        entries = [dict(e) for e in cached['entries']]  # shallow copy each dict
-        trend_data = dict(cached['trend_data'])  # copy to prevent cache mutation
-    else:
-        ratings = list(
+    if tab == 'most_improved':
+        # Running counter maintained on each EloHistory insert (idx_rating_improvement)
+        return list(
             StudentRating.objects
-            .select_related('student')
-            .order_by('-elo')[:limit]
+            .filter(exams_taken__gt=0)
+            .order_by('-improvement_total')
+            .values_list('student_id', 'improvement_total')[start:stop]
         )
-        trend_data = _prefetch_trends([r.student_id for r in ratings])
-        entries = [_build_entry(r, i + 1, trend_data) for i, r in enumerate(ratings)]
-        cache.set(cache_key, {'entries': entries, 'trend_data': trend_data}, timeout=300)
-
-    student_id = current_student.id if current_student else None
-    if student_id:
-        for e in entries:
-            e['is_current_user'] = str(e['student_id']) == str(student_id)
-
-    # Apply name masking for rank 51+ (after cache, per-user personalization)
-    for e in entries:
-        if e['rank'] > 50 and not e.get('is_current_user'):
-            e['full_name'] = _mask_name(e['full_name'])
-
-    my_entry = _get_my_entry_top_rated(current_student, entries, trend_data) if current_student else None
-
-    return Response({'tab': 'top_rated', 'entries': entries, 'my_entry': my_entry})
-
-
-def _get_my_entry_top_rated(student, entries, trend_data):
-    if student is None:
-        return None
-
-    for e in entries:
-        if e['is_current_user']:
-            return e
-
-    try:
-        my_rating = StudentRating.objects.select_related('student').get(student=student)
-    except StudentRating.DoesNotExist:
-        return None
-
-    rank = StudentRating.objects.filter(elo__gt=my_rating.elo).count() + 1
-    if my_rating.student_id not in trend_data:
-        trend_data.update(_prefetch_trends([my_rating.student_id]))
-    return _build_entry(my_rating, rank, trend_data, student.id)
-
+    if tab == 'most_active':
+        return list(
+            StudentRating.objects
+            .filter(exams_taken__gt=0)
+            .order_by('-exams_taken', '-elo')
+            .values_list('student_id', 'exams_taken')[start:stop]
+        )
+    return list(
+        StudentRating.objects
+        .order_by('-elo')
+        .values_list('student_id', 'elo')[start:stop]
+    )
 
-def _most_improved(current_student, limit):
-    """Biggest total Elo delta over recent exams.
 
-    Uses DB-level aggregation instead of loading the entire EloHistory table.
-    """
-    from django.core.cache import cache
+def _rank_of(tab, rating, use_store):
+    """Competition rank of a student on a tab as (rank, improvement), or None if unranked."""
 
-    cache_key = f'leaderboard_improved_{limit}'
-    cached = cache.get(cache_key)
+    if tab == 'most_improved':
+        if use_store:
+            my_delta = leaderboard_store.score(tab, rating.student_id)
+            if my_delta is None:
+                return None
+            return leaderboard_store.count_at_least(tab, my_delta, exclusive=True) + 1, int(my_delta)
+        if rating.exams_taken == 0:
+            return None
+        ahead = StudentRating.objects.filter(
+            exams_taken__gt=0, improvement_total__gt=rating.improvement_total,
+        ).count()
+        return ahead + 1, rating.improvement_total
+
+    if tab == 'most_active':
+        if use_store:
+            ahead = leaderboard_store.count_at_least(
+                tab, leaderboard_store.active_score(rating.exams_taken + 1, 0),
+            )
+        else:
+            ahead = StudentRating.objects.filter(exams_taken__gt=rating.exams_taken).count()
+        return ahead + 1, None
 
-    if cached is not None:
-        entries = [dict(e) for e in cached['entries']]
-        trend_data = dict(cached['trend_data'])
+    if use_store:
+        ahead = leaderboard_store.count_at_least(tab, rating.elo, exclusive=True)
     else:
-        # Aggregate total elo_delta per student at the DB level
-        improvements_qs = (
-            EloHistory.objects
-            .values('student_id')
-            .annotate(total_delta=Sum('elo_delta'))
-            .order_by('-total_delta')[:limit]
-        )
+        ahead = StudentRating.objects.filter(elo__gt=rating.elo).count()
+    return ahead + 1, None
 
-        student_ids = [row['student_id'] for row in improvements_qs]
-        delta_map = {row['student_id']: row['total_delta'] for row in improvements_qs}
 
-        # Batch-fetch ratings and trends
-        ratings_map = {
-            r.student_id: r
-            for r in StudentRating.objects.select_related('student').filter(student_id__in=student_ids)
-        }
-        trend_data = _prefetch_trends(student_ids)
+def _hydrate(tab, ranked, first_rank):
+    """Build entries for ranked (student_id, score) rows, numbering ranks from first_rank."""
+    student_ids = [sid for sid, _ in ranked]
+    ratings_map = {
+        str(r.student_id): r
+        for r in StudentRating.objects.select_related('student').filter(student_id__in=student_ids)
+    }
+    trend_data = _prefetch_trends([r.student_id for r in ratings_map.values()])
 
-        entries = []
-        for rank, sid in enumerate(student_ids, 1):
-            rating = ratings_map.get(sid)
-            if not rating:
-                continue
-            entries.append(_build_entry(rating, rank, trend_data, improvement=delta_map[sid]))
+    entries = []
+    for rank, (sid, score) in enumerate(ranked, first_rank):
+        rating = ratings_map.get(str(sid))
+        if not rating:
+            continue
+        improvement = int(score) if tab == 'most_improved' else None
+        entries.append(_build_entry(rating, rank, trend_data, improvement=improvement))
+    return entries, trend_data
 
-        cache.set(cache_key, {'entries': entries, 'trend_data': trend_data}, timeout=300)
 
-    student_id = current_student.id if current_student else None
+def _personalize(entries, student_id):
+    """Flag the current user and mask names from rank 51 (after cache, per user)."""
     if student_id:
         for e in entries:
             e['is_current_user'] = str(e['student_id']) == str(student_id)
 
-    # Apply name masking for rank 51+ (after cache, per-user personalization)
     for e in entries:
         if e['rank'] > 50 and not e.get('is_current_user'):
             e['full_name'] = _mask_name(e['full_name'])
 
-    my_entry = None
-    if current_student:
-        for e in entries:
-            if e['is_current_user']:
-                my_entry = e
-                break
-
-        if my_entry is None:
-            my_delta_qs = EloHistory.objects.filter(student=current_student).aggregate(total_delta=Sum('elo_delta'))
-            my_delta = my_delta_qs['total_delta']
-            if my_delta is not None:
-                my_rank = (
-                    EloHistory.objects
-                    .values('student_id')
-                    .annotate(total_delta=Sum('elo_delta'))
-                    .filter(total_delta__gt=my_delta)
-                    .count()
-                ) + 1
-                try:
-                    my_rating = StudentRating.objects.select_related('student').get(student=current_student)
-                    if current_student.id not in trend_data:
-                        trend_data.update(_prefetch_trends([current_student.id]))
-                    my_entry = _build_entry(my_rating, my_rank, trend_data, current_student.id, improvement=my_delta)
-                except StudentRating.DoesNotExist:
-                    pass
-
-    return Response({'tab': 'most_improved', 'entries': entries, 'my_entry': my_entry})
-
-
-def _most_active(current_student, limit):
-    from django.core.cache import cache
 
-    cache_key = f'leaderboard_active_{limit}'
-    cached = cache.get(cache_key)
+def _build_board(tab, use_store):
+    entries, trend_data = _hydrate(tab, _ranked(tab, 0, MAX_LIMIT, use_store), first_rank=1)
+    return {'entries': entries, 'trend_data': trend_data}
 
-    if cached is not None:
-        entries = [dict(e) for e in cached['entries']]
-        trend_data = dict(cached['trend_data'])
-    else:
-        ratings = list(
-            StudentRating.objects
-            .select_related('student')
-            .filter(exams_taken__gt=0)
-            .order_by('-exams_taken', '-elo')[:limit]
-        )
-        trend_data = _prefetch_trends([r.student_id for r in ratings])
-        entries = [_build_entry(r, i + 1, trend_data) for i, r in enumerate(ratings)]
-        cache.set(cache_key, {'entries': entries, 'trend_data': trend_data}, timeout=300)
+
+def _cached_board(tab, use_store):
+    """Top MAX_LIMIT entries for a tab, cached under the current leaderboard version.
+
+    Rebuilds are single-flight per tab: one request rebuilds while the others
+    serve the last board built, whatever its version, so a burst of requests
+    after an exam closes (or a string of version bumps) hits the DB once.
+    """
+    from django.core.cache import cache
+
+    prefix = BOARD_CACHE_PREFIXES[tab]
+    cache_key = f'{prefix}_v{leaderboard_store.current_version()}'
+    latest_key = f'{prefix}_latest'
+    board = cache.get(cache_key)
+    if board is not None:
+        return board
+
+    lock_key = f'{prefix}_rebuild'
+    if cache.add(lock_key, 1, timeout=REBUILD_LOCK_TIMEOUT):
+        try:
+            board = _build_board(tab, use_store)
+            cache.set(cache_key, board, timeout=LEADERBOARD_CACHE_TIMEOUT)
+            cache.set(latest_key, board, timeout=None)
+        finally:
+            cache.delete(lock_key)
+        return board
+
+    board = cache.get(latest_key)
+    if board is not None:
+        return board
+    # Nothing built yet (first request after a cache flush): answer without caching
+    return _build_board(tab, use_store)
+
+
+def _board_response(tab, current_student, limit, around=0):
+    # One readiness check per request; every ranking read below follows it
+    use_store = leaderboard_store.available()
+    board = _cached_board(tab, use_store)
+    # Slice to the requested limit and personalize copies, never the cached dicts
+    entries = [dict(e) for e in board['entries'] if e['rank'] <= limit]
+    trend_data = dict(board['trend_data'])
 
     student_id = current_student.id if current_student else None
-    if student_id:
-        for e in entries:
-            e['is_current_user'] = str(e['student_id']) == str(student_id)
+    _personalize(entries, student_id)
 
-    # Apply name masking for rank 51+ (after cache, per-user personalization)
-    for e in entries:
-        if e['rank'] > 50 and not e.get('is_current_user'):
-            e['full_name'] = _mask_name(e['full_name'])
+    my_entry = next((e for e in entries if e['is_current_user']), None) if student_id else None
+    response = {'tab': tab, 'entries': entries, 'my_entry': my_entry}
+    if around:
+        response['neighbors'] = []
+    if current_student is None or (my_entry is not None and not around):
+        return Response(response)
 
-    my_entry = None
-    if current_student:
-        for e in entries:
-            if e['is_current_user']:
-                my_entry = e
-                break
-
-        if my_entry is None:
-            try:
-                my_rating = StudentRating.objects.select_related('student').get(student=current_student)
-                rank = StudentRating.objects.filter(exams_taken__gt=my_rating.exams_taken).count() + 1
-                if my_rating.student_id not in trend_data:
-                    trend_data.update(_prefetch_trends([my_rating.student_id]))
-                my_entry = _build_entry(my_rating, rank, trend_data, current_student.id)
-            except StudentRating.DoesNotExist:
-                pass
-
-    return Response({'tab': 'most_active', 'entries': entries, 'my_entry': my_entry})
+    try:
+        my_rating = StudentRating.objects.select_related('student').get(student=current_student)
+    except StudentRating.DoesNotExist:
+        return Response(response)
+
+    position = _rank_of(tab, my_rating, use_store)
+    if position is None:
+        return Response(response)
+
+    my_rank, improvement = position
+    if my_entry is None:
+        if my_rating.student_id not in trend_data:
+            trend_data.update(_prefetch_trends([my_rating.student_id]))
+        response['my_entry'] = _build_entry(my_rating, my_rank, trend_data, student_id, improvement=improvement)
+
+    if around:
+        position = None
+        if use_store:
+            # Ties share a rank, so centre the window on the student's own place in the set
+            position = leaderboard_store.position(tab, my_rating.student_id)
+        if position is None:
+            position = my_rank - 1
+        start = max(position - around, 0)
+        neighbors, _ = _hydrate(tab, _ranked(tab, start, position + 1 + around, use_store), first_rank=start + 1)
+        _personalize(neighbors, student_id)
+        response['neighbors'] = neighbors
+
+    return Response(response)
 
 
 @api_view(['GET'])
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand
+
+from exams.models import ExamSession, StudentAnswer, ScoreConversion
+from exams.scoring import compute_score
+
+
+class Command(BaseCommand):
+    help = 'Fill denormalized score columns (points, exercises_correct, theta, rasch_scaled) on submitted sessions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Sessions processed per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = (
+            ExamSession.objects
+            .filter(status=ExamSession.Status.SUBMITTED, points__isnull=True)
+            .order_by('id')
+        )
+
+        updated = 0
+        while True:
+            # Each batch is written before the next query, so it drops out of `pending`
+            sessions = list(pending[:batch_size])
+            if not sessions:
+                break
+
+            answers_by_session = {}
+            for a in StudentAnswer.objects.filter(session_id__in=[s.id for s in sessions]):
+                answers_by_session.setdefault(a.session_id, []).append(a)
+
+            conversions = {
+                (c.exam_id, c.raw_score): c
+                for c in ScoreConversion.objects.filter(exam_id__in={s.exam_id for s in sessions})
+            }
+
+            for session in sessions:
+                score = compute_score(session, prefetched_answers=answers_by_session.get(session.id, []))
+                session.points = score['points']
+                session.exercises_correct = score['exercises_correct']
+                conversion = conversions.get((session.exam_id, session.points))
+                if conversion is not None and session.theta is None:
+                    session.theta = conversion.theta
+                    session.rasch_scaled = conversion.rasch_scaled
+
+            ExamSession.objects.bulk_update(
+                sessions, ['points', 'exercises_correct', 'theta', 'rasch_scaled'], batch_size=batch_size,
+            )
+            updated += len(sessions)
+            self.stdout.write(f'{updated} sessions backfilled...')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled scores for {updated} sessions'))
@@ -4,6 +4,7 @@ O'rtacha qiyinlik: 8/10. Universitet kirish imtihoni darajasi.
 """
 from django.core.management.base import BaseCommand
 
+from exams import question_sampler
 from exams.models import Question
 
 QUESTIONS = [
@@ -215,6 +216,8 @@ class Command(BaseCommand):
             else:
                 skipped += 1
 
+        question_sampler.invalidate()
+
         self.stdout.write(self.style.SUCCESS(
             f"\n  Tayyor! {created} ta savol yaratildi, {skipped} tasi allaqachon mavjud edi.\n"
             f"  O'rtacha qiyinlik: 8/10 (universitet/olimpiada darajasi)\n"
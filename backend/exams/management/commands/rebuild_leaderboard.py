@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from exams import leaderboard_store
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the Redis leaderboard sorted sets from StudentRating and EloHistory'
+
+    def handle(self, *args, **options):
+        if not leaderboard_store.is_enabled():
+            self.stderr.write(self.style.WARNING(
+                'LEADERBOARD_REDIS_ENABLED is off; the leaderboard is served from the database'
+            ))
+            return
+
+        sizes = leaderboard_store.rebuild()
+        for board, size in sizes.items():
+            self.stdout.write(f'{board}: {size} students')
+        self.stdout.write(self.style.SUCCESS('Leaderboard rebuilt'))
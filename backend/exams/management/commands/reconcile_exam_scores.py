@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from exams.elo import reconcile_exam_aggregate
+from exams.models import MockExam
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-exam running score totals (used for Elo exam averages) from StudentAnswer'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--exam',
+            help='Only reconcile this exam ID (default: all exams)',
+        )
+
+    def handle(self, *args, **options):
+        exams = MockExam.objects.order_by('scheduled_start')
+        if options['exam']:
+            exams = exams.filter(id=options['exam'])
+
+        fixed = 0
+        for exam_id in exams.values_list('id', flat=True):
+            before, after = reconcile_exam_aggregate(exam_id)
+            if before != after:
+                fixed += 1
+                self.stdout.write(
+                    f'{exam_id}: {before[0]} sessions/{before[1]} correct '
+                    f'-> {after[0]} sessions/{after[1]} correct'
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Reconciled exam score totals ({fixed} corrected)'))
@@ -8,8 +8,9 @@ from exams.models import (
     MockExam, CorrectAnswer, Student, ExamSession,
     StudentAnswer, ItemDifficulty,
 )
+from exams.elo import reconcile_exam_aggregate
 from exams.rasch import (
-    rasch_probability, estimate_theta,
+    rasch_probability, rasch_probabilities, estimate_theta,
     estimate_item_difficulties, compute_item_fit,
 )
 
@@ -118,7 +119,7 @@ class Command(BaseCommand):
             sd['theta'] = float(thetas[i])
             responses_arr = np.array(sd['responses'])
             sd['raw_pct'] = float(responses_arr.sum() / len(responses_arr) * 100)
-            expected = sum(rasch_probability(sd['theta'], betas[j]) for j in range(len(betas)))
+            expected = float(rasch_probabilities(sd['theta'], betas).sum())
             sd['rasch_pct'] = expected / len(betas) * 100
 
         # 8. Print report
@@ -209,6 +210,8 @@ class Command(BaseCommand):
                 'responses': responses,
             })
 
+        # Sessions were created already graded, so seed the exam's running totals
+        reconcile_exam_aggregate(exam.id)
         return students_data
 
     def _generate_name(self, used_names):
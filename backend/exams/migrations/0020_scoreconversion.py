@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0019_restore_compound_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoreConversion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_score', models.IntegerField()),
+                ('theta', models.FloatField(help_text='Rasch ability (logits) for this raw score')),
+                ('standard_error', models.FloatField(blank=True, help_text='SE of theta at this raw score', null=True)),
+                ('expected_score', models.FloatField(help_text='Sum of P(correct) over calibrated items at theta')),
+                ('rasch_scaled', models.FloatField(help_text='Rasch score on 0-75 scale (Milliy Sertifikat)')),
+                ('letter_grade', models.CharField(max_length=2)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_conversions', to='exams.mockexam')),
+            ],
+            options={
+                'ordering': ['raw_score'],
+                'unique_together': {('exam', 'raw_score')},
+            },
+        ),
+    ]
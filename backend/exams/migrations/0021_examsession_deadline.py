@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:40
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_deadlines(apps, schema_editor):
+    """Store the effective deadline for existing sessions (same late-start rule as start_exam)."""
+    ExamSession = apps.get_model('exams', 'ExamSession')
+    sessions = list(
+        ExamSession.objects.filter(deadline__isnull=True)
+        .select_related('exam')
+        .only('id', 'started_at', 'exam__duration', 'exam__scheduled_end')
+    )
+    for session in sessions:
+        session.deadline = min(
+            session.started_at + timedelta(minutes=session.exam.duration),
+            max(session.started_at, session.exam.scheduled_end),
+        )
+    ExamSession.objects.bulk_update(sessions, ['deadline'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0020_scoreconversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsession',
+            name='deadline',
+            field=models.DateTimeField(blank=True, help_text="When the session's effective duration runs out", null=True),
+        ),
+        migrations.RunPython(backfill_deadlines, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='examsession',
+            index=models.Index(fields=['status', 'deadline'], name='idx_session_status_deadline'),
+        ),
+    ]
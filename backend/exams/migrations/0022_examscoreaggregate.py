@@ -0,0 +1,47 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_aggregates(apps, schema_editor):
+    """Seed running totals from existing submitted sessions."""
+    ExamSession = apps.get_model('exams', 'ExamSession')
+    ExamScoreAggregate = apps.get_model('exams', 'ExamScoreAggregate')
+    rows = (
+        ExamSession.objects.filter(status='submitted')
+        .values('exam_id')
+        .annotate(
+            submitted_count=Count('id', distinct=True),
+            correct_sum=Count('answers', filter=Q(answers__is_correct=True)),
+        )
+    )
+    ExamScoreAggregate.objects.bulk_create([
+        ExamScoreAggregate(
+            exam_id=row['exam_id'],
+            submitted_count=row['submitted_count'],
+            correct_sum=row['correct_sum'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0021_examsession_deadline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExamScoreAggregate',
+            fields=[
+                ('exam', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score_aggregate', serialize=False, to='exams.mockexam')),
+                ('submitted_count', models.IntegerField(default=0)),
+                ('correct_sum', models.IntegerField(default=0, help_text='Correct answers summed over submitted sessions')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.1 on 2026-10-17 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0022_examscoreaggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examsession',
+            name='exercises_correct',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='points',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='rasch_scaled',
+            field=models.FloatField(blank=True, help_text='Rasch score on 0-75 scale', null=True),
+        ),
+        migrations.AddField(
+            model_name='examsession',
+            name='theta',
+            field=models.FloatField(blank=True, help_text='Rasch ability (logits) from calibration', null=True),
+        ),
+    ]
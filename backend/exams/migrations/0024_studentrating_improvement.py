@@ -0,0 +1,52 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:30
+
+from django.db import migrations, models
+
+RECENT_IMPROVEMENT_EXAMS = 5
+
+
+def backfill_improvement(apps, schema_editor):
+    """Seed improvement counters from existing EloHistory."""
+    StudentRating = apps.get_model('exams', 'StudentRating')
+    EloHistory = apps.get_model('exams', 'EloHistory')
+
+    totals = {}
+    history = (
+        EloHistory.objects.order_by('student_id', '-created_at')
+        .values_list('student_id', 'elo_delta')
+    )
+    for student_id, elo_delta in history.iterator(chunk_size=2000):
+        total, recent, seen = totals.get(student_id, (0, 0, 0))
+        if seen < RECENT_IMPROVEMENT_EXAMS:
+            recent += elo_delta
+        totals[student_id] = (total + elo_delta, recent, seen + 1)
+
+    ratings = list(StudentRating.objects.filter(student_id__in=totals))
+    for rating in ratings:
+        rating.improvement_total, rating.improvement_recent, _ = totals[rating.student_id]
+    StudentRating.objects.bulk_update(ratings, ['improvement_total', 'improvement_recent'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0023_examsession_scores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentrating',
+            name='improvement_recent',
+            field=models.IntegerField(default=0, help_text='Sum of Elo deltas over the last 5 exams'),
+        ),
+        migrations.AddField(
+            model_name='studentrating',
+            name='improvement_total',
+            field=models.IntegerField(default=0, help_text='Sum of all Elo deltas'),
+        ),
+        migrations.AddIndex(
+            model_name='studentrating',
+            index=models.Index(fields=['-improvement_total'], name='idx_rating_improvement'),
+        ),
+        migrations.RunPython(backfill_improvement, migrations.RunPython.noop),
+    ]
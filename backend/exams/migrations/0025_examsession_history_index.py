@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0024_studentrating_improvement'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='examsession',
+            index=models.Index(fields=['student', 'status', '-submitted_at', '-id'], name='idx_session_student_history'),
+        ),
+    ]
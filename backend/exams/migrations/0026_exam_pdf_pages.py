@@ -0,0 +1,39 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:30
+
+import django.db.models.deletion
+import exams.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0025_examsession_history_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mockexam',
+            name='pdf_prepared_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='mockexam',
+            name='pdf_web',
+            field=models.FileField(blank=True, help_text='Linearized copy of pdf_file (built by prepare_exam_pdf)', upload_to=exams.models.exam_pdf_web_path),
+        ),
+        migrations.CreateModel(
+            name='ExamPdfPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.IntegerField()),
+                ('file', models.FileField(upload_to=exams.models.exam_pdf_page_path)),
+                ('size', models.IntegerField(help_text='File size in bytes')),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdf_pages', to='exams.mockexam')),
+            ],
+            options={
+                'ordering': ['page_number'],
+                'unique_together': {('exam', 'page_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0.1 on 2026-10-17 08:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0026_exam_pdf_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='telegram_unreachable_at',
+            field=models.DateTimeField(blank=True, help_text='Set when the bot is blocked or the chat is gone; broadcasts skip the student until they return', null=True),
+        ),
+        migrations.CreateModel(
+            name='BroadcastDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('broadcast', models.CharField(help_text='Broadcast key, e.g. exam_<id>', max_length=64)),
+                ('telegram_id', models.BigIntegerField()),
+                ('status', models.CharField(choices=[('sent', 'Yuborildi'), ('blocked', 'Bloklangan'), ('chat_not_found', 'Chat topilmadi'), ('failed', 'Xatolik')], max_length=16)),
+                ('attempts', models.PositiveSmallIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('broadcast', 'telegram_id')},
+            },
+        ),
+    ]
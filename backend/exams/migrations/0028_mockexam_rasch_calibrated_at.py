@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-17 09:10
+
+from django.db import migrations, models
+
+
+def mark_closed_exams_calibrated(apps, schema_editor):
+    """Exams that already closed were calibrated (or fell back) when their window ended."""
+    from django.db.models import F
+    from django.utils import timezone
+    MockExam = apps.get_model('exams', 'MockExam')
+    MockExam.objects.filter(scheduled_end__lte=timezone.now()).update(rasch_calibrated_at=F('scheduled_end'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0027_broadcast_delivery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mockexam',
+            name='rasch_calibrated_at',
+            field=models.DateTimeField(blank=True, help_text='Set by calibrate_exam_rasch; closed exams without it are still pending calibration', null=True),
+        ),
+        migrations.RunPython(mark_closed_exams_calibrated, migrations.RunPython.noop),
+    ]
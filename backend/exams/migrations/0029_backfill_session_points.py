@@ -0,0 +1,50 @@
+# Generated by Django 6.0.1 on 2026-10-17 11:20
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def backfill_points(apps, schema_editor):
+    """Fill points/exercises_correct on sessions graded before those columns existed.
+
+    Same rules as scoring.compute_score, inlined so the migration does not
+    depend on application code that may change later.
+    """
+    ExamSession = apps.get_model('exams', 'ExamSession')
+    StudentAnswer = apps.get_model('exams', 'StudentAnswer')
+
+    pending = ExamSession.objects.filter(status='submitted', points__isnull=True).order_by('id')
+    while True:
+        sessions = list(pending[:BATCH_SIZE])
+        if not sessions:
+            break
+        points_by_session = {}
+        correct_by_session = {}
+        rows = StudentAnswer.objects.filter(
+            session_id__in=[s.id for s in sessions], is_correct=True,
+        ).values_list('session_id', 'question_number', 'sub_part')
+        for session_id, question_number, sub_part in rows:
+            points_by_session[session_id] = points_by_session.get(session_id, 0) + 1
+            correct_by_session.setdefault(session_id, set()).add((question_number, sub_part))
+
+        for session in sessions:
+            correct = correct_by_session.get(session.id, set())
+            questions = {q for q, _ in correct}
+            session.points = points_by_session.get(session.id, 0)
+            session.exercises_correct = (
+                sum(1 for q in range(1, 36) if q in questions)
+                + sum(1 for q in range(36, 46) if (q, 'a') in correct and (q, 'b') in correct)
+            )
+        ExamSession.objects.bulk_update(sessions, ['points', 'exercises_correct'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0028_mockexam_rasch_calibrated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_points, migrations.RunPython.noop),
+    ]
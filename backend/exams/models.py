@@ -1,7 +1,10 @@
 import os
 import uuid
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.utils.text import get_valid_filename
 
 
@@ -11,20 +14,57 @@ def exam_pdf_path(instance, filename):
     return f'exams/pdfs/{instance.id}_{safe_name}'
 
 
+def exam_pdf_web_path(instance, filename):
+    return f'exams/pdfs/web/{instance.id}.pdf'
+
+
+def exam_pdf_page_path(instance, filename):
+    return f'exams/pdfs/pages/{instance.exam_id}/{instance.page_number}.pdf'
+
+
 class MockExam(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     title = models.CharField(max_length=255)
     pdf_file = models.FileField(upload_to=exam_pdf_path)
+    pdf_web = models.FileField(
+        upload_to=exam_pdf_web_path, blank=True,
+        help_text="Linearized copy of pdf_file (built by prepare_exam_pdf)",
+    )
+    pdf_prepared_at = models.DateTimeField(null=True, blank=True)
+    rasch_calibrated_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Set by calibrate_exam_rasch; closed exams without it are still pending calibration",
+    )
     scheduled_start = models.DateTimeField()
     scheduled_end = models.DateTimeField()
     duration = models.IntegerField(default=150, help_text="Duration in minutes")
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['scheduled_start', 'scheduled_end'], name='idx_exam_schedule'),
+        ]
+
     def __str__(self):
         return self.title
 
 
+class ExamPdfPage(models.Model):
+    """One page of an exam PDF as a standalone, compressed PDF (served on demand)."""
+    exam = models.ForeignKey(MockExam, on_delete=models.CASCADE, related_name='pdf_pages')
+    page_number = models.IntegerField()
+    file = models.FileField(upload_to=exam_pdf_page_path)
+    size = models.IntegerField(help_text="File size in bytes")
+
+    class Meta:
+        unique_together = ('exam', 'page_number')
+        ordering = ['page_number']
+
+    def __str__(self):
+        return f"{self.exam.title} p{self.page_number}"
+
+
 class CorrectAnswer(models.Model):
     exam = models.ForeignKey(MockExam, on_delete=models.CASCADE, related_name='correct_answers')
     question_number = models.IntegerField()
@@ -43,6 +83,10 @@ class Student(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     full_name = models.CharField(max_length=255)
     telegram_id = models.BigIntegerField(unique=True)
+    telegram_unreachable_at = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Set when the bot is blocked or the chat is gone; broadcasts skip the student until they return",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
 
     @property
@@ -76,9 +120,33 @@ class ExamSession(models.Model):
     submitted_at = models.DateTimeField(null=True, blank=True)
     is_auto_submitted = models.BooleanField(default=False)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.IN_PROGRESS, db_index=True)
+    deadline = models.DateTimeField(null=True, blank=True, help_text="When the session's effective duration runs out")
+    # Denormalized at grading time; theta/rasch_scaled are filled in by calibration
+    points = models.IntegerField(null=True, blank=True)
+    exercises_correct = models.IntegerField(null=True, blank=True)
+    theta = models.FloatField(null=True, blank=True, help_text="Rasch ability (logits) from calibration")
+    rasch_scaled = models.FloatField(null=True, blank=True, help_text="Rasch score on 0-75 scale")
 
     class Meta:
         unique_together = ('student', 'exam')
+        indexes = [
+            models.Index(fields=['exam', 'status'], name='idx_session_exam_status'),
+            models.Index(fields=['status', 'deadline'], name='idx_session_status_deadline'),
+            models.Index(fields=['student', 'status', '-submitted_at', '-id'], name='idx_session_student_history'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # bulk_create skips this; auto_submit_expired_sessions fills such rows in
+        if self._state.adding and self.deadline is None:
+            self.deadline = self.compute_deadline(self.started_at or timezone.now())
+        super().save(*args, **kwargs)
+
+    def compute_deadline(self, started_at):
+        """Late-start rule: min(exam duration, time left in the window at start)."""
+        return min(
+            started_at + timedelta(minutes=self.exam.duration),
+            max(started_at, self.exam.scheduled_end),
+        )
 
     def __str__(self):
         return f"{self.student} - {self.exam} ({self.status})"
@@ -93,22 +161,35 @@ class StudentAnswer(models.Model):
 
     class Meta:
         unique_together = ('session', 'question_number', 'sub_part')
+        indexes = [
+            models.Index(fields=['session', 'question_number'], name='idx_answer_session_question'),
+        ]
 
     def __str__(self):
         part = f"({self.sub_part})" if self.sub_part else ""
         return f"Q{self.question_number}{part}: {self.answer}"
 
 
+RECENT_IMPROVEMENT_EXAMS = 5
+
+
 class StudentRating(models.Model):
     student = models.OneToOneField(Student, on_delete=models.CASCADE, primary_key=True, related_name='rating')
     elo = models.IntegerField(default=1200)
     exams_taken = models.IntegerField(default=0)
     rasch_ability = models.FloatField(default=0.0, help_text="Current Rasch theta (logits)")
     rasch_scaled = models.FloatField(default=37.5, help_text="Rasch score on 0-75 scale (Milliy Sertifikat)")
+    improvement_total = models.IntegerField(default=0, help_text="Sum of all Elo deltas")
+    improvement_recent = models.IntegerField(
+        default=0, help_text=f"Sum of Elo deltas over the last {RECENT_IMPROVEMENT_EXAMS} exams",
+    )
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-elo']
+        indexes = [
+            models.Index(fields=['-improvement_total'], name='idx_rating_improvement'),
+        ]
 
     def __str__(self):
         return f"{self.student} — {self.elo}"
@@ -134,6 +215,28 @@ class EloHistory(models.Model):
             models.Index(fields=['student', '-created_at']),
         ]
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            self._record_improvement()
+
+    def _record_improvement(self):
+        """Fold a new row into the student's running improvement counters."""
+        # Delta that just slid out of the recent window (None while the window is filling)
+        dropped = (
+            EloHistory.objects
+            .filter(student_id=self.student_id)
+            .exclude(id=self.id)
+            .order_by('-created_at')
+            .values_list('elo_delta', flat=True)[RECENT_IMPROVEMENT_EXAMS - 1:RECENT_IMPROVEMENT_EXAMS]
+            .first()
+        )
+        StudentRating.objects.filter(student_id=self.student_id).update(
+            improvement_total=models.F('improvement_total') + self.elo_delta,
+            improvement_recent=models.F('improvement_recent') + self.elo_delta - (dropped or 0),
+        )
+
     def __str__(self):
         return f"{self.student} | {self.elo_before} → {self.elo_after} ({self.elo_delta:+d})"
 
@@ -155,6 +258,35 @@ class ItemDifficulty(models.Model):
         return f"Q{self.question_number}{part}: β={self.beta:.2f}"
 
 
+class ScoreConversion(models.Model):
+    """Calibrated raw score → Rasch ability lookup (one row per possible raw score)."""
+    exam = models.ForeignKey(MockExam, on_delete=models.CASCADE, related_name='score_conversions')
+    raw_score = models.IntegerField()
+    theta = models.FloatField(help_text="Rasch ability (logits) for this raw score")
+    standard_error = models.FloatField(null=True, blank=True, help_text="SE of theta at this raw score")
+    expected_score = models.FloatField(help_text="Sum of P(correct) over calibrated items at theta")
+    rasch_scaled = models.FloatField(help_text="Rasch score on 0-75 scale (Milliy Sertifikat)")
+    letter_grade = models.CharField(max_length=2)
+
+    class Meta:
+        unique_together = ('exam', 'raw_score')
+        ordering = ['raw_score']
+
+    def __str__(self):
+        return f"{self.exam} | {self.raw_score} → {self.rasch_scaled} ({self.letter_grade})"
+
+
+class ExamScoreAggregate(models.Model):
+    """Running totals over an exam's submitted sessions (O(1) exam average for Elo)."""
+    exam = models.OneToOneField(MockExam, on_delete=models.CASCADE, primary_key=True, related_name='score_aggregate')
+    submitted_count = models.IntegerField(default=0)
+    correct_sum = models.IntegerField(default=0, help_text="Correct answers summed over submitted sessions")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.exam} | {self.submitted_count} sessions, {self.correct_sum} correct"
+
+
 class Question(models.Model):
     class AnswerType(models.TextChoices):
         MULTIPLE_CHOICE = 'multiple_choice', 'Ko\'p tanlov'
@@ -183,6 +315,17 @@ class Question(models.Model):
     def __str__(self):
         return f"[{self.topic}] {self.text[:60]}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .question_sampler import invalidate
+        invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .question_sampler import invalidate
+        invalidate()
+        return result
+
 
 class PracticeSession(models.Model):
     class Mode(models.TextChoices):
@@ -252,3 +395,24 @@ class StudentStreak(models.Model):
 
     def __str__(self):
         return f"{self.student.full_name}: {self.current_streak} streak"
+
+
+class BroadcastDelivery(models.Model):
+    """Outcome of one broadcast message to one student chat."""
+    class Status(models.TextChoices):
+        SENT = 'sent', 'Yuborildi'
+        BLOCKED = 'blocked', 'Bloklangan'
+        CHAT_NOT_FOUND = 'chat_not_found', 'Chat topilmadi'
+        FAILED = 'failed', 'Xatolik'
+
+    broadcast = models.CharField(max_length=64, help_text="Broadcast key, e.g. exam_<id>")
+    telegram_id = models.BigIntegerField()
+    status = models.CharField(max_length=16, choices=Status.choices)
+    attempts = models.PositiveSmallIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('broadcast', 'telegram_id')
+
+    def __str__(self):
+        return f"{self.broadcast} | {self.telegram_id}: {self.status}"
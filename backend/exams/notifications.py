@@ -1,4 +1,3 @@
-import asyncio
 import logging
 
 from django.conf import settings
@@ -6,10 +5,10 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
-def notify_new_exam(exam):
+def notify_new_exam(exam, key=None):
     """
     Notify all registered users and channel about a new exam.
-    Called from Celery task.
+    Called from Celery task; `key` names the broadcast (default exam_<id>).
     """
     bot_token = getattr(settings, 'TELEGRAM_BOT_TOKEN', '')
     channel_id = getattr(settings, 'TELEGRAM_CHANNEL_ID', None)
@@ -28,7 +27,7 @@ def notify_new_exam(exam):
     )
 
     try:
-        from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
+        from telegram import InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
     except ImportError:
         logger.warning("python-telegram-bot not installed, skipping notifications")
         return
@@ -41,38 +40,11 @@ def notify_new_exam(exam):
         )]
     ])
 
-    async def _send_messages():
-        bot = Bot(token=bot_token)
+    from .broadcast import broadcast
+    from .telegram_client import get_bot
 
-        # Send to channel first
-        if channel_id:
-            try:
-                await bot.send_message(
-                    chat_id=channel_id, text=text,
-                    parse_mode='HTML', reply_markup=keyboard,
-                )
-                logger.info("Sent exam notification to channel %s", channel_id)
-            except Exception as e:
-                logger.error("Channel notification failed: %s", e)
-
-        # Send DMs to all registered students
-        from exams.models import Student
-        telegram_ids = list(Student.objects.values_list('telegram_id', flat=True))
-        sent = 0
-        for tid in telegram_ids:
-            try:
-                await bot.send_message(
-                    chat_id=tid, text=text,
-                    parse_mode='HTML', reply_markup=keyboard,
-                )
-                sent += 1
-            except Exception as e:
-                logger.warning("DM to %s failed: %s", tid, e)
-
-        logger.info("Sent exam notification DMs to %d/%d students", sent, len(telegram_ids))
-
-    loop = asyncio.new_event_loop()
-    try:
-        loop.run_until_complete(_send_messages())
-    finally:
-        loop.close()
+    # Keyed per run so a retried task resumes instead of re-messaging everyone
+    broadcast(
+        get_bot(), key=key or f'exam_{exam.id}', text=text,
+        reply_markup=keyboard, channel_id=channel_id,
+    )
@@ -0,0 +1,151 @@
+"""
+Web-optimized exam PDFs.
+
+prepare() writes a linearized copy of the uploaded PDF and splits it into
+one-page PDFs (ExamPdfPage), so students fetch page-sized objects on demand
+instead of one large file. Pages stay PDFs, not images, so the text layer
+used for the question -> page mapping in PdfViewer keeps working.
+
+warm() loads the manifest and every page into the shared cache shortly
+before scheduled_start, so the rush at exam start is served from Redis.
+Cache misses fall back to the stored page files.
+"""
+
+import io
+import logging
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LEAD = timedelta(minutes=10)  # Warm the cache this long before scheduled_start
+CACHE_GRACE = timedelta(hours=1)  # Keep pages cached this long after scheduled_end
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def _manifest_key(exam_id):
+    return f'pdf_manifest_{exam_id}'
+
+
+def _page_key(exam_id, page_number):
+    return f'pdf_page_{exam_id}_{page_number}'
+
+
+def _cache_timeout(exam):
+    remaining = exam.scheduled_end + CACHE_GRACE - timezone.now()
+    return max(int(remaining.total_seconds()), 60)
+
+
+def invalidate(exam_id, page_count):
+    cache.delete_many(
+        [_manifest_key(exam_id)] + [_page_key(exam_id, n) for n in range(1, page_count + 1)]
+    )
+
+
+def _delete_files(files):
+    for storage, name in files:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete old PDF file %s', name)
+
+
+def prepare(exam):
+    """Linearize exam.pdf_file and store one compressed PDF per page. Returns the page count."""
+    import pikepdf
+    from .models import ExamPdfPage
+
+    save_options = {
+        'compress_streams': True,
+        'object_stream_mode': pikepdf.ObjectStreamMode.generate,
+    }
+    with exam.pdf_file.open('rb') as f, pikepdf.open(f) as pdf:
+        web = io.BytesIO()
+        pdf.save(web, linearize=True, **save_options)
+        pages = []
+        for page in pdf.pages:
+            single = pikepdf.new()
+            single.pages.append(page)
+            buf = io.BytesIO()
+            single.save(buf, **save_options)
+            pages.append(buf.getvalue())
+
+    old_count = exam.pdf_pages.count()
+    with transaction.atomic():
+        # Old files go only once the new rows are committed; a rollback keeps them
+        old_files = [(old.file.storage, old.file.name) for old in exam.pdf_pages.all()]
+        if exam.pdf_web:
+            old_files.append((exam.pdf_web.storage, exam.pdf_web.name))
+        exam.pdf_pages.all().delete()
+
+        exam.pdf_web.save(f'{exam.id}.pdf', ContentFile(web.getvalue()), save=False)
+        rows = []
+        for page_number, data in enumerate(pages, start=1):
+            row = ExamPdfPage(exam=exam, page_number=page_number, size=len(data))
+            row.file.save(f'{page_number}.pdf', ContentFile(data), save=False)
+            rows.append(row)
+        ExamPdfPage.objects.bulk_create(rows)
+        exam.pdf_prepared_at = timezone.now()
+        exam.save(update_fields=['pdf_web', 'pdf_prepared_at'])
+        transaction.on_commit(lambda: _delete_files(old_files))
+
+    invalidate(exam.id, max(old_count, len(pages)))
+    return len(pages)
+
+
+def manifest(exam):
+    """Page list for PdfViewer; ready is False until prepare() has run."""
+    data = cache.get(_manifest_key(exam.id))
+    if data is None:
+        pages = list(exam.pdf_pages.values_list('page_number', 'size'))
+        data = {
+            'ready': bool(pages),
+            'page_count': len(pages),
+            # Paths are relative to the API root, like the frontend's api client
+            'pages': [
+                {'page': n, 'size': size, 'url': f'/exams/{exam.id}/pdf/pages/{n}/'}
+                for n, size in pages
+            ],
+        }
+        cache.set(_manifest_key(exam.id), data, timeout=_cache_timeout(exam))
+    return data
+
+
+def page_bytes(exam, page_number):
+    """Bytes of one page PDF, from the cache or its stored file; None if it does not exist."""
+    from .models import ExamPdfPage
+
+    key = _page_key(exam.id, page_number)
+    data = cache.get(key)
+    if data is None:
+        try:
+            page = ExamPdfPage.objects.get(exam=exam, page_number=page_number)
+            with page.file.open('rb') as f:
+                data = f.read()
+        except (ExamPdfPage.DoesNotExist, FileNotFoundError):
+            return None
+        cache.set(key, data, timeout=_cache_timeout(exam))
+    return data
+
+
+def warm(exam):
+    """Load the manifest and every page into the cache, and read the web copy through the OS cache."""
+    timeout = _cache_timeout(exam)
+    cache.delete(_manifest_key(exam.id))
+    data = manifest(exam)
+    pages = {}
+    for page in exam.pdf_pages.all():
+        with page.file.open('rb') as f:
+            pages[_page_key(exam.id, page.page_number)] = f.read()
+    cache.set_many(pages, timeout=timeout)
+
+    # Proxy-served full downloads (PDF_DELIVERY) read from disk; pull the file into the page cache
+    if exam.pdf_web:
+        with exam.pdf_web.open('rb') as f:
+            while f.read(READ_CHUNK_SIZE):
+                pass
+    return data['page_count']
@@ -1,28 +1,57 @@
+import zlib
+
+from django.conf import settings
 from django.core.cache import cache
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import BasePermission
 from rest_framework_simplejwt.authentication import JWTAuthentication
+from .local_cache import LocalTTLCache
 from .models import Student
 
+STUDENT_AUTH_CACHE_TIMEOUT = 300  # Redis copy; dropped by invalidate_student_auth on changes
+# Every column, so a new field never leaves request.user deferred; the key
+# changes with the field list, so tuples cached under the old shape are ignored
+STUDENT_FIELDS = tuple(field.attname for field in Student._meta.concrete_fields)
+STUDENT_FIELDS_TAG = zlib.crc32(','.join(STUDENT_FIELDS).encode())
+
+# Per-process layer in front of Redis: most requests never leave the worker
+local_students = LocalTTLCache(
+    maxsize=settings.STUDENT_AUTH_LOCAL_CACHE_SIZE,
+    ttl=settings.STUDENT_AUTH_LOCAL_CACHE_TTL,
+)
+
+
+def _student_cache_key(student_id):
+    return f'student_auth_{STUDENT_FIELDS_TAG}_{student_id}'
+
+
+def invalidate_student_auth(student_id):
+    """Drop a cached Student (after a change or delete). Other workers refresh within the local TTL."""
+    local_students.delete(str(student_id))
+    cache.delete(_student_cache_key(student_id))
+
 
 class StudentJWTAuthentication(JWTAuthentication):
     def get_user(self, validated_token):
         student_id = validated_token.get('student_id')
         if not student_id:
             raise AuthenticationFailed('Tokenda student_id mavjud emas')
+        student_id = str(student_id)
 
-        cache_key = f'student_auth_{student_id}'
-        student = cache.get(cache_key)
-        if student is not None:
-            return student
-
-        try:
-            student = Student.objects.get(id=student_id)
-        except Student.DoesNotExist:
-            raise AuthenticationFailed('Talaba topilmadi')
+        # Compact field tuples are cached instead of pickled model instances;
+        # each request gets its own Student built from them
+        values = local_students.get(student_id)
+        if values is None:
+            cache_key = _student_cache_key(student_id)
+            values = cache.get(cache_key)
+            if values is None:
+                values = Student.objects.filter(id=student_id).values_list(*STUDENT_FIELDS).first()
+                if values is None:
+                    raise AuthenticationFailed('Talaba topilmadi')
+                cache.set(cache_key, values, timeout=STUDENT_AUTH_CACHE_TIMEOUT)
+            local_students.set(student_id, values)
 
-        cache.set(cache_key, student, timeout=60)
-        return student
+        return Student.from_db('default', STUDENT_FIELDS, values)
 
 
 class IsStudent(BasePermission):
@@ -1,6 +1,3 @@
-import random
-from collections import defaultdict
-
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
@@ -8,7 +5,8 @@ from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.response import Response
 
-from .models import Question, PracticeSession
+from . import question_sampler
+from .models import PracticeSession
 from .permissions import StudentJWTAuthentication, IsStudent
 from .scoring import normalize_answer
 from .serializers import PracticeSessionSerializer, QuestionResultSerializer
@@ -17,38 +15,6 @@ student_auth = [StudentJWTAuthentication]
 student_perm = [IsStudent]
 
 
-def _assemble_questions(count):
-    """Pick `count` questions balanced by topic."""
-    all_questions = list(Question.objects.all())
-    if len(all_questions) <= count:
-        return all_questions
-
-    by_topic = defaultdict(list)
-    for q in all_questions:
-        by_topic[q.topic].append(q)
-
-    for topic_list in by_topic.values():
-        random.shuffle(topic_list)
-
-    selected = []
-    topics = list(by_topic.keys())
-    random.shuffle(topics)
-    idx = 0
-    while len(selected) < count:
-        topic = topics[idx % len(topics)]
-        if by_topic[topic]:
-            selected.append(by_topic[topic].pop())
-        else:
-            topics.remove(topic)
-            if not topics:
-                break
-            idx = idx % len(topics)
-            continue
-        idx += 1
-
-    return selected
-
-
 @api_view(['POST'])
 @authentication_classes(student_auth)
 @permission_classes(student_perm)
@@ -59,9 +25,9 @@ def start_practice(request):
                         status=status.HTTP_400_BAD_REQUEST)
 
     config = PracticeSession.MODE_CONFIG[mode]
-    questions = _assemble_questions(config['question_count'])
+    question_ids = question_sampler.sample(config['question_count'])
 
-    if not questions:
+    if not question_ids:
         return Response({'error': "Savollar bazasi bo'sh."}, status=status.HTTP_404_NOT_FOUND)
 
     session = PracticeSession.objects.create(
@@ -69,7 +35,7 @@ def start_practice(request):
         mode=mode,
         duration=config['duration'],
     )
-    session.questions.set(questions)
+    session.questions.set(question_ids)
 
     return Response(PracticeSessionSerializer(session).data, status=status.HTTP_201_CREATED)
 
@@ -0,0 +1,93 @@
+"""
+Topic-balanced question sampling for practice sessions.
+
+The question bank is indexed as {topic: [question ids]} and cached under a
+version number that invalidate() bumps on every Question change. Each
+worker also keeps the index in a LocalTTLCache keyed by that version, so a
+practice start costs one small version read instead of a Question table
+scan, and a bump reaches every worker at once. sample() draws ids from the
+index and only those rows are touched afterwards.
+
+A question deleted since the index was built is caught by the existence
+check in sample(), which rebuilds the index and draws again.
+"""
+
+import random
+import uuid
+
+from django.core.cache import cache
+
+from .local_cache import LocalTTLCache
+
+VERSION_KEY = 'question_index_version'
+INDEX_CACHE_TIMEOUT = 60 * 60 * 24  # Safety net; replaced by version bumps
+LOCAL_TTL = 60 * 10
+
+local_index = LocalTTLCache(maxsize=4, ttl=LOCAL_TTL)
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate():
+    """Drop the cached index (Question.save/delete call this; bulk changes must too)."""
+    # Random versions, not a counter: a cache flush must not bring back an old local index
+    cache.set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def topic_index():
+    """{topic: [question id, ...]} for the whole bank."""
+    from .models import Question
+
+    version = _version()
+    index = local_index.get(version)
+    if index is None:
+        key = f'question_index_v{version}'
+        index = cache.get(key)
+        if index is None:
+            index = {}
+            for topic, question_id in Question.objects.values_list('topic', 'id').order_by():
+                index.setdefault(topic, []).append(str(question_id))
+            cache.set(key, index, timeout=INDEX_CACHE_TIMEOUT)
+        local_index.set(version, index)
+    return index
+
+
+def _draw(index, count):
+    """Round-robin over shuffled topics, taking random ids from each until `count` are picked."""
+    total = sum(len(ids) for ids in index.values())
+    if total <= count:
+        return [question_id for ids in index.values() for question_id in ids]
+
+    # No topic can contribute more than `count`, so sample that many at most
+    pools = {topic: random.sample(ids, min(len(ids), count)) for topic, ids in index.items() if ids}
+    topics = list(pools)
+    random.shuffle(topics)
+
+    selected = []
+    while len(selected) < count and topics:
+        for topic in list(topics):
+            if len(selected) == count:
+                break
+            if pools[topic]:
+                selected.append(pools[topic].pop())
+            else:
+                topics.remove(topic)
+    return selected
+
+
+def sample(count):
+    """Ids of `count` questions balanced by topic (fewer if the bank is smaller)."""
+    from .models import Question
+
+    ids = _draw(topic_index(), count)
+    existing = set(str(pk) for pk in Question.objects.filter(id__in=ids).values_list('id', flat=True))
+    if len(existing) < len(ids):
+        invalidate()  # Index is stale: a question was deleted
+        ids = _draw(topic_index(), count)
+    return ids
@@ -16,6 +16,17 @@ def rasch_probability(theta, beta):
     return math.exp(x) / (1 + math.exp(x))
 
 
+def rasch_probabilities(thetas, betas):
+    """Vectorized P(correct | theta, beta) over broadcastable arrays.
+
+    Same clamped logistic as rasch_probability, but array-in/array-out so
+    estimators evaluate every item (or every student) in one NumPy call.
+    """
+    x = np.asarray(thetas, dtype=float) - np.asarray(betas, dtype=float)
+    x = np.clip(x, -30, 30)
+    return 1.0 / (1.0 + np.exp(-x))
+
+
 def estimate_theta(responses, betas, max_iter=50, tol=0.001):
     """Estimate ability theta via Newton-Raphson MLE for a single student.
 
@@ -39,7 +50,7 @@ def estimate_theta(responses, betas, max_iter=50, tol=0.001):
     theta = math.log(p / (1 - p))
 
     for _ in range(max_iter):
-        probs = np.array([rasch_probability(theta, b) for b in betas])
+        probs = rasch_probabilities(theta, betas)
         d1 = float(np.sum(responses - probs))
         d2 = float(-np.sum(probs * (1 - probs)))
 
@@ -56,11 +67,14 @@ def estimate_theta(responses, betas, max_iter=50, tol=0.001):
     return float(theta)
 
 
-def estimate_item_difficulties(matrix, max_iter=100, tol=0.01):
+def estimate_item_difficulties(matrix, max_iter=100, tol=0.01, batched=True):
     """Joint Maximum Likelihood Estimation (JMLE) for item difficulties.
 
     Args:
         matrix: NxJ binary numpy array (students x items), NaN for missing
+        batched: update all thetas and all betas per iteration with masked
+            NxJ array operations. False falls back to the per-student /
+            per-item Newton-Raphson loops (same estimates, much slower).
 
     Returns:
         tuple: (betas, thetas) — calibrated item difficulties and student abilities
@@ -79,21 +93,36 @@ def estimate_item_difficulties(matrix, max_iter=100, tol=0.01):
     student_prop = np.clip(student_prop, 0.01, 0.99)
     thetas = np.log(student_prop / (1 - student_prop))
 
-    for iteration in range(max_iter):
-        for n in range(N):
-            mask = valid[n]
-            if mask.sum() == 0:
-                continue
-            thetas[n] = estimate_theta(matrix_filled[n, mask], betas[mask])
+    answered_students = valid.any(axis=1)
+    answered_items = valid.any(axis=0)
 
+    for iteration in range(max_iter):
         old_betas = betas.copy()
-        for j in range(J):
-            mask = valid[:, j]
-            if mask.sum() == 0:
-                continue
-            betas[j] = _estimate_single_beta(
-                matrix_filled[mask, j], thetas[mask]
+
+        if batched:
+            new_thetas = _estimate_thetas_batch(matrix_filled, valid, betas)
+            thetas[answered_students] = new_thetas[answered_students]
+
+            # P(theta - beta) == P(-beta - (-theta)): an item's difficulty is
+            # the negated "ability" of the transposed problem.
+            new_betas = -_estimate_thetas_batch(
+                matrix_filled.T, valid.T, -thetas, max_iter=30,
             )
+            betas[answered_items] = new_betas[answered_items]
+        else:
+            for n in range(N):
+                mask = valid[n]
+                if mask.sum() == 0:
+                    continue
+                thetas[n] = estimate_theta(matrix_filled[n, mask], betas[mask])
+
+            for j in range(J):
+                mask = valid[:, j]
+                if mask.sum() == 0:
+                    continue
+                betas[j] = _estimate_single_beta(
+                    matrix_filled[mask, j], thetas[mask]
+                )
 
         betas -= betas.mean()
         old_betas_centered = old_betas - old_betas.mean()
@@ -105,6 +134,51 @@ def estimate_item_difficulties(matrix, max_iter=100, tol=0.01):
     return betas, thetas
 
 
+def _estimate_thetas_batch(responses, valid, betas, max_iter=50, tol=0.001):
+    """Matrix form of estimate_theta: Newton-Raphson MLE for every row at once.
+
+    Args:
+        responses: NxJ binary array with missing cells filled with 0
+        valid: NxJ boolean mask of observed cells
+        betas: length-J item difficulties
+
+    Each row converges independently with the same start value, step clamp,
+    extreme-score rule and stopping criteria as estimate_theta. Rows with no
+    observed items come back as NaN.
+    """
+    n_obs = valid.sum(axis=1)
+    totals = responses.sum(axis=1)
+
+    p = np.clip(totals / np.maximum(n_obs, 1), 0.01, 0.99)
+    thetas = np.log(p / (1 - p))
+
+    active = (totals > 0) & (totals < n_obs)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+
+        probs = np.where(valid, rasch_probabilities(thetas[:, None], betas[None, :]), 0.0)
+        d1 = totals - probs.sum(axis=1)
+        d2 = -np.sum(probs * (1 - probs), axis=1)
+
+        active &= np.abs(d2) >= 1e-10
+        delta = np.zeros_like(thetas)
+        np.divide(d1, d2, out=delta, where=active)
+        thetas = np.where(active, np.clip(thetas - delta, -5.0, 5.0), thetas)
+
+        active &= np.abs(delta) >= tol
+
+    with np.errstate(invalid='ignore'):
+        observed_betas = np.broadcast_to(betas, valid.shape)
+        lowest = np.where(valid, observed_betas, np.inf).min(axis=1)
+        highest = np.where(valid, observed_betas, -np.inf).max(axis=1)
+        thetas = np.where(totals == 0, lowest - 2.0, thetas)
+        thetas = np.where(totals == n_obs, highest + 2.0, thetas)
+        thetas = np.where(n_obs == 0, np.nan, thetas)
+
+    return thetas
+
+
 def _estimate_single_beta(responses, thetas, max_iter=30, tol=0.001):
     """Newton-Raphson MLE for a single item's difficulty given thetas."""
     responses = np.asarray(responses, dtype=float)
@@ -122,7 +196,7 @@ def _estimate_single_beta(responses, thetas, max_iter=30, tol=0.001):
     beta = -math.log(p / (1 - p))
 
     for _ in range(max_iter):
-        probs = np.array([rasch_probability(t, beta) for t in thetas])
+        probs = rasch_probabilities(thetas, beta)
         d1 = float(np.sum(probs - responses))
         d2 = float(-np.sum(probs * (1 - probs)))
 
@@ -139,6 +213,37 @@ def _estimate_single_beta(responses, thetas, max_iter=30, tol=0.001):
     return float(beta)
 
 
+def build_score_table(betas):
+    """Raw score -> ability conversion table for a calibrated item set.
+
+    With complete responses the raw score is a sufficient statistic for
+    theta, so every score 0..J maps to exactly one estimate_theta result.
+
+    Returns:
+        list of dicts with raw_score, theta, standard_error and expected_score
+    """
+    betas = np.asarray(betas, dtype=float)
+    n_items = len(betas)
+
+    table = []
+    for raw_score in range(n_items + 1):
+        # Any response vector with this many correct answers gives the same MLE
+        responses = np.zeros(n_items)
+        responses[:raw_score] = 1.0
+        theta = estimate_theta(responses, betas)
+
+        probs = rasch_probabilities(theta, betas)
+        information = float(np.sum(probs * (1 - probs)))
+        table.append({
+            'raw_score': raw_score,
+            'theta': theta,
+            'standard_error': 1.0 / math.sqrt(information) if information > 1e-10 else None,
+            'expected_score': float(probs.sum()),
+        })
+
+    return table
+
+
 def compute_item_fit(item_idx, matrix, thetas, betas):
     """Compute infit and outfit mean-square statistics for an item.
 
@@ -157,7 +262,7 @@ def compute_item_fit(item_idx, matrix, thetas, betas):
     if n == 0:
         return {'infit': 1.0, 'outfit': 1.0}
 
-    probs = np.array([rasch_probability(t, beta) for t in student_thetas])
+    probs = rasch_probabilities(student_thetas, beta)
     variances = probs * (1 - probs)
 
     residuals = responses - probs
@@ -0,0 +1,78 @@
+"""
+Shared cache for exam results.
+
+Once an exam has closed, a session's results only change when the exam is
+recalibrated or its answer key is re-uploaded. The rendered results payload
+is cached per session and the exam's scoring key (answer key, ItemDifficulty
+betas and ScoreConversion table) per exam. Both are keyed by a per-exam
+version that invalidate_exam() bumps, so one recalibration replaces every
+entry of that exam at once.
+"""
+
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.http import quote_etag
+
+RESULTS_CACHE_TIMEOUT = 60 * 60 * 24  # Safety net; entries are replaced by version bumps
+
+
+def _version_key(exam_id):
+    return f'results_version_{exam_id}'
+
+
+def exam_version(exam_id):
+    version = cache.get(_version_key(exam_id))
+    if version is None:
+        cache.add(_version_key(exam_id), 1, timeout=None)
+        version = cache.get(_version_key(exam_id), 1)
+    return version
+
+
+def invalidate_exam(exam_id):
+    """Drop cached results and scoring key of an exam (after calibration or answer key changes)."""
+    try:
+        cache.incr(_version_key(exam_id))
+    except ValueError:
+        cache.add(_version_key(exam_id), 1, timeout=None)
+
+
+def _results_key(session):
+    return f'results_{session.id}_v{exam_version(session.exam_id)}'
+
+
+def invalidate_session(session):
+    """Drop one session's cached results (after its Elo snapshot is written)."""
+    cache.delete(_results_key(session))
+
+
+def scoring_key(exam_id):
+    from .scoring import load_scoring_key
+
+    key = f'scoring_key_{exam_id}_v{exam_version(exam_id)}'
+    data = cache.get(key)
+    if data is None:
+        data = load_scoring_key(exam_id)
+        cache.set(key, data, timeout=RESULTS_CACHE_TIMEOUT)
+    return data
+
+
+def make_entry(payload, last_modified=None):
+    """Wrap a results payload with the validators sent as ETag/Last-Modified."""
+    body = json.dumps(payload, cls=DjangoJSONEncoder, sort_keys=True)
+    return {
+        'payload': payload,
+        'etag': quote_etag(hashlib.md5(body.encode()).hexdigest()),
+        'last_modified': int(last_modified if last_modified is not None else time.time()),
+    }
+
+
+def get_results(session):
+    return cache.get(_results_key(session))
+
+
+def set_results(session, entry):
+    cache.set(_results_key(session), entry, timeout=RESULTS_CACHE_TIMEOUT)
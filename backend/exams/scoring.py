@@ -2,8 +2,8 @@ import unicodedata
 
 import numpy as np
 
-from .models import StudentAnswer, CorrectAnswer, ItemDifficulty
-from .rasch import rasch_probability, estimate_theta
+from .models import StudentAnswer, CorrectAnswer, ItemDifficulty, ScoreConversion
+from .rasch import rasch_probabilities, estimate_theta, build_score_table
 
 SINGLE_QUESTIONS = range(1, 36)
 PAIRED_QUESTIONS = range(36, 46)
@@ -56,28 +56,90 @@ def compute_score(session, prefetched_answers=None):
     }
 
 
-def compute_rasch_score(session):
+def stored_score(session):
+    """Score dict (same shape as compute_score) from the session's denormalized columns.
+
+    Sessions graded before the columns existed fall back to compute_score
+    until backfill_session_scores has been run.
+    """
+    if session.points is None or session.exercises_correct is None:
+        return compute_score(session)
+    return {
+        'exercises_correct': session.exercises_correct,
+        'exercises_total': EXERCISES_TOTAL,
+        'points': session.points,
+        'points_total': POINTS_TOTAL,
+    }
+
+
+def load_scoring_key(exam_id):
+    """Answer key, calibrated item difficulties and score table of an exam as plain dicts.
+
+    Cached per exam by results_cache.scoring_key().
+    """
+    return {
+        'answers': {
+            (ca.question_number, ca.sub_part): ca.correct_answer
+            for ca in CorrectAnswer.objects.filter(exam_id=exam_id)
+        },
+        'betas': {
+            (d.question_number, d.sub_part): d.beta
+            for d in ItemDifficulty.objects.filter(exam_id=exam_id)
+        },
+        'conversions': {
+            c.raw_score: {
+                'theta': c.theta,
+                'expected_score': c.expected_score,
+                'rasch_scaled': c.rasch_scaled,
+                'letter_grade': c.letter_grade,
+            }
+            for c in ScoreConversion.objects.filter(exam_id=exam_id)
+        },
+    }
+
+
+def compute_rasch_score(session, scoring_key=None):
     """Compute Rasch-model score for a submitted session.
 
     Returns dict with theta, rasch_percentage, expected_score, raw_percentage,
-    or None if no ItemDifficulty records exist for the exam.
+    rasch_scaled and letter_grade, or None if the exam has not been calibrated.
+
+    Unanswered items count as incorrect, so the raw score fully determines
+    theta and the result is read from the exam's ScoreConversion table.
+    Falls back to Newton-Raphson over the calibrated items when no table
+    covers the session (e.g. the answer key changed after calibration).
+    *scoring_key* is the exam's load_scoring_key() dict, loaded when omitted.
     """
-    difficulties = list(
-        ItemDifficulty.objects.filter(exam=session.exam)
-        .order_by('question_number', 'sub_part')
-    )
-    if not difficulties:
+    if scoring_key is None:
+        scoring_key = load_scoring_key(session.exam_id)
+    conversions = scoring_key['conversions']
+    if conversions:
+        raw_correct = session.points
+        if raw_correct is None:
+            raw_correct = StudentAnswer.objects.filter(session=session, is_correct=True).count()
+        conversion = conversions.get(raw_correct)
+        if conversion is not None:
+            total_items = max(conversions)
+            return {
+                'theta': round(conversion['theta'], 2),
+                'rasch_percentage': round(conversion['expected_score'] / total_items * 100, 1),
+                'expected_score': round(conversion['expected_score'], 1),
+                'raw_percentage': round(raw_correct / total_items * 100, 1),
+                'rasch_scaled': conversion['rasch_scaled'],
+                'letter_grade': conversion['letter_grade'],
+            }
+
+    return _estimate_rasch_score(session, scoring_key)
+
+
+def _estimate_rasch_score(session, scoring_key=None):
+    """Newton-Raphson path of compute_rasch_score for sessions without a score table."""
+    if scoring_key is None:
+        scoring_key = load_scoring_key(session.exam_id)
+    item_map = scoring_key['betas']
+    if not item_map:
         return None
 
-    # Build item key → beta mapping
-    item_map = {(d.question_number, d.sub_part): d.beta for d in difficulties}
-
-    # Get correct answers for this exam to know the full item set
-    correct_answers = list(
-        CorrectAnswer.objects.filter(exam=session.exam)
-        .order_by('question_number', 'sub_part')
-    )
-
     # Build student's binary response vector aligned with item difficulties
     student_answers = {
         (a.question_number, a.sub_part): a.is_correct
@@ -86,8 +148,7 @@ def compute_rasch_score(session):
 
     responses = []
     betas = []
-    for ca in correct_answers:
-        key = (ca.question_number, ca.sub_part)
+    for key in sorted(scoring_key['answers'], key=lambda k: (k[0], k[1] or '')):
         if key in item_map:
             betas.append(item_map[key])
             responses.append(1.0 if student_answers.get(key, False) else 0.0)
@@ -101,19 +162,39 @@ def compute_rasch_score(session):
     theta = estimate_theta(responses_arr, betas_arr)
 
     # Expected score = sum of P(correct) for each item at this theta
-    expected_score = sum(rasch_probability(theta, b) for b in betas)
+    expected_score = float(rasch_probabilities(theta, betas_arr).sum())
 
     raw_correct = responses_arr.sum()
     total_items = len(betas)
+    rasch_scaled = compute_rasch_scaled_score(theta)
 
     return {
         'theta': round(theta, 2),
         'rasch_percentage': round(expected_score / total_items * 100, 1),
         'expected_score': round(expected_score, 1),
         'raw_percentage': round(raw_correct / total_items * 100, 1),
+        'rasch_scaled': rasch_scaled,
+        'letter_grade': compute_letter_grade(rasch_scaled),
     }
 
 
+def build_score_conversions(exam, betas):
+    """Build unsaved ScoreConversion rows for an exam from calibrated betas."""
+    conversions = []
+    for row in build_score_table(betas):
+        rasch_scaled = compute_rasch_scaled_score(row['theta'])
+        conversions.append(ScoreConversion(
+            exam=exam,
+            raw_score=row['raw_score'],
+            theta=row['theta'],
+            standard_error=row['standard_error'],
+            expected_score=row['expected_score'],
+            rasch_scaled=rasch_scaled,
+            letter_grade=compute_letter_grade(rasch_scaled),
+        ))
+    return conversions
+
+
 _GRADE_TABLE = [
     (70, 'A+'),
     (64, 'A'),
@@ -1,7 +1,7 @@
 from django.db import transaction
 from rest_framework import serializers
 
-from .models import MockExam, CorrectAnswer, Question, PracticeSession
+from .models import MockExam, CorrectAnswer, Question, PracticeSession, ScoreConversion
 
 
 class MockExamSerializer(serializers.ModelSerializer):
@@ -58,6 +58,8 @@ class BulkCorrectAnswerSerializer(serializers.Serializer):
         exam = self.context['exam']
         answers = [CorrectAnswer(exam=exam, **data) for data in validated_data['answers']]
         CorrectAnswer.objects.filter(exam=exam).delete()
+        # Score table was calibrated against the old key; results fall back to Newton-Raphson
+        ScoreConversion.objects.filter(exam=exam).delete()
         return CorrectAnswer.objects.bulk_create(answers)
 
 
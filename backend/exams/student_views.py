@@ -1,22 +1,42 @@
+import re
+from datetime import timedelta
+from urllib.parse import quote
+
+from django.conf import settings
 from django.db import transaction
-from django.http import FileResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework import status
 from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from .elo import update_elo_after_submission
+from . import answer_buffer, pdf_pages, results_cache
+from .elo import record_graded_session
 from .models import MockExam, ExamSession, StudentAnswer, CorrectAnswer, EloHistory
 from .permissions import StudentJWTAuthentication, IsStudent
-from .scoring import compute_score, compute_rasch_score, normalize_answer, compute_letter_grade, compute_rasch_scaled_score
+from .scoring import (
+    compute_score, stored_score, compute_rasch_score, compute_letter_grade, normalize_answer,
+)
 from .serializers import MockExamSerializer
 
 student_auth = [StudentJWTAuthentication]
 student_perm = [IsStudent]
 
 ALREADY_SUBMITTED_MSG = 'Allaqachon topshirilgan'
+MAX_BULK_ANSWERS = 100
+
+# Columns needed to check a session's status and deadline
+SESSION_DEADLINE_FIELDS = (
+    'id', 'status', 'started_at', 'deadline', 'student_id', 'is_auto_submitted',
+    'exam__duration', 'exam__scheduled_end',
+)
+DEADLINE_GRACE = timedelta(seconds=30)  # Network grace for saves racing the deadline
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 @api_view(['GET'])
@@ -36,25 +56,61 @@ def exam_detail(request, exam_id):
 @permission_classes(student_perm)
 def exam_pdf(request, exam_id):
     exam = get_object_or_404(MockExam, id=exam_id)
-
-    # Only serve the PDF if the exam is currently open
-    now = timezone.now()
-    if not (exam.scheduled_start <= now <= exam.scheduled_end):
-        return Response({'error': 'Imtihon hozirda ochiq emas'}, status=status.HTTP_403_FORBIDDEN)
-
-    # Require an active (in-progress) or submitted session for this student
-    if not ExamSession.objects.filter(student=request.user, exam=exam).exists():
-        return Response({'error': 'Avval imtihonni boshlang'}, status=status.HTTP_403_FORBIDDEN)
+    error = _pdf_access_error(request, exam)
+    if error:
+        return error
 
     if not exam.pdf_file:
         return Response({'error': 'PDF fayl topilmadi'}, status=status.HTTP_404_NOT_FOUND)
 
-    try:
-        f = exam.pdf_file.open()
-    except FileNotFoundError:
-        return Response({'error': 'PDF fayl topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+    # Linearized copy from prepare_exam_pdf renders its first page before the rest arrives
+    pdf = exam.pdf_web or exam.pdf_file
+    if settings.PDF_DELIVERY in ('x-accel', 'x-sendfile'):
+        # The proxy sends the bytes (and answers Range requests) itself
+        response = HttpResponse(content_type='application/pdf')
+        if settings.PDF_DELIVERY == 'x-accel':
+            response['X-Accel-Redirect'] = settings.PDF_ACCEL_PREFIX + quote(pdf.name)
+        else:
+            response['X-Sendfile'] = pdf.path
+    else:
+        try:
+            f = pdf.open()
+        except FileNotFoundError:
+            return Response({'error': 'PDF fayl topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+        response = _ranged_file_response(request, f, pdf.size, 'application/pdf')
 
-    response = FileResponse(f, content_type='application/pdf')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@api_view(['GET'])
+@authentication_classes(student_auth)
+@permission_classes(student_perm)
+def exam_pdf_manifest(request, exam_id):
+    exam = get_object_or_404(MockExam, id=exam_id)
+    error = _pdf_access_error(request, exam)
+    if error:
+        return error
+
+    response = Response(pdf_pages.manifest(exam))
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@api_view(['GET'])
+@authentication_classes(student_auth)
+@permission_classes(student_perm)
+def exam_pdf_page(request, exam_id, page_number):
+    exam = get_object_or_404(MockExam, id=exam_id)
+    error = _pdf_access_error(request, exam)
+    if error:
+        return error
+
+    data = pdf_pages.page_bytes(exam, page_number)
+    if data is None:
+        return Response({'error': 'Sahifa topilmadi'}, status=status.HTTP_404_NOT_FOUND)
+
+    response = HttpResponse(data, content_type='application/pdf')
     response['Cache-Control'] = 'no-store'
     return response
 
@@ -77,6 +133,16 @@ def start_exam(request, exam_id):
             return Response({'error': ALREADY_SUBMITTED_MSG}, status=status.HTTP_403_FORBIDDEN)
         return Response(_session_payload(session, exam))
 
+    # Dashboard shows the upcoming exam as taken from now on
+    from .dashboard_views import invalidate_dashboard
+    transaction.on_commit(lambda: invalidate_dashboard(request.user.id))
+
+    if settings.AUTO_SUBMIT_ETA_TASKS:
+        from .tasks import auto_submit_session
+        transaction.on_commit(
+            lambda: auto_submit_session.apply_async((str(session.id),), eta=session.deadline)
+        )
+
     return Response(_session_payload(session, exam), status=status.HTTP_201_CREATED)
 
 
@@ -84,54 +150,41 @@ def start_exam(request, exam_id):
 @authentication_classes(student_auth)
 @permission_classes(student_perm)
 def save_answer(request, session_id):
-    answer = request.data.get('answer')
-    sub_part = request.data.get('sub_part') or None
-
-    try:
-        question_number = int(request.data.get('question_number'))
-    except (TypeError, ValueError):
-        return Response({'error': 'Savol raqami butun son bo\'lishi kerak'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if question_number < 1 or question_number > 45:
-        return Response({'error': 'Savol raqami 1 dan 45 gacha bo\'lishi kerak'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if not answer or not isinstance(answer, str):
-        return Response({'error': 'Javob talab qilinadi'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if len(answer) > 500:
-        return Response({'error': 'Javob 500 belgidan oshmasligi kerak'}, status=status.HTTP_400_BAD_REQUEST)
-
-    if sub_part and sub_part not in ('a', 'b'):
-        return Response({'error': 'sub_part faqat "a" yoki "b" bo\'lishi mumkin'}, status=status.HTTP_400_BAD_REQUEST)
-
-    # Questions 1-35 should not have sub_part; 36-45 require it
-    if question_number <= 35 and sub_part:
-        return Response({'error': '1-35 savollar uchun sub_part kerak emas'}, status=status.HTTP_400_BAD_REQUEST)
+    question_number, sub_part, answer, error = _validate_answer(request.data)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
-    if question_number >= 36 and not sub_part:
-        return Response({'error': '36-45 savollar uchun sub_part ("a" yoki "b") talab qilinadi'}, status=status.HTTP_400_BAD_REQUEST)
+    if answer_buffer.is_enabled():
+        # Write-behind: no row lock, answer lands in Redis and is flushed in bulk
+        session = get_object_or_404(
+            ExamSession.objects.select_related('exam').only(*SESSION_DEADLINE_FIELDS),
+            id=session_id, student=request.user,
+        )
+        if session.status == ExamSession.Status.SUBMITTED:
+            return Response({'error': 'Imtihon allaqachon topshirilgan'}, status=status.HTTP_403_FORBIDDEN)
+        if not _is_past_deadline(session, timezone.now()) and answer_buffer.buffer_answer(
+            session.id, question_number, sub_part, answer,
+        ):
+            return Response({'message': 'Javob saqlandi'})
+        # Past the deadline, or a submit closed the buffer: the locked path below
+        # auto-submits, rejects, or (if that submit rolled back) saves directly
 
     with transaction.atomic():
         session = get_object_or_404(
-            ExamSession.objects.select_for_update().select_related('exam').only(
-                'id', 'status', 'started_at', 'student_id', 'is_auto_submitted',
-                'exam__duration', 'exam__scheduled_end',
-            ),
+            ExamSession.objects.select_for_update().select_related('exam').only(*SESSION_DEADLINE_FIELDS),
             id=session_id, student=request.user,
         )
 
         if session.status == ExamSession.Status.SUBMITTED:
             return Response({'error': 'Imtihon allaqachon topshirilgan'}, status=status.HTTP_403_FORBIDDEN)
 
-        now = timezone.now()
-        elapsed_seconds = (now - session.started_at).total_seconds()
-        remaining_at_start = (session.exam.scheduled_end - session.started_at).total_seconds()
-        effective_duration_seconds = min(session.exam.duration * 60, remaining_at_start)
-
-        if elapsed_seconds > effective_duration_seconds + 30:  # 30s grace for network
+        if _is_past_deadline(session, timezone.now()):
             _submit_session(session, auto=True)
             return Response({'error': 'Vaqt tugadi, imtihon avtomatik topshirildi'}, status=status.HTTP_403_FORBIDDEN)
 
+        if answer_buffer.is_enabled():
+            answer_buffer.flush_session(session)  # Older buffered answers must not overwrite this one later
+
         StudentAnswer.objects.update_or_create(
             session=session,
             question_number=question_number,
@@ -141,6 +194,72 @@ def save_answer(request, session_id):
     return Response({'message': 'Javob saqlandi'})
 
 
+@api_view(['POST'])
+@authentication_classes(student_auth)
+@permission_classes(student_perm)
+def save_answers_bulk(request, session_id):
+    """Save many answers in one request (e.g. an offline queue replayed on reconnect).
+
+    Items are validated individually and reported with a per-item status;
+    valid ones are written under a single session lock and deadline check.
+    """
+    items = request.data.get('answers')
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'answers ro\'yxati talab qilinadi'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(items) > MAX_BULK_ANSWERS:
+        return Response(
+            {'error': f'Bir so\'rovda {MAX_BULK_ANSWERS} tadan ortiq javob yuborib bo\'lmaydi'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    results = []
+    answers = {}
+    for item in items:
+        if not isinstance(item, dict):
+            results.append({'status': 'invalid', 'error': 'Noto\'g\'ri format'})
+            continue
+        question_number, sub_part, answer, error = _validate_answer(item)
+        if error:
+            results.append({
+                'question_number': item.get('question_number'),
+                'sub_part': item.get('sub_part') or None,
+                'status': 'invalid',
+                'error': error,
+            })
+            continue
+        answers[(question_number, sub_part)] = answer  # later items win, like sequential saves
+        results.append({'question_number': question_number, 'sub_part': sub_part, 'status': 'saved'})
+
+    if answer_buffer.is_enabled():
+        session = get_object_or_404(
+            ExamSession.objects.select_related('exam').only(*SESSION_DEADLINE_FIELDS),
+            id=session_id, student=request.user,
+        )
+        if session.status == ExamSession.Status.SUBMITTED:
+            return Response({'error': 'Imtihon allaqachon topshirilgan'}, status=status.HTTP_403_FORBIDDEN)
+        if not _is_past_deadline(session, timezone.now()):
+            if not answers or answer_buffer.buffer_answers(session.id, answers):
+                return Response({'saved': len(answers), 'results': results})
+
+    with transaction.atomic():
+        session = get_object_or_404(
+            ExamSession.objects.select_for_update().select_related('exam').only(*SESSION_DEADLINE_FIELDS),
+            id=session_id, student=request.user,
+        )
+
+        if session.status == ExamSession.Status.SUBMITTED:
+            return Response({'error': 'Imtihon allaqachon topshirilgan'}, status=status.HTTP_403_FORBIDDEN)
+
+        if _is_past_deadline(session, timezone.now()):
+            _submit_session(session, auto=True)
+            return Response({'error': 'Vaqt tugadi, imtihon avtomatik topshirildi'}, status=status.HTTP_403_FORBIDDEN)
+
+        if answer_buffer.is_enabled():
+            answer_buffer.flush_session(session)
+        answer_buffer.write_answers(session, answers)
+    return Response({'saved': len(answers), 'results': results})
+
+
 @api_view(['POST'])
 @authentication_classes(student_auth)
 @permission_classes(student_perm)
@@ -172,8 +291,31 @@ def session_results(request, session_id):
 
     exam_closed = timezone.now() > session.exam.scheduled_end
 
+    # After close the payload only changes on recalibration, so it is
+    # rendered once and shared until results_cache.invalidate_exam()
+    entry = results_cache.get_results(session) if exam_closed else None
+    if entry is None:
+        payload = _render_results(session, exam_closed)
+        if exam_closed:
+            entry = results_cache.make_entry(payload)
+            results_cache.set_results(session, entry)
+        else:
+            submitted_at = session.submitted_at.timestamp() if session.submitted_at else None
+            entry = results_cache.make_entry(payload, last_modified=submitted_at)
+
+    not_modified = get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'],
+    )
+    response = not_modified or Response(entry['payload'])
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _render_results(session, exam_closed):
     # Raw score is always available immediately after submission
-    score = compute_score(session)
+    score = stored_score(session)
     answers = StudentAnswer.objects.filter(session=session).order_by('question_number', 'sub_part')
 
     breakdown = [
@@ -197,19 +339,18 @@ def session_results(request, session_id):
     # Rasch score, letter grade, ELO, and correct answers are held back
     # until the exam window closes (prevents leaking info to others)
     if exam_closed:
-        correct_answers_map = {
-            (ca.question_number, ca.sub_part): ca.correct_answer
-            for ca in CorrectAnswer.objects.filter(exam=session.exam)
-        }
+        scoring_key = results_cache.scoring_key(session.exam_id)
         for item in result['breakdown']:
             key = (item['question_number'], item['sub_part'])
-            item['correct_answer'] = correct_answers_map.get(key, '')
+            item['correct_answer'] = scoring_key['answers'].get(key, '')
 
-        rasch_data = compute_rasch_score(session)
-        rasch_scaled = compute_rasch_scaled_score(rasch_data['theta']) if rasch_data else None
-
-        result['rasch_scaled'] = rasch_scaled
-        result['letter_grade'] = compute_letter_grade(rasch_scaled)
+        if session.theta is not None:
+            result['rasch_scaled'] = session.rasch_scaled
+            result['letter_grade'] = compute_letter_grade(session.rasch_scaled)
+        else:
+            rasch_data = compute_rasch_score(session, scoring_key)
+            result['rasch_scaled'] = rasch_data['rasch_scaled'] if rasch_data else None
+            result['letter_grade'] = rasch_data['letter_grade'] if rasch_data else None
 
         elo_data = None
         try:
@@ -223,13 +364,127 @@ def session_results(request, session_id):
             pass
         result['elo'] = elo_data
 
-    return Response(result)
+    return result
 
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
+def _pdf_access_error(request, exam):
+    """Error response unless the exam is open and the student has started it."""
+    now = timezone.now()
+    if not (exam.scheduled_start <= now <= exam.scheduled_end):
+        return Response({'error': 'Imtihon hozirda ochiq emas'}, status=status.HTTP_403_FORBIDDEN)
+
+    # Require an active (in-progress) or submitted session for this student
+    if not ExamSession.objects.filter(student=request.user, exam=exam).exists():
+        return Response({'error': 'Avval imtihonni boshlang'}, status=status.HTTP_403_FORBIDDEN)
+    return None
+
+
+def _parse_byte_range(header, size):
+    """Parse a single-range Range header into inclusive (start, end).
+
+    Returns None when the header is absent or not a single byte range (the
+    whole file is sent); raises ValueError when the range is unsatisfiable.
+    """
+    match = BYTE_RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError('unsatisfiable range')
+    return start, end
+
+
+def _stream_range(f, start, length):
+    try:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _ranged_file_response(request, f, size, content_type):
+    """FileResponse that also answers single byte-range requests with 206."""
+    try:
+        byte_range = _parse_byte_range(request.META.get('HTTP_RANGE'), size)
+    except ValueError:
+        f.close()
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        response = FileResponse(f, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _stream_range(f, start, end - start + 1),
+            status=status.HTTP_206_PARTIAL_CONTENT, content_type=content_type,
+        )
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _validate_answer(data):
+    """Validate one answer payload.
+
+    Returns (question_number, sub_part, answer, error); error is None when valid.
+    """
+    answer = data.get('answer')
+    sub_part = data.get('sub_part') or None
+
+    try:
+        question_number = int(data.get('question_number'))
+    except (TypeError, ValueError):
+        return None, None, None, 'Savol raqami butun son bo\'lishi kerak'
+
+    if question_number < 1 or question_number > 45:
+        return None, None, None, 'Savol raqami 1 dan 45 gacha bo\'lishi kerak'
+
+    if not answer or not isinstance(answer, str):
+        return None, None, None, 'Javob talab qilinadi'
+
+    if len(answer) > 500:
+        return None, None, None, 'Javob 500 belgidan oshmasligi kerak'
+
+    if sub_part and sub_part not in ('a', 'b'):
+        return None, None, None, 'sub_part faqat "a" yoki "b" bo\'lishi mumkin'
+
+    # Questions 1-35 should not have sub_part; 36-45 require it
+    if question_number <= 35 and sub_part:
+        return None, None, None, '1-35 savollar uchun sub_part kerak emas'
+
+    if question_number >= 36 and not sub_part:
+        return None, None, None, '36-45 savollar uchun sub_part ("a" yoki "b") talab qilinadi'
+
+    return question_number, sub_part, answer, None
+
+
+def _is_past_deadline(session, now):
+    """True once the session's deadline plus network grace has passed."""
+    deadline = session.deadline or session.compute_deadline(session.started_at)
+    return now > deadline + DEADLINE_GRACE
+
+
 def _session_payload(session, exam):
     # Late-start: effective duration = min(exam.duration, remaining window time)
     remaining_minutes = (exam.scheduled_end - session.started_at).total_seconds() / 60
@@ -290,6 +545,9 @@ def _submit_session(session, auto=False):
     if session.status == ExamSession.Status.SUBMITTED:
         return  # Already submitted (race condition guard)
 
+    if answer_buffer.is_enabled():
+        answer_buffer.flush_session(session, closing=True)
+
     correct_answers = {
         (ca.question_number, ca.sub_part): ca.correct_answer
         for ca in CorrectAnswer.objects.filter(exam=session.exam)
@@ -303,17 +561,20 @@ def _submit_session(session, auto=False):
 
     StudentAnswer.objects.bulk_update(student_answers, ['is_correct'], batch_size=100)
 
+    score = compute_score(session, prefetched_answers=student_answers)
+    session.points = score['points']
+    session.exercises_correct = score['exercises_correct']
     session.status = ExamSession.Status.SUBMITTED
     session.submitted_at = timezone.now()
     session.is_auto_submitted = auto
     session.save()
 
-    update_elo_after_submission(session)
+    record_graded_session(session.exam_id, session.points)
 
-    from .gamification import update_streak, check_streak_broken, check_and_award_achievements
-    check_streak_broken(session.student, session.exam)
-    update_streak(session.student, session.exam)
-    check_and_award_achievements(session.student, session)
+    # Elo, streak and achievements run after commit, off the request path
+    from .tasks import process_submission
+    session_id = str(session.id)
+    transaction.on_commit(lambda: process_submission.delay(session_id))
 
 
 def submit_session_safe(session_id, auto=False):
@@ -1,13 +1,18 @@
 import logging
+import time
 from datetime import timedelta
 
-
-from celery import shared_task
+from celery import chord, shared_task
 from django.db import transaction
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
+AUTO_SUBMIT_FANOUT_LOCK = 'auto_submit_fanout_in_flight'
+AUTO_SUBMIT_FANOUT_LOCK_TIMEOUT = 300  # Released by finish_auto_submit; expiry covers a lost chord
+CALIBRATION_QUEUED_TIMEOUT = 600  # One queued calibrate_exam_rasch per exam at a time
+CALIBRATION_GRACE = timedelta(minutes=30)  # Calibrate anyway if sessions still fail to submit after this
+
 
 @shared_task(
     autoretry_for=(Exception,),
@@ -16,44 +21,256 @@ logger = logging.getLogger(__name__)
     max_retries=3,
 )
 def auto_submit_expired_sessions():
-    from .models import ExamSession
-    from .student_views import submit_session_safe
+    from django.conf import settings
+    from django.core.cache import cache
+    from .models import ExamSession, MockExam
 
     now = timezone.now()
-    session_ids = list(
+    _fill_missing_deadlines()
+    # Index-backed: only sessions that are actually due
+    session_ids = [
+        str(session_id) for session_id in
         ExamSession.objects
-        .filter(
-            status=ExamSession.Status.IN_PROGRESS,
-            started_at__lte=now - timedelta(minutes=1),
+        .filter(status=ExamSession.Status.IN_PROGRESS, deadline__lte=now)
+        .values_list('id', flat=True)
+    ]
+
+    # Closed exams stay pending until calibrate_exam_rasch stamps them
+    closed_exam_ids = [
+        str(exam_id) for exam_id in
+        MockExam.objects.filter(
+            scheduled_end__lte=now, rasch_calibrated_at__isnull=True,
+        ).values_list('id', flat=True)
+    ]
+
+    chunk_size = settings.AUTO_SUBMIT_CHUNK_SIZE
+    if len(session_ids) > chunk_size:
+        # Window close: fan chunks out across workers, calibrate when all are done
+        if not cache.add(AUTO_SUBMIT_FANOUT_LOCK, now.isoformat(), timeout=AUTO_SUBMIT_FANOUT_LOCK_TIMEOUT):
+            # Exams whose sessions are all graded need not wait for the running fan-out
+            _calibrate_closed_exams(closed_exam_ids)
+            return "Avtomatik topshirish allaqachon bajarilmoqda"
+
+        chunks = [session_ids[i:i + chunk_size] for i in range(0, len(session_ids), chunk_size)]
+        chord(auto_submit_chunk.s(chunk) for chunk in chunks)(
+            finish_auto_submit.s(closed_exam_ids)
         )
+        return f"{len(session_ids)} ta sessiya {len(chunks)} qismga bo'lindi"
+
+    result = auto_submit_chunk(session_ids)
+    _calibrate_closed_exams(closed_exam_ids)
+    return f"{result['submitted']} ta sessiya avtomatik topshirildi"
+
+
+def _fill_missing_deadlines():
+    """Store deadlines for sessions created without save() (bulk_create, raw inserts)."""
+    from .models import ExamSession
+
+    missing = list(
+        ExamSession.objects
+        .filter(status=ExamSession.Status.IN_PROGRESS, deadline__isnull=True)
         .select_related('exam')
-        .values_list('id', 'started_at', 'exam__duration', 'exam__scheduled_end')
+        .only('id', 'started_at', 'exam__duration', 'exam__scheduled_end')
     )
+    for session in missing:
+        session.deadline = session.compute_deadline(session.started_at)
+    if missing:
+        logger.warning('Filled missing deadlines for %d sessions', len(missing))
+        ExamSession.objects.bulk_update(missing, ['deadline'], batch_size=500)
 
-    count = 0
-    for session_id, started_at, duration, scheduled_end in session_ids:
-        elapsed_seconds = (now - started_at).total_seconds()
-        remaining_at_start = (scheduled_end - started_at).total_seconds()
-        effective_duration_seconds = min(duration * 60, remaining_at_start)
-
-        if elapsed_seconds >= effective_duration_seconds:
-            try:
-                submit_session_safe(session_id, auto=True)
-                count += 1
-            except Exception:
-                logger.exception('Failed to auto-submit session %s', session_id)
-
-    # Check if any exam windows just closed (trigger Rasch calibration)
-    from .models import MockExam, ItemDifficulty
-    recently_closed = MockExam.objects.filter(
-        scheduled_end__lte=now,
-        scheduled_end__gte=now - timedelta(minutes=2),
-    )
-    for exam in recently_closed:
-        if not ItemDifficulty.objects.filter(exam=exam).exists():
+
+@shared_task
+def auto_submit_chunk(session_ids):
+    """Submit one chunk of due sessions; reports timing and failed session ids."""
+    from .student_views import submit_session_safe
+
+    started = time.monotonic()
+    failed = []
+    for session_id in session_ids:
+        try:
+            submit_session_safe(session_id, auto=True)
+        except Exception:
+            logger.exception('Failed to auto-submit session %s', session_id)
+            failed.append(session_id)
+
+    result = {
+        'submitted': len(session_ids) - len(failed),
+        'failed': failed,
+        'seconds': round(time.monotonic() - started, 3),
+    }
+    if session_ids:
+        logger.info('Auto-submit chunk: %d submitted, %d failed in %.3fs',
+                    result['submitted'], len(failed), result['seconds'])
+    return result
+
+
+@shared_task
+def finish_auto_submit(chunk_results, closed_exam_ids):
+    """Chord callback: summarize the fan-out and start calibration for closed exams."""
+    from django.core.cache import cache
+
+    submitted = sum(r['submitted'] for r in chunk_results)
+    failed = [sid for r in chunk_results for sid in r['failed']]
+    slowest = max((r['seconds'] for r in chunk_results), default=0)
+    logger.info('Auto-submit fan-out: %d submitted, %d failed across %d chunks (slowest %.3fs)',
+                submitted, len(failed), len(chunk_results), slowest)
+    if failed:
+        logger.warning('Auto-submit failed for sessions: %s', ', '.join(failed))
+
+    cache.delete(AUTO_SUBMIT_FANOUT_LOCK)
+    _calibrate_closed_exams(closed_exam_ids)
+    return f"{submitted} ta sessiya avtomatik topshirildi"
+
+
+def _calibrate_closed_exams(exam_ids):
+    """Queue Rasch calibration for closed exams with no due sessions left to grade."""
+    from django.core.cache import cache
+    from .models import ExamSession, MockExam
+
+    now = timezone.now()
+    exams = MockExam.objects.filter(id__in=exam_ids, rasch_calibrated_at__isnull=True).only('id', 'scheduled_end')
+    for exam in exams:
+        still_grading = ExamSession.objects.filter(
+            exam_id=exam.id,
+            status=ExamSession.Status.IN_PROGRESS,
+            deadline__lte=now,
+        ).exists()
+        if still_grading:
+            if now - exam.scheduled_end < CALIBRATION_GRACE:
+                continue  # The next sweep (or the chord callback) retries once grading finishes
+            logger.warning('Exam %s: calibrating despite sessions that failed to auto-submit', exam.id)
+        if cache.add(f'rasch_calibration_queued_{exam.id}', 1, timeout=CALIBRATION_QUEUED_TIMEOUT):
             calibrate_exam_rasch.delay(str(exam.id))
 
-    return f"{count} ta sessiya avtomatik topshirildi"
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    max_retries=3,
+)
+def auto_submit_session(session_id):
+    """Auto-submit a single session at its deadline (ETA task queued by start_exam).
+
+    Idempotent: does nothing if the session was already submitted or is not
+    yet due, so early or duplicate deliveries are harmless.
+    """
+    from .models import ExamSession
+    from .student_views import submit_session_safe
+
+    is_due = ExamSession.objects.filter(
+        id=session_id,
+        status=ExamSession.Status.IN_PROGRESS,
+        deadline__lte=timezone.now(),
+    ).exists()
+    if is_due:
+        submit_session_safe(session_id, auto=True)
+
+
+@shared_task(
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    max_retries=3,
+)
+def process_submission(session_id):
+    """Post-submit pipeline: Elo, streak and achievements for a graded session.
+
+    Every step is idempotent (EloHistory is one-per-session, the streak counts
+    an exam date once, achievements use get_or_create), so retries and the
+    requeue sweep never double-apply.
+    """
+    from .models import ExamSession
+    from .elo import update_elo_after_submission
+    from .gamification import record_exam_streak, check_and_award_achievements
+    from .dashboard_views import invalidate_dashboard
+    from .results_cache import invalidate_session
+
+    try:
+        session = ExamSession.objects.select_related('student', 'exam').get(
+            id=session_id, status=ExamSession.Status.SUBMITTED,
+        )
+    except ExamSession.DoesNotExist:
+        return
+
+    update_elo_after_submission(session)
+    record_exam_streak(session.student, session.exam)
+    check_and_award_achievements(session.student, session)
+    invalidate_dashboard(session.student_id)
+    invalidate_session(session)
+
+
+@shared_task
+def requeue_unprocessed_submissions():
+    """Safety net for lost process_submission tasks: requeue recent submissions without Elo."""
+    from .models import ExamSession
+
+    now = timezone.now()
+    session_ids = list(
+        ExamSession.objects.filter(
+            status=ExamSession.Status.SUBMITTED,
+            submitted_at__lte=now - timedelta(minutes=5),
+            submitted_at__gte=now - timedelta(days=1),
+            elo_snapshot__isnull=True,
+        ).values_list('id', flat=True)
+    )
+    for session_id in session_ids:
+        process_submission.delay(str(session_id))
+
+    return f"{len(session_ids)} ta sessiya qayta navbatga qo'yildi"
+
+
+@shared_task
+def flush_answer_buffers():
+    """Flush write-behind answer buffers from Redis into StudentAnswer."""
+    from . import answer_buffer
+
+    if not answer_buffer.is_enabled():
+        return
+
+    flushed = 0
+    for session_id in answer_buffer.pending_session_ids():
+        try:
+            answer_buffer.flush_session_by_id(session_id)
+            flushed += 1
+        except Exception:
+            logger.exception('Failed to flush answer buffer for session %s', session_id)
+
+    return f"{flushed} ta sessiya javoblari saqlandi"
+
+
+@shared_task
+def process_telegram_updates():
+    """Drain queued Telegram webhook updates in batches."""
+    from django.conf import settings
+    from . import bot_views, update_queue
+
+    # Updates queued from now on schedule a fresh drain
+    update_queue.release_drain()
+    update_queue.requeue_stale()
+    processed = 0
+    while True:
+        batch = update_queue.pop_batch(settings.TELEGRAM_UPDATE_BATCH_SIZE)
+        if not batch:
+            break
+        raw_items = [raw for raw, _ in batch]
+        try:
+            # Each update is acknowledged once handled, so a retry never answers it twice
+            failed = bot_views.process_updates(
+                [update for _, update in batch],
+                on_handled=lambda indexes: update_queue.ack([raw_items[i] for i in indexes]),
+            )
+        except Exception:
+            logger.exception('Failed to process Telegram updates; unhandled ones requeued')
+            update_queue.requeue(raw_items)  # Skips the ones already acknowledged
+            break  # Retried by the next drain
+        processed += len(batch) - len(failed)
+        if failed:
+            logger.warning('Requeued %d failed Telegram updates', len(failed))
+            update_queue.requeue([raw_items[i] for i in failed])
+            break
+
+    return f"{processed} ta Telegram update qayta ishlandi"
 
 
 @shared_task(
@@ -62,16 +279,78 @@ def auto_submit_expired_sessions():
     retry_backoff_max=300,
     max_retries=3,
 )
-def send_exam_notification(exam_id):
+def send_exam_notification(exam_id, key=None):
     from .models import MockExam
     from .notifications import notify_new_exam
     try:
         exam = MockExam.objects.get(id=exam_id)
-        notify_new_exam(exam)
+        notify_new_exam(exam, key=key)
     except MockExam.DoesNotExist:
         logger.error('Exam %s not found for notification', exam_id)
 
 
+@shared_task(
+    autoretry_for=(OSError,),
+    retry_backoff=True,
+    retry_backoff_max=300,
+    max_retries=3,
+)
+def prepare_exam_pdf(exam_id):
+    """Linearize and split an uploaded exam PDF into pages, then schedule the cache warmup."""
+    import pikepdf
+    from .models import MockExam
+    from . import pdf_pages
+
+    try:
+        exam = MockExam.objects.get(id=exam_id)
+    except MockExam.DoesNotExist:
+        logger.error('Exam %s not found for PDF preparation', exam_id)
+        return
+    if not exam.pdf_file:
+        return
+
+    try:
+        page_count = pdf_pages.prepare(exam)
+    except pikepdf.PdfError:
+        # Students keep getting the original file through exam_pdf
+        logger.warning('Exam %s: PDF could not be parsed, skipping page split', exam_id)
+        return
+    logger.info('Exam %s: PDF prepared (%d pages)', exam_id, page_count)
+    _schedule_pdf_warmup(exam)
+
+
+def _schedule_pdf_warmup(exam):
+    from .pdf_pages import WARMUP_LEAD
+
+    warm_at = exam.scheduled_start - WARMUP_LEAD
+    if warm_at <= timezone.now():
+        warm_exam_pdf.delay(str(exam.id))
+    else:
+        warm_exam_pdf.apply_async(args=[str(exam.id)], eta=warm_at)
+
+
+@shared_task
+def warm_exam_pdf(exam_id):
+    """Load an exam's PDF pages into the shared cache shortly before it starts."""
+    from .models import MockExam
+    from . import pdf_pages
+
+    try:
+        exam = MockExam.objects.get(id=exam_id)
+    except MockExam.DoesNotExist:
+        return
+    now = timezone.now()
+    if exam.scheduled_end <= now:
+        return
+    if exam.scheduled_start - pdf_pages.WARMUP_LEAD > now + timedelta(minutes=1):
+        # Exam was moved later since this warmup was scheduled
+        _schedule_pdf_warmup(exam)
+        return
+
+    page_count = pdf_pages.warm(exam)
+    logger.info('Exam %s: %d PDF pages warmed', exam_id, page_count)
+
+
 @shared_task(
     autoretry_for=(Exception,),
     retry_backoff=True,
@@ -81,11 +360,18 @@ def send_exam_notification(exam_id):
 def calibrate_exam_rasch(exam_id):
     """
     Run Rasch calibration after exam window closes.
-    Updates ItemDifficulty and StudentRating.rasch_scaled for all participants.
+    Updates ItemDifficulty, the exam's ScoreConversion table and
+    StudentRating.rasch_scaled for all participants.
     """
-    from .models import MockExam, ExamSession, StudentAnswer, ItemDifficulty, StudentRating, CorrectAnswer
+    from .models import (
+        MockExam, ExamSession, StudentAnswer, ItemDifficulty, StudentRating, CorrectAnswer,
+        ScoreConversion,
+    )
+    from . import leaderboard_store
+    from .dashboard_views import invalidate_dashboard
+    from .results_cache import invalidate_exam
     from .rasch import estimate_item_difficulties, estimate_theta, compute_item_fit
-    from .scoring import compute_rasch_scaled_score, MIN_RASCH_PARTICIPANTS
+    from .scoring import build_score_conversions, MIN_RASCH_PARTICIPANTS
 
     try:
         exam = MockExam.objects.get(id=exam_id)
@@ -103,6 +389,7 @@ def calibrate_exam_rasch(exam_id):
         logger.info('Exam %s: only %d participants, using raw-percentage fallback (need %d for Rasch)',
                      exam_id, len(sessions), MIN_RASCH_PARTICIPANTS)
         _apply_rasch_fallback(exam, sessions)
+        _mark_calibrated(exam)
         return
 
     # Get all correct answer keys to define the item set
@@ -115,6 +402,7 @@ def calibrate_exam_rasch(exam_id):
 
     if n_items == 0:
         logger.warning('Exam %s: no correct answers defined, skipping Rasch', exam_id)
+        _mark_calibrated(exam)
         return
 
     # Build response matrix (N_students x N_items)
@@ -126,19 +414,13 @@ def calibrate_exam_rasch(exam_id):
         session__in=[s.id for s in sessions]
     ).values_list('session_id', 'question_number', 'sub_part', 'is_correct')
 
-    # Build lookup: session_id -> {(q, sub): is_correct}
-    answer_lookup = {}
+    # Fill cells directly from (row, column) indexes instead of an N x J scan
+    row_index = {s.id: i for i, s in enumerate(sessions)}
+    col_index = {key: j for j, key in enumerate(item_keys)}
     for sid, q, sub, correct in all_answers:
-        if sid not in answer_lookup:
-            answer_lookup[sid] = {}
-        answer_lookup[sid][(q, sub)] = correct
-
-    for i, session in enumerate(sessions):
-        answers = answer_lookup.get(session.id, {})
-        for j, (q, sub) in enumerate(item_keys):
-            val = answers.get((q, sub))
-            if val is not None:
-                matrix[i, j] = 1.0 if val else 0.0
+        j = col_index.get((q, sub))
+        if j is not None:
+            matrix[row_index[sid], j] = 1.0 if correct else 0.0
 
     # Run JMLE calibration
     betas, thetas = estimate_item_difficulties(matrix)
@@ -161,41 +443,74 @@ def calibrate_exam_rasch(exam_id):
             ))
         ItemDifficulty.objects.bulk_create(item_difficulties)
 
-        # Update each student's Rasch ability and scaled score
+        # Raw score -> theta/scaled/grade table so results become a lookup
+        conversions = build_score_conversions(exam, betas)
+        ScoreConversion.objects.filter(exam=exam).delete()
+        ScoreConversion.objects.bulk_create(conversions)
+
+        # Sessions are scored from the table, where blanks count as incorrect;
+        # the JMLE thetas treat blanks as missing and only serve the item estimates
+        conversion_by_raw = {c.raw_score: c for c in conversions}
+        raw_scores = np.nansum(matrix, axis=1).astype(int)
+        scores_by_student = {}
+        scaled_by_session = {}
         for i, session in enumerate(sessions):
-            theta = float(thetas[i])
-            scaled = compute_rasch_scaled_score(theta)
-            StudentRating.objects.filter(
-                student=session.student
-            ).update(rasch_ability=theta, rasch_scaled=scaled)
-            EloHistory.objects.filter(session=session).update(rasch_after=scaled)
-
+            conversion = conversion_by_raw[int(raw_scores[i])]
+            theta, scaled = conversion.theta, conversion.rasch_scaled
+            session.theta, session.rasch_scaled = theta, scaled
+            scores_by_student[session.student_id] = (theta, scaled)
+            scaled_by_session[session.id] = scaled
+        ExamSession.objects.bulk_update(sessions, ['theta', 'rasch_scaled'], batch_size=500)
+
+        ratings = list(StudentRating.objects.filter(student_id__in=scores_by_student))
+        for rating in ratings:
+            rating.rasch_ability, rating.rasch_scaled = scores_by_student[rating.student_id]
+        StudentRating.objects.bulk_update(ratings, ['rasch_ability', 'rasch_scaled'], batch_size=500)
+
+        snapshots = list(EloHistory.objects.filter(session_id__in=scaled_by_session))
+        for snapshot in snapshots:
+            snapshot.rasch_after = scaled_by_session[snapshot.session_id]
+        EloHistory.objects.bulk_update(snapshots, ['rasch_after'], batch_size=500)
+        _mark_calibrated(exam)
+
+    leaderboard_store.bump_version()
+    invalidate_dashboard(*scores_by_student)
+    invalidate_exam(exam.id)
     logger.info('Exam %s: Rasch calibration complete for %d participants, %d items',
                 exam_id, len(sessions), n_items)
 
 
+def _mark_calibrated(exam):
+    from django.core.cache import cache
+    from .models import MockExam
+
+    MockExam.objects.filter(id=exam.id).update(rasch_calibrated_at=timezone.now())
+    cache.delete(f'rasch_calibration_queued_{exam.id}')
+
+
 def _apply_rasch_fallback(exam, sessions):
     """Apply raw-percentage-based provisional Rasch scores when N < MIN_RASCH_PARTICIPANTS."""
-    from .models import StudentRating, StudentAnswer, EloHistory
-    from .scoring import compute_score, POINTS_TOTAL
-
-    session_ids = [s.id for s in sessions]
-    all_answers = StudentAnswer.objects.filter(session_id__in=session_ids)
-    answers_by_session = {}
-    for a in all_answers:
-        answers_by_session.setdefault(a.session_id, []).append(a)
+    from . import leaderboard_store
+    from .dashboard_views import invalidate_dashboard
+    from .results_cache import invalidate_exam
+    from .models import ExamSession, StudentRating, EloHistory
+    from .scoring import stored_score, POINTS_TOTAL
 
     with transaction.atomic():
         for session in sessions:
-            prefetched = answers_by_session.get(session.id, [])
-            score = compute_score(session, prefetched_answers=prefetched)
+            score = stored_score(session)
             raw_pct = score['points'] / POINTS_TOTAL if POINTS_TOTAL > 0 else 0
             # Linear map: raw percentage → 0-75 scale
             scaled = round(max(0.0, min(75.0, raw_pct * 75)), 1)
+            session.rasch_scaled = scaled
             StudentRating.objects.filter(
                 student=session.student
             ).update(rasch_scaled=scaled)
             EloHistory.objects.filter(session=session).update(rasch_after=scaled)
+        ExamSession.objects.bulk_update(sessions, ['rasch_scaled'], batch_size=500)
 
+    leaderboard_store.bump_version()
+    invalidate_dashboard(*(s.student_id for s in sessions))
+    invalidate_exam(exam.id)
     logger.info('Exam %s: raw-percentage fallback applied for %d participants',
                 str(exam.id), len(sessions))
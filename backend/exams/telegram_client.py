@@ -0,0 +1,97 @@
+"""
+Shared, long-lived Telegram bot client.
+
+One telegram.Bot per worker process, driven by one background event loop
+thread. The bot's httpx pool is bound to that loop, so keep-alive
+connections to api.telegram.org are reused by every webhook reply and
+broadcast in the process instead of paying loop setup and a TLS handshake
+each time.
+
+Sync code calls run(coro); async views await submit(coro). Both execute the
+coroutine on the bot loop, whichever thread or loop the caller is on. The
+client is rebuilt after a fork (gunicorn/celery prefork), because loops
+and sockets do not survive one.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+RUN_TIMEOUT = 60 * 60  # Upper bound for run(); broadcasts can take a while
+
+_lock = threading.Lock()
+_client = None
+
+
+class _Client:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.bot = None  # Built on first use, so loop-only callers need no token
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='telegram-bot-loop', daemon=True)
+        self.thread.start()
+
+    def close(self):
+        try:
+            if self.bot is not None:
+                shutdown = self.bot.request.shutdown()
+                asyncio.run_coroutine_threadsafe(shutdown, self.loop).result(timeout=10)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=10)
+            self.loop.close()
+
+
+def make_bot(token):
+    """Bot whose connection pool allows TELEGRAM_BROADCAST_CONCURRENCY parallel sends."""
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+
+    request = HTTPXRequest(connection_pool_size=settings.TELEGRAM_BROADCAST_CONCURRENCY)
+    return Bot(token=token, request=request)
+
+
+def _get_client():
+    global _client
+    client = _client
+    if client is None or client.pid != os.getpid():
+        with _lock:
+            if _client is None or _client.pid != os.getpid():
+                _client = _Client()
+            client = _client
+    return client
+
+
+def get_bot():
+    """The process-wide Bot. Only use it inside coroutines passed to run()/submit()."""
+    client = _get_client()
+    if client.bot is None:
+        with _lock:
+            if client.bot is None:
+                client.bot = make_bot(settings.TELEGRAM_BOT_TOKEN)
+    return client.bot
+
+
+def run(coro, timeout=RUN_TIMEOUT):
+    """Run a coroutine on the bot loop from sync code and return its result."""
+    future = asyncio.run_coroutine_threadsafe(coro, _get_client().loop)
+    return future.result(timeout=timeout)
+
+
+async def submit(coro):
+    """Await a coroutine on the bot loop from another event loop (async views)."""
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, _get_client().loop))
+
+
+def reset():
+    """Shut the client down; the next call builds a fresh one (tests, token change)."""
+    global _client
+    with _lock:
+        client, _client = _client, None
+    if client is not None and client.pid == os.getpid():
+        client.close()
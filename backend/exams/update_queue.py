@@ -0,0 +1,131 @@
+"""
+Redis queue for incoming Telegram webhook updates.
+
+The webhook only checks the secret, enqueues the update and returns 200, so
+its latency does not depend on the Bot API. Telegram redelivers updates it
+considers unacknowledged; a per-update_id marker drops those duplicates.
+
+A drain task (process_telegram_updates) is scheduled at most once per
+TELEGRAM_UPDATE_BATCH_DELAY window and handles the queue in batches of
+TELEGRAM_UPDATE_BATCH_SIZE; the periodic beat entry is the safety net.
+
+Batches are moved to a processing list (LMOVE) and removed only by ack()
+once handled. A failed batch goes back to the queue; a batch left behind by
+a killed worker is requeued by requeue_stale(). Each update is tried at most
+MAX_ATTEMPTS times before it is dropped with an error.
+"""
+
+import json
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'telegram_updates:queue'
+PROCESSING_KEY = 'telegram_updates:processing'
+CLAIMS_KEY = 'telegram_updates:claimed_at'  # Raw item -> time it entered PROCESSING_KEY
+DRAIN_SCHEDULED_KEY = 'telegram_updates:drain_scheduled'
+SEEN_TTL_SECONDS = 24 * 60 * 60  # Telegram stops redelivering long before this
+STALE_CLAIM_SECONDS = 5 * 60  # A batch held this long belongs to a worker that died
+MAX_ATTEMPTS = 3
+
+_client = None
+
+
+def _get_client():
+    global _client
+    if _client is None:
+        import redis
+        _client = redis.Redis.from_url(settings.TELEGRAM_UPDATE_QUEUE_REDIS_URL, decode_responses=True)
+    return _client
+
+
+def _seen_key(update_id):
+    return f'telegram_updates:seen:{update_id}'
+
+
+def enqueue(update):
+    """Queue an update unless its update_id was already queued. Returns True if queued."""
+    client = _get_client()
+    seen_key = _seen_key(update['update_id'])
+    if not client.set(seen_key, 1, nx=True, ex=SEEN_TTL_SECONDS):
+        return False
+    try:
+        client.rpush(QUEUE_KEY, json.dumps({'update': update, 'attempts': 0}))
+    except Exception:
+        client.delete(seen_key)  # Let Telegram's redelivery through
+        raise
+    return True
+
+
+def claim_drain():
+    """True if the caller should schedule a drain (none is pending yet)."""
+    return bool(_get_client().set(
+        DRAIN_SCHEDULED_KEY, 1, nx=True, ex=settings.TELEGRAM_UPDATE_BATCH_DELAY + 60,
+    ))
+
+
+def release_drain():
+    _get_client().delete(DRAIN_SCHEDULED_KEY)
+
+
+def pop_batch(size):
+    """Move up to `size` items from the queue to the processing list.
+
+    Returns [(raw, update)]; pass the raw items to ack() or requeue().
+    """
+    client = _get_client()
+    pipe = client.pipeline()
+    for _ in range(size):
+        pipe.lmove(QUEUE_KEY, PROCESSING_KEY, 'LEFT', 'RIGHT')
+    raw_items = [raw for raw in pipe.execute() if raw is not None]
+    if raw_items:
+        now = time.time()
+        client.hset(CLAIMS_KEY, mapping={raw: now for raw in raw_items})
+    return [(raw, json.loads(raw)['update']) for raw in raw_items]
+
+
+def ack(raw_items):
+    """Forget handled items."""
+    pipe = _get_client().pipeline()
+    for raw in raw_items:
+        pipe.lrem(PROCESSING_KEY, 1, raw)
+    if raw_items:
+        pipe.hdel(CLAIMS_KEY, *raw_items)
+    pipe.execute()
+
+
+def requeue(raw_items):
+    """Put failed items back at the head of the queue, dropping those out of attempts."""
+    client = _get_client()
+    for raw in reversed(raw_items):  # LPUSH in reverse keeps the original order
+        pipe = client.pipeline()
+        pipe.lrem(PROCESSING_KEY, 1, raw)
+        pipe.hdel(CLAIMS_KEY, raw)
+        removed, _ = pipe.execute()
+        if not removed:
+            continue  # Already acknowledged or requeued elsewhere
+        item = json.loads(raw)
+        item['attempts'] += 1
+        if item['attempts'] >= MAX_ATTEMPTS:
+            logger.error(
+                'Dropping Telegram update %s after %d attempts', item['update'].get('update_id'), item['attempts'],
+            )
+            continue
+        client.lpush(QUEUE_KEY, json.dumps(item))
+
+
+def requeue_stale(max_age=STALE_CLAIM_SECONDS):
+    """Requeue processing items whose worker stopped before ack()."""
+    cutoff = time.time() - max_age
+    stale = [raw for raw, claimed_at in _get_client().hgetall(CLAIMS_KEY).items() if float(claimed_at) < cutoff]
+    if stale:
+        logger.warning('Requeueing %d stale Telegram updates', len(stale))
+        requeue(stale)
+    return len(stale)
+
+
+def pending():
+    return _get_client().llen(QUEUE_KEY)
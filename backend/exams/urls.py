@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework_simplejwt.views import TokenObtainPairView
@@ -15,11 +16,17 @@ urlpatterns = [
     path('admin/exams/<uuid:exam_id>/answers/', views.admin_exam_answers, name='admin-exam-answers'),
     path('admin/exams/<uuid:exam_id>/results/', views.admin_exam_results, name='admin-exam-results'),
     path('admin/exams/<uuid:exam_id>/item-analysis/', views.admin_item_analysis, name='admin-item-analysis'),
+    path('admin/exams/<uuid:exam_id>/score-table/', views.admin_score_table, name='admin-score-table'),
     path('admin/notify/', views.admin_notify, name='admin-notify'),
+    path('admin/broadcasts/', views.admin_broadcasts, name='admin-broadcasts'),
     path('admin/analytics/', views.admin_analytics, name='admin-analytics'),
 
     # Telegram bot webhook
-    path('telegram/webhook/', bot_views.telegram_webhook, name='telegram-webhook'),
+    path(
+        'telegram/webhook/',
+        bot_views.telegram_webhook_async if settings.TELEGRAM_WEBHOOK_ASYNC else bot_views.telegram_webhook,
+        name='telegram-webhook',
+    ),
 
     # Auth
     path('auth/telegram/', auth_views.auth_telegram, name='auth-telegram'),
@@ -33,9 +40,12 @@ urlpatterns = [
     path('exams/upcoming/', student_views.upcoming_exam, name='upcoming-exam'),
     path('exams/<uuid:exam_id>/', student_views.exam_detail, name='exam-detail'),
     path('exams/<uuid:exam_id>/pdf/', student_views.exam_pdf, name='exam-pdf'),
+    path('exams/<uuid:exam_id>/pdf/manifest/', student_views.exam_pdf_manifest, name='exam-pdf-manifest'),
+    path('exams/<uuid:exam_id>/pdf/pages/<int:page_number>/', student_views.exam_pdf_page, name='exam-pdf-page'),
     path('exams/<uuid:exam_id>/start/', student_views.start_exam, name='start-exam'),
     path('exams/<uuid:exam_id>/lobby/', student_views.exam_lobby, name='exam-lobby'),
     path('sessions/<uuid:session_id>/answers/', student_views.save_answer, name='save-answer'),
+    path('sessions/<uuid:session_id>/answers/bulk/', student_views.save_answers_bulk, name='save-answers-bulk'),
     path('sessions/<uuid:session_id>/submit/', student_views.submit_exam, name='submit-exam'),
     path('sessions/<uuid:session_id>/results/', student_views.session_results, name='session-results'),
 
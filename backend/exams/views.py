@@ -1,14 +1,17 @@
 import logging
 from datetime import timedelta
 
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import status, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 
+from .dashboard_views import invalidate_upcoming_exam
 from .models import MockExam, ExamSession
-from .scoring import compute_score
+from .results_cache import invalidate_exam
+from .scoring import stored_score
 from .serializers import (
     MockExamSerializer,
     BulkCorrectAnswerSerializer,
@@ -25,9 +28,11 @@ def admin_exams(request):
         serializer = MockExamSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         exam = serializer.save(created_by=request.user)
+        invalidate_upcoming_exam()
         logger.info('Admin %s created exam %s (%s)', request.user.username, exam.id, exam.title)
-        from .tasks import send_exam_notification
+        from .tasks import send_exam_notification, prepare_exam_pdf
         send_exam_notification.delay(str(exam.id))
+        transaction.on_commit(lambda: prepare_exam_pdf.delay(str(exam.id)))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     exams = MockExam.objects.all().order_by('-created_at')
@@ -41,6 +46,7 @@ def admin_exam_answers(request, exam_id):
     serializer = BulkCorrectAnswerSerializer(data=request.data, context={'exam': exam})
     serializer.is_valid(raise_exception=True)
     serializer.save()
+    invalidate_exam(exam.id)
     logger.info('Admin %s uploaded answers for exam %s', request.user.username, exam_id)
     return Response({'message': 'Javoblar saqlandi'}, status=status.HTTP_201_CREATED)
 
@@ -58,6 +64,7 @@ def admin_exam_detail(request, exam_id):
                 status=status.HTTP_400_BAD_REQUEST
             )
         exam.delete()
+        invalidate_upcoming_exam()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     if request.method == 'PUT':
@@ -72,6 +79,11 @@ def admin_exam_detail(request, exam_id):
         serializer = MockExamSerializer(exam, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        invalidate_upcoming_exam()
+        invalidate_exam(exam.id)  # Title is part of the cached results payload
+        if 'pdf_file' in request.data:
+            from .tasks import prepare_exam_pdf
+            transaction.on_commit(lambda: prepare_exam_pdf.delay(str(exam.id)))
         return Response(MockExamSerializer(exam).data)
 
 
@@ -83,12 +95,11 @@ def admin_exam_results(request, exam_id):
         ExamSession.objects
         .filter(exam=exam, status=ExamSession.Status.SUBMITTED)
         .select_related('student')
-        .prefetch_related('answers')
     )
 
     results = []
     for session in sessions:
-        score = compute_score(session, prefetched_answers=list(session.answers.all()))
+        score = stored_score(session)
         results.append({
             'student_id': session.student.id,
             'student_name': session.student.full_name,
@@ -109,10 +120,46 @@ def admin_notify(request):
         return Response({'error': 'exam_id required'}, status=status.HTTP_400_BAD_REQUEST)
     exam = get_object_or_404(MockExam, id=exam_id)
     from .tasks import send_exam_notification
-    send_exam_notification.delay(str(exam.id))
+    # A resend is a new broadcast: the automatic one's checkpoint must not skip it
+    key = f'exam_{exam.id}_manual_{int(timezone.now().timestamp())}'
+    send_exam_notification.delay(str(exam.id), key=key)
     return Response({'status': 'Notification queued'})
 
 
+@api_view(['GET'])
+@permission_classes(admin_perm)
+def admin_broadcasts(request):
+    """Delivery summary of recent broadcasts (newest first)."""
+    from django.db.models import Count, Max, Min, Q
+    from .models import BroadcastDelivery, Student
+
+    Status = BroadcastDelivery.Status
+    try:
+        limit = min(max(int(request.query_params.get('limit', 20)), 1), 100)
+    except ValueError:
+        return Response({'error': "limit noto'g'ri"}, status=status.HTTP_400_BAD_REQUEST)
+
+    summaries = (
+        BroadcastDelivery.objects.values('broadcast')
+        .annotate(
+            total=Count('id'),
+            sent=Count('id', filter=Q(status=Status.SENT)),
+            blocked=Count('id', filter=Q(status=Status.BLOCKED)),
+            chat_not_found=Count('id', filter=Q(status=Status.CHAT_NOT_FOUND)),
+            failed=Count('id', filter=Q(status=Status.FAILED)),
+            retried=Count('id', filter=Q(attempts__gt=1)),
+            started_at=Min('created_at'),
+            finished_at=Max('created_at'),
+        )
+        .order_by('-started_at')[:limit]
+    )
+
+    return Response({
+        'unreachable_students': Student.objects.filter(telegram_unreachable_at__isnull=False).count(),
+        'broadcasts': list(summaries),
+    })
+
+
 @api_view(['GET'])
 @permission_classes(admin_perm)
 def admin_item_analysis(request, exam_id):
@@ -175,11 +222,37 @@ def admin_item_analysis(request, exam_id):
     })
 
 
+@api_view(['GET'])
+@permission_classes(admin_perm)
+def admin_score_table(request, exam_id):
+    """Raw score → Rasch conversion chart for a calibrated exam."""
+    from .models import ScoreConversion
+
+    exam = get_object_or_404(MockExam, id=exam_id)
+    rows = ScoreConversion.objects.filter(exam=exam).order_by('raw_score')
+
+    return Response({
+        'exam_id': str(exam.id),
+        'exam_title': exam.title,
+        'rows': [
+            {
+                'raw_score': row.raw_score,
+                'theta': round(row.theta, 3),
+                'standard_error': round(row.standard_error, 3) if row.standard_error is not None else None,
+                'rasch_scaled': row.rasch_scaled,
+                'letter_grade': row.letter_grade,
+            }
+            for row in rows
+        ],
+    })
+
+
 @api_view(['GET'])
 @permission_classes(admin_perm)
 def admin_analytics(request):
     """Platform-wide analytics."""
-    from django.db.models import Count, Q, Avg
+    from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery
+    from django.db.models.functions import Coalesce
     from .models import Student, StudentRating, StudentAnswer
 
     total_students = Student.objects.count()
@@ -192,10 +265,16 @@ def admin_analytics(request):
 
     # Average score percentage across all submitted sessions
     from .scoring import POINTS_TOTAL
+    # Rows missed by the points backfill are scored from their answers, not left out
+    correct_count = Subquery(
+        StudentAnswer.objects.filter(session=OuterRef('pk'), is_correct=True)
+        .order_by().values('session').annotate(n=Count('id')).values('n'),
+        output_field=IntegerField(),
+    )
     submitted = ExamSession.objects.filter(status='submitted').annotate(
-        correct_count=Count('answers', filter=Q(answers__is_correct=True))
+        score_points=Coalesce('points', correct_count, 0),
     )
-    avg_result = submitted.aggregate(avg_correct=Avg('correct_count'))
+    avg_result = submitted.aggregate(avg_correct=Avg('score_points'))
     avg_correct = avg_result['avg_correct']
     avg_score_percent = round((avg_correct / POINTS_TOTAL) * 100, 1) if avg_correct and POINTS_TOTAL > 0 else 0
 
@@ -211,7 +290,7 @@ def admin_analytics(request):
     for label, lo_frac, hi_frac in buckets:
         lo_pts = lo_frac * POINTS_TOTAL
         hi_pts = hi_frac * POINTS_TOTAL
-        count = submitted.filter(correct_count__gte=lo_pts, correct_count__lt=hi_pts).count()
+        count = submitted.filter(score_points__gte=lo_pts, score_points__lt=hi_pts).count()
         score_distribution.append({'bucket': label, 'count': count})
 
     return Response({
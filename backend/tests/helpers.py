@@ -1,4 +1,6 @@
+from contextlib import contextmanager
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -59,3 +61,36 @@ def make_exam(admin_user, start_offset=-5, end_offset=175, duration=150, title="
             exam=exam, question_number=q, sub_part='b', correct_answer='10'
         )
     return exam
+
+
+@contextmanager
+def run_post_submit(test_case):
+    """Run the post-submit pipeline (Elo, streak, achievements) for submissions in the block.
+
+    Submission queues process_submission on commit; this executes those
+    callbacks and runs the task inline instead of sending it to the broker.
+    """
+    from exams.tasks import process_submission
+    with patch('exams.tasks.process_submission.delay', side_effect=process_submission), \
+            test_case.captureOnCommitCallbacks(execute=True):
+        yield
+
+
+class StubBot:
+    """Stand-in for telegram.Bot that records sends instead of calling the Bot API.
+
+    `errors` maps chat_id to an exception (or list of exceptions raised on
+    successive attempts) to simulate blocked users, flood control, etc.
+    """
+
+    def __init__(self, errors=None):
+        self.errors = {chat_id: list(e) if isinstance(e, list) else [e] for chat_id, e in (errors or {}).items()}
+        self.sent = []
+        self.attempts = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.attempts.append(chat_id)
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+        self.sent.append(chat_id)
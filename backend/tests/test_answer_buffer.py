@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from exams import answer_buffer
+from exams.models import ExamSession, StudentAnswer
+from exams.tasks import flush_answer_buffers
+from tests.helpers import authenticated_client, admin_client, make_exam
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, ANSWER_BUFFER_ENABLED=True)
+class TestAnswerBuffer(TestCase):
+    """Buffered save_answer: Redis hash first, StudentAnswer on flush or submit."""
+
+    def setUp(self):
+        self.client, self.student = authenticated_client()
+        _, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.session_id = response.json()['session_id']
+
+    def tearDown(self):
+        answer_buffer._drain(self.session_id)
+        answer_buffer._get_client().delete(answer_buffer._closed_key(self.session_id))
+
+    def _save(self, question_number, answer, sub_part=None):
+        payload = {'question_number': question_number, 'answer': answer}
+        if sub_part:
+            payload['sub_part'] = sub_part
+        return self.client.post(f'/api/sessions/{self.session_id}/answers/', payload, format='json')
+
+    def test_save_is_buffered_not_written(self):
+        response = self._save(1, 'A')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(StudentAnswer.objects.filter(session_id=self.session_id).exists())
+        self.assertIn(self.session_id, answer_buffer.pending_session_ids())
+
+    def test_submit_grades_buffered_answers(self):
+        self._save(1, 'A')
+        self._save(2, 'B')
+        self._save(2, 'A')  # latest answer wins
+        self._save(36, '5', sub_part='a')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/sessions/{self.session_id}/submit/')
+        self.assertEqual(response.status_code, 200)
+
+        answers = StudentAnswer.objects.filter(session_id=self.session_id)
+        self.assertEqual(answers.count(), 3)
+        self.assertEqual(answers.filter(is_correct=True).count(), 3)
+        self.assertNotIn(self.session_id, answer_buffer.pending_session_ids())
+
+    def test_periodic_flush_upserts_answers(self):
+        StudentAnswer.objects.create(session_id=self.session_id, question_number=1, answer='B')
+        self._save(1, 'C')
+        self._save(3, 'D')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flush_answer_buffers()
+
+        saved = dict(
+            StudentAnswer.objects.filter(session_id=self.session_id)
+            .values_list('question_number', 'answer')
+        )
+        self.assertEqual(saved, {1: 'C', 3: 'D'})
+        self.assertEqual(answer_buffer.pending_session_ids(), [])
+
+    def test_answers_after_submit_are_rejected_not_dropped(self):
+        self.client.post(f'/api/sessions/{self.session_id}/submit/')
+        self.assertFalse(answer_buffer.buffer_answer(self.session_id, 4, None, 'A'))
+
+        response = self._save(4, 'A')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(StudentAnswer.objects.filter(session_id=self.session_id, question_number=4).exists())
+
+    def test_save_racing_a_submit_is_not_reported_saved(self):
+        # The submit has closed the buffer but not committed yet
+        answer_buffer.close(self.session_id)
+        response = self._save(5, 'B')
+        self.assertEqual(response.status_code, 200)
+        # Saved through the locked path instead of the closed buffer
+        self.assertTrue(StudentAnswer.objects.filter(session_id=self.session_id, question_number=5).exists())
+        self.assertEqual(answer_buffer._read(self.session_id), {})
+
+    def test_rolled_back_flush_keeps_buffer(self):
+        self._save(1, 'A')
+        session = ExamSession.objects.get(id=self.session_id)
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                answer_buffer.flush_session(session)
+                raise RuntimeError('rollback')
+        self.assertFalse(StudentAnswer.objects.filter(session_id=self.session_id).exists())
+        self.assertEqual(answer_buffer._read(self.session_id), {'1:': 'A'})
+        self.assertIn(self.session_id, answer_buffer.pending_session_ids())
+
+    def test_answer_changed_during_flush_stays_buffered(self):
+        self._save(1, 'A')
+        session = ExamSession.objects.get(id=self.session_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            answer_buffer.flush_session(session)
+            self._save(1, 'C')  # Arrives after the flush read the buffer
+        self.assertEqual(answer_buffer._read(self.session_id), {'1:': 'C'})
+        self.assertIn(self.session_id, answer_buffer.pending_session_ids())
@@ -19,3 +19,26 @@ class TestTelegramNameSync(TestCase):
         client = Client()
         response = client.get('/api/exams/latest/')
         self.assertEqual(response.status_code, 404)
+
+
+class TestLocalTTLCache(TestCase):
+    def test_lru_eviction_and_counters(self):
+        from exams.local_cache import LocalTTLCache
+        lru = LocalTTLCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)  # 'a' becomes most recent
+        lru.set('c', 3)  # evicts 'b'
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+        self.assertEqual(lru.stats(), {'hits': 2, 'misses': 1, 'size': 2})
+
+    def test_entries_expire(self):
+        from unittest.mock import patch
+        from exams.local_cache import LocalTTLCache
+        lru = LocalTTLCache(maxsize=10, ttl=30)
+        with patch('exams.local_cache.time.monotonic', return_value=1000.0):
+            lru.set('a', 1)
+        with patch('exams.local_cache.time.monotonic', return_value=1031.0):
+            self.assertIsNone(lru.get('a'))
+        self.assertEqual(lru.stats()['size'], 0)
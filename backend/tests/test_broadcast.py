@@ -0,0 +1,115 @@
+import asyncio
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from telegram.error import BadRequest, Forbidden, RetryAfter, TimedOut
+
+from exams.broadcast import TokenBucket, broadcast, BLOCKED, CHAT_NOT_FOUND, FAILED, SENT
+from exams.models import BroadcastDelivery, Student
+from tests.helpers import StubBot
+
+
+@override_settings(
+    TELEGRAM_BROADCAST_RATE=1000, TELEGRAM_BROADCAST_CONCURRENCY=5, TELEGRAM_BROADCAST_CHUNK_SIZE=3,
+)
+class BroadcastTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        for tid in range(1001, 1008):
+            Student.objects.create(full_name=f"Student {tid}", telegram_id=tid)
+        # Keep retry backoff instant and let flood-control pauses expire immediately
+        sleep = asyncio.sleep
+
+        async def instant_sleep(seconds):
+            await sleep(0)
+
+        for target, replacement in (
+            ('exams.broadcast.asyncio.sleep', instant_sleep),
+            ('exams.broadcast.TokenBucket.pause', lambda bucket, seconds: None),
+        ):
+            patcher = patch(target, new=replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_sends_to_everyone_and_channel(self):
+        bot = StubBot()
+        counts = broadcast(bot, key='t1', text='hi', channel_id='@channel')
+        self.assertEqual(counts[SENT], 7)
+        self.assertEqual(bot.sent[0], '@channel')
+        self.assertEqual(sorted(bot.sent[1:]), list(range(1001, 1008)))
+
+    def test_classifies_failures(self):
+        bot = StubBot(errors={
+            1001: Forbidden('bot was blocked by the user'),
+            1002: BadRequest('Chat not found'),
+            1003: [TimedOut(), TimedOut(), TimedOut()],
+            1004: RetryAfter(1),
+        })
+        counts = broadcast(bot, key='t2', text='hi')
+        self.assertEqual(counts, {SENT: 4, BLOCKED: 1, CHAT_NOT_FOUND: 1, FAILED: 1, 'retried': 2})
+        self.assertIn(1004, bot.sent)  # Retried after flood control
+        self.assertEqual(bot.attempts.count(1003), 3)
+
+    def test_resumes_from_checkpoint(self):
+        class Crash(Exception):
+            pass
+
+        # Second chunk (1004-1006) crashes the run, as a worker restart would
+        bot = StubBot(errors={1005: Crash()})
+        with self.assertRaises(Crash):
+            broadcast(bot, key='t3', text='hi', channel_id='@channel')
+
+        retry_bot = StubBot()
+        counts = broadcast(retry_bot, key='t3', text='hi', channel_id='@channel')
+        self.assertNotIn('@channel', retry_bot.sent)
+        self.assertEqual(sorted(retry_bot.sent), list(range(1004, 1008)))
+        self.assertEqual(counts[SENT], 4)
+
+        # A completed broadcast is not repeated
+        again = StubBot()
+        broadcast(again, key='t3', text='hi')
+        self.assertEqual(again.attempts, [])
+
+    def test_records_deliveries_and_skips_unreachable(self):
+        bot = StubBot(errors={
+            1001: Forbidden('bot was blocked by the user'),
+            1002: BadRequest('Chat not found'),
+            1003: [TimedOut()],
+        })
+        broadcast(bot, key='t4', text='hi')
+
+        log = dict(BroadcastDelivery.objects.filter(broadcast='t4').values_list('telegram_id', 'status'))
+        self.assertEqual(len(log), 7)
+        self.assertEqual((log[1001], log[1002], log[1003]), (BLOCKED, CHAT_NOT_FOUND, SENT))
+        self.assertEqual(BroadcastDelivery.objects.get(broadcast='t4', telegram_id=1003).attempts, 2)
+        unreachable = Student.objects.filter(telegram_unreachable_at__isnull=False)
+        self.assertEqual(sorted(unreachable.values_list('telegram_id', flat=True)), [1001, 1002])
+
+        next_bot = StubBot()
+        counts = broadcast(next_bot, key='t5', text='hi')
+        self.assertEqual(sorted(next_bot.attempts), list(range(1003, 1008)))
+        self.assertEqual(counts[SENT], 5)
+
+    def test_repeated_chunk_keeps_latest_outcome(self):
+        broadcast(StubBot(errors={1004: [TimedOut()] * 3}), key='t6', text='hi')
+        cache.clear()  # Lost checkpoint: every chunk is sent again
+        broadcast(StubBot(), key='t6', text='hi')
+        self.assertEqual(BroadcastDelivery.objects.filter(broadcast='t6').count(), 7)
+        delivery = BroadcastDelivery.objects.get(broadcast='t6', telegram_id=1004)
+        self.assertEqual((delivery.status, delivery.attempts), (SENT, 1))
+
+class TokenBucketTest(TestCase):
+
+    def test_rate_limits_sends(self):
+        async def run():
+            bucket = TokenBucket(rate=50, capacity=1)
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            for _ in range(6):
+                await bucket.acquire()
+            return loop.time() - start
+
+        elapsed = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 5 / 50 * 0.9)
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.utils import timezone
 from datetime import timedelta
@@ -7,6 +8,7 @@ from django.contrib.auth.models import User
 
 class TestDashboardData(TestCase):
     def setUp(self):
+        cache.clear()
         self.student = Student.objects.create(full_name="Dashboard Test", telegram_id=33333)
         StudentRating.objects.create(student=self.student, elo=1350, rasch_scaled=62.5)
         StudentStreak.objects.create(student=self.student, current_streak=3, longest_streak=5)
@@ -31,6 +33,50 @@ class TestDashboardData(TestCase):
         self.assertEqual(data['current_streak'], 0)
 
 
+    def test_cold_path_query_count(self):
+        from exams.dashboard_views import _get_dashboard_data
+        admin = User.objects.create_user('dash_admin', password='test')
+        now = timezone.now()
+        MockExam.objects.create(
+            title="Next Exam", scheduled_start=now + timedelta(hours=1),
+            scheduled_end=now + timedelta(hours=4), duration=150, created_by=admin,
+        )
+
+        # Profile (rating + streak), achievements, upcoming exam, session check
+        with self.assertNumQueries(4):
+            data = _get_dashboard_data(self.student)
+        self.assertFalse(data['upcoming_exam']['already_taken'])
+
+        with self.assertNumQueries(0):
+            _get_dashboard_data(self.student)
+
+        # Another student reuses the shared upcoming-exam entry
+        other = Student.objects.create(full_name="Other", telegram_id=33335)
+        with self.assertNumQueries(3):
+            _get_dashboard_data(other)
+
+    def test_submission_invalidates_cached_dashboard(self):
+        from exams.dashboard_views import _get_dashboard_data
+        from exams.student_views import _submit_session
+        from tests.helpers import run_post_submit
+
+        admin = User.objects.create_user('dash_admin2', password='test')
+        now = timezone.now()
+        exam = MockExam.objects.create(
+            title="Open Exam", scheduled_start=now - timedelta(minutes=5),
+            scheduled_end=now + timedelta(hours=3), duration=150, created_by=admin,
+        )
+        self.assertEqual(_get_dashboard_data(self.student)['exams_taken'], 0)
+
+        session = ExamSession.objects.create(student=self.student, exam=exam)
+        with run_post_submit(self):
+            _submit_session(session)
+
+        data = _get_dashboard_data(self.student)
+        self.assertEqual(data['exams_taken'], 1)
+        self.assertTrue(data['upcoming_exam']['already_taken'])
+
+
 class TestExamHistory(TestCase):
     def setUp(self):
         self.admin = User.objects.create_user('admin', password='test')
@@ -61,3 +107,59 @@ class TestExamHistory(TestCase):
         from exams.dashboard_views import _get_exam_history
         history = _get_exam_history(student2)
         self.assertEqual(len(history), 0)
+
+
+class TestHistoryPagination(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('hist_admin', password='test')
+        self.student = Student.objects.create(full_name="Paged History", telegram_id=44446)
+        now = timezone.now()
+        same_time = now - timedelta(days=1)
+        for i in range(5):
+            exam = MockExam.objects.create(
+                title=f"Exam {i}",
+                scheduled_start=now - timedelta(days=10),
+                scheduled_end=now - timedelta(days=9),
+                duration=150,
+                created_by=self.admin,
+            )
+            # Sessions 1 and 2 share a timestamp so the id tie-breaker is exercised
+            submitted_at = same_time if i in (1, 2) else now - timedelta(days=i + 2)
+            ExamSession.objects.create(
+                student=self.student, exam=exam, status='submitted',
+                submitted_at=submitted_at, points=i, exercises_correct=i,
+            )
+
+    def test_pages_cover_history_once_in_order(self):
+        from unittest.mock import patch
+        from exams.dashboard_views import _get_history_page
+        with patch('exams.dashboard_views.HISTORY_PAGE_SIZE', 2):
+            seen = []
+            page = _get_history_page(self.student)
+            seen += page['results']
+            while page['next_cursor']:
+                self.assertEqual(len(page['results']), 2)
+                page = _get_history_page(self.student, page['next_cursor'])
+                seen += page['results']
+
+        ids = [e['session_id'] for e in seen]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        expected = list(
+            ExamSession.objects.filter(student=self.student)
+            .order_by('-submitted_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, [str(i) for i in expected])
+
+    def test_scores_come_from_stored_columns(self):
+        from exams.dashboard_views import _get_exam_history
+        with self.assertNumQueries(2):  # sessions page + EloHistory for that page
+            history = _get_exam_history(self.student, limit=3)
+        self.assertEqual(len(history), 3)
+        self.assertEqual(sorted(e['exercises_correct'] for e in history), [0, 1, 2])
+
+    def test_invalid_cursor_raises(self):
+        from exams.dashboard_views import _get_history_page
+        with self.assertRaises(ValueError):
+            _get_history_page(self.student, 'not-a-cursor')
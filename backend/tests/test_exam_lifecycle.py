@@ -1,4 +1,6 @@
-from django.test import TestCase
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 from exams.models import MockExam, Student, ExamSession
@@ -111,3 +113,190 @@ class TestExamDeletion(TestCase):
         )
         has_sessions = ExamSession.objects.filter(exam=self.exam).exists()
         self.assertTrue(has_sessions)
+
+
+class TestSessionDeadline(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin4', password='test')
+        self.student = Student.objects.create(full_name="Deadline", telegram_id=88888)
+        now = timezone.now()
+        self.exam = MockExam.objects.create(
+            title="Deadline Exam",
+            scheduled_start=now - timedelta(minutes=5),
+            scheduled_end=now + timedelta(hours=3),
+            duration=150,
+            created_by=self.admin,
+        )
+
+    def test_deadline_is_start_plus_duration(self):
+        session = ExamSession.objects.create(student=self.student, exam=self.exam)
+        self.assertAlmostEqual(
+            (session.deadline - session.started_at).total_seconds(), 150 * 60, delta=1,
+        )
+
+    def test_late_start_deadline_is_window_close(self):
+        self.exam.scheduled_end = timezone.now() + timedelta(minutes=10)
+        self.exam.save()
+        session = ExamSession.objects.create(student=self.student, exam=self.exam)
+        self.assertEqual(session.deadline, self.exam.scheduled_end)
+
+    def test_sweep_submits_only_due_sessions(self):
+        from exams.tasks import auto_submit_expired_sessions
+
+        due = ExamSession.objects.create(student=self.student, exam=self.exam)
+        ExamSession.objects.filter(id=due.id).update(deadline=timezone.now() - timedelta(seconds=1))
+        other = Student.objects.create(full_name="Not Due", telegram_id=88889)
+        not_due = ExamSession.objects.create(student=other, exam=self.exam)
+
+        auto_submit_expired_sessions()
+
+        due.refresh_from_db()
+        not_due.refresh_from_db()
+        self.assertEqual(due.status, ExamSession.Status.SUBMITTED)
+        self.assertTrue(due.is_auto_submitted)
+        self.assertEqual(not_due.status, ExamSession.Status.IN_PROGRESS)
+
+    def test_sweep_submits_bulk_created_session_without_deadline(self):
+        from exams.tasks import auto_submit_expired_sessions
+
+        self.exam.scheduled_end = timezone.now() - timedelta(seconds=1)
+        self.exam.save()
+        due, = ExamSession.objects.bulk_create([ExamSession(student=self.student, exam=self.exam)])
+        other = Student.objects.create(full_name="Fresh", telegram_id=88890)
+        open_exam = MockExam.objects.create(
+            title="Open Exam",
+            scheduled_start=timezone.now(),
+            scheduled_end=timezone.now() + timedelta(hours=3),
+            duration=150,
+            created_by=self.admin,
+        )
+        not_due, = ExamSession.objects.bulk_create([ExamSession(student=other, exam=open_exam)])
+        self.assertIsNone(ExamSession.objects.get(id=due.id).deadline)
+
+        auto_submit_expired_sessions()
+
+        due.refresh_from_db()
+        not_due.refresh_from_db()
+        self.assertEqual(due.status, ExamSession.Status.SUBMITTED)
+        self.assertEqual(not_due.status, ExamSession.Status.IN_PROGRESS)
+        self.assertIsNotNone(not_due.deadline)
+
+    def test_eta_task_ignores_sessions_not_yet_due(self):
+        from exams.tasks import auto_submit_session
+
+        session = ExamSession.objects.create(student=self.student, exam=self.exam)
+        auto_submit_session(str(session.id))
+        session.refresh_from_db()
+        self.assertEqual(session.status, ExamSession.Status.IN_PROGRESS)
+
+
+class TestChunkedAutoSubmit(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.admin = User.objects.create_user('admin5', password='test')
+        now = timezone.now()
+        self.exam = MockExam.objects.create(
+            title="Closing Exam",
+            scheduled_start=now - timedelta(hours=3),
+            scheduled_end=now - timedelta(seconds=30),
+            duration=150,
+            created_by=self.admin,
+        )
+
+    def _due_sessions(self, count):
+        sessions = []
+        for i in range(count):
+            student = Student.objects.create(full_name=f"Due {i}", telegram_id=77000 + i)
+            sessions.append(ExamSession.objects.create(student=student, exam=self.exam))
+        ExamSession.objects.filter(exam=self.exam).update(deadline=self.exam.scheduled_end)
+        return sessions
+
+    @override_settings(AUTO_SUBMIT_CHUNK_SIZE=2)
+    def test_window_close_fans_out_in_chunks(self):
+        from exams.tasks import auto_submit_expired_sessions
+
+        self._due_sessions(5)
+        with patch('exams.tasks.chord') as mock_chord, \
+                patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            auto_submit_expired_sessions()
+            # A second sweep while the fan-out is in flight does not dispatch again
+            auto_submit_expired_sessions()
+
+        self.assertEqual(mock_chord.call_count, 1)
+        chunks = [sig.args[0] for sig in mock_chord.call_args[0][0]]
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        callback = mock_chord.return_value.call_args[0][0]
+        self.assertEqual(callback.args[0], [str(self.exam.id)])
+        # Calibration waits for the chord callback
+        mock_calibrate.assert_not_called()
+
+    def test_callback_calibrates_after_all_chunks(self):
+        from exams.tasks import auto_submit_chunk, finish_auto_submit
+
+        sessions = self._due_sessions(3)
+        ids = [str(s.id) for s in sessions]
+        results = [auto_submit_chunk(ids[:2]), auto_submit_chunk(ids[2:])]
+        self.assertEqual([r['submitted'] for r in results], [2, 1])
+        self.assertEqual(results[0]['failed'], [])
+
+        with patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            finish_auto_submit(results, [str(self.exam.id)])
+        mock_calibrate.assert_called_once_with(str(self.exam.id))
+
+    def test_calibration_deferred_while_sessions_still_due(self):
+        from exams.tasks import _calibrate_closed_exams
+
+        self._due_sessions(1)
+        with patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            _calibrate_closed_exams([str(self.exam.id)])
+        mock_calibrate.assert_not_called()
+
+    def test_sweep_calibrates_exam_closed_long_ago(self):
+        """Pending calibration is tracked on the exam, not by a time window."""
+        from exams.tasks import auto_submit_expired_sessions
+
+        self.exam.scheduled_end = timezone.now() - timedelta(minutes=20)
+        self.exam.save()
+        with patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            auto_submit_expired_sessions()
+            auto_submit_expired_sessions()  # Already queued: not dispatched twice
+        mock_calibrate.assert_called_once_with(str(self.exam.id))
+
+    def test_calibrated_exam_is_not_requeued(self):
+        from exams.tasks import auto_submit_expired_sessions, calibrate_exam_rasch
+
+        calibrate_exam_rasch(str(self.exam.id))  # Fallback path (no participants)
+        self.exam.refresh_from_db()
+        self.assertIsNotNone(self.exam.rasch_calibrated_at)
+        with patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            auto_submit_expired_sessions()
+        mock_calibrate.assert_not_called()
+
+    def test_stuck_session_stops_blocking_after_grace(self):
+        from exams.tasks import _calibrate_closed_exams
+
+        self._due_sessions(1)
+        self.exam.scheduled_end = timezone.now() - timedelta(hours=1)
+        self.exam.save()
+        with patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            _calibrate_closed_exams([str(self.exam.id)])
+        mock_calibrate.assert_called_once_with(str(self.exam.id))
+
+    @override_settings(AUTO_SUBMIT_CHUNK_SIZE=2)
+    def test_sweep_with_fanout_in_flight_still_calibrates_graded_exams(self):
+        from exams.tasks import auto_submit_expired_sessions
+
+        graded = MockExam.objects.create(
+            title="Graded Exam",
+            scheduled_start=self.exam.scheduled_start,
+            scheduled_end=self.exam.scheduled_end,
+            duration=150,
+            created_by=self.admin,
+        )
+        self._due_sessions(5)
+        with patch('exams.tasks.chord'), \
+                patch('exams.tasks.calibrate_exam_rasch.delay') as mock_calibrate:
+            auto_submit_expired_sessions()
+            auto_submit_expired_sessions()  # Fan-out lock held
+        mock_calibrate.assert_called_once_with(str(graded.id))
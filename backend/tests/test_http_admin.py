@@ -5,7 +5,7 @@ from unittest.mock import patch
 from django.test import TestCase, override_settings
 from django.utils import timezone
 
-from exams.models import MockExam, CorrectAnswer, ExamSession
+from exams.models import BroadcastDelivery, MockExam, CorrectAnswer, ExamSession, StudentAnswer
 from tests.helpers import admin_client, authenticated_client, make_student, make_exam
 
 
@@ -143,6 +143,63 @@ class TestAdminResults(TestCase):
         self.assertIn('total_exams', data)
         self.assertIn('score_distribution', data)
 
+    def test_analytics_scores_sessions_without_points(self):
+        ExamSession.objects.create(
+            student=make_student(telegram_id=601), exam=self.exam, status='submitted', points=44,
+        )
+        legacy = ExamSession.objects.create(
+            student=make_student(telegram_id=602), exam=self.exam, status='submitted',
+        )
+        StudentAnswer.objects.bulk_create([
+            StudentAnswer(session=legacy, question_number=q, answer='A', is_correct=q <= 22)
+            for q in range(1, 31)
+        ])
+        self.assertIsNone(legacy.points)
+        data = self.client.get('/api/admin/analytics/').json()
+        self.assertEqual(data['avg_score_percent'], 60.0)  # (44 + 22) / 2 of 55
+        buckets = {b['bucket']: b['count'] for b in data['score_distribution']}
+        self.assertEqual(buckets['81-100%'], 1)
+        self.assertEqual(buckets['41-60%'], 1)
+
+    def test_manual_notify_after_completed_broadcast(self):
+        from exams.tasks import send_exam_notification
+        from tests.helpers import StubBot
+
+        make_student(telegram_id=701)
+        bot = StubBot()
+        with override_settings(TELEGRAM_BOT_TOKEN='123:fake'), \
+                patch('exams.telegram_client.get_bot', return_value=bot):
+            send_exam_notification(str(self.exam.id))  # Automatic run completes
+            self.assertEqual(bot.sent, [701])
+
+            with patch('exams.tasks.send_exam_notification.delay') as delay:
+                response = self.client.post('/api/admin/notify/', {'exam_id': str(self.exam.id)}, format='json')
+            self.assertEqual(response.status_code, 200)
+            send_exam_notification(*delay.call_args.args, **delay.call_args.kwargs)
+        self.assertEqual(bot.sent, [701, 701])
+
+    def test_broadcast_summary(self):
+        blocked = make_student(telegram_id=501)
+        blocked.telegram_unreachable_at = timezone.now()
+        blocked.save()
+        Status = BroadcastDelivery.Status
+        BroadcastDelivery.objects.bulk_create([
+            BroadcastDelivery(broadcast='exam_a', telegram_id=501, status=Status.BLOCKED),
+            BroadcastDelivery(broadcast='exam_a', telegram_id=502, status=Status.SENT, attempts=2),
+            BroadcastDelivery(broadcast='exam_a', telegram_id=503, status=Status.FAILED, attempts=3),
+            BroadcastDelivery(broadcast='exam_b', telegram_id=502, status=Status.SENT),
+        ])
+        response = self.client.get('/api/admin/broadcasts/')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['unreachable_students'], 1)
+        summary = {b['broadcast']: b for b in data['broadcasts']}
+        self.assertEqual(
+            {k: summary['exam_a'][k] for k in ('total', 'sent', 'blocked', 'chat_not_found', 'failed', 'retried')},
+            {'total': 3, 'sent': 1, 'blocked': 1, 'chat_not_found': 0, 'failed': 1, 'retried': 2},
+        )
+        self.assertEqual(summary['exam_b']['total'], 1)
+
 
 @override_settings(SECURE_SSL_REDIRECT=False)
 class TestAdminAuthRequired(TestCase):
@@ -158,3 +158,75 @@ class TestLogout(TestCase):
         anon = APIClient()
         refresh_response = anon.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
         self.assertEqual(refresh_response.status_code, 401)
+
+
+@override_settings(TELEGRAM_BOT_TOKEN=BOT_TOKEN, SECURE_SSL_REDIRECT=False)
+class TestStudentAuthCache(TestCase):
+    """Authenticated Student lookups are served from the per-process cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _get_user(self, student):
+        from exams.permissions import StudentJWTAuthentication
+        return StudentJWTAuthentication().get_user({'student_id': str(student.id)})
+
+    def test_repeat_lookups_skip_db_and_redis(self):
+        from unittest.mock import patch
+        student = make_student(telegram_id=55501)
+        self._get_user(student)
+
+        with self.assertNumQueries(0), patch('exams.permissions.cache.get') as redis_get:
+            user = self._get_user(student)
+        redis_get.assert_not_called()
+        self.assertEqual(user.id, student.id)
+        self.assertEqual(user.full_name, student.full_name)
+
+    def test_each_request_gets_its_own_instance(self):
+        student = make_student(telegram_id=55502)
+        self.assertIsNot(self._get_user(student), self._get_user(student))
+
+    def test_login_name_change_invalidates(self):
+        client = APIClient()
+        user_data = {'id': 55503, 'first_name': 'Old', 'last_name': 'Name'}
+        client.post('/api/auth/telegram/', {'initData': _build_init_data(user_data)}, format='json')
+        student = Student.objects.get(telegram_id=55503)
+        self.assertEqual(self._get_user(student).full_name, 'Old Name')
+
+        user_data['first_name'] = 'New'
+        client.post('/api/auth/telegram/', {'initData': _build_init_data(user_data)}, format='json')
+        self.assertEqual(self._get_user(student).full_name, 'New Name')
+
+    def test_unknown_student_rejected(self):
+        import uuid
+        from rest_framework.exceptions import AuthenticationFailed
+        from exams.permissions import StudentJWTAuthentication
+        with self.assertRaises(AuthenticationFailed):
+            StudentJWTAuthentication().get_user({'student_id': str(uuid.uuid4())})
+
+    def test_cached_student_has_every_field(self):
+        from django.utils import timezone
+        student = make_student(telegram_id=55504)
+        Student.objects.filter(id=student.id).update(telegram_unreachable_at=timezone.now())
+        self._get_user(student)
+        user = self._get_user(student)  # From the cache
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(user.telegram_unreachable_at)
+
+    def test_admin_delete_invalidates(self):
+        from django.contrib.admin.sites import site
+        from django.test import RequestFactory
+        from rest_framework.exceptions import AuthenticationFailed
+        from exams.permissions import StudentJWTAuthentication
+        student_admin = site._registry[Student]
+        request = RequestFactory().post('/')
+        single, bulk = make_student(telegram_id=55505), make_student(telegram_id=55506)
+        student_ids = [str(single.id), str(bulk.id)]
+        self._get_user(single)
+        self._get_user(bulk)
+
+        student_admin.delete_model(request, single)
+        student_admin.delete_queryset(request, Student.objects.filter(id=bulk.id))
+        for student_id in student_ids:
+            with self.assertRaises(AuthenticationFailed):
+                StudentJWTAuthentication().get_user({'student_id': student_id})
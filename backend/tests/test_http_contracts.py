@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase, override_settings
 
 from exams.models import ExamSession, StudentAnswer
@@ -71,6 +72,7 @@ class TestHistoryContract(TestCase):
     """Verify /api/me/history/ returns exact field names frontend expects."""
 
     def setUp(self):
+        cache.clear()
         self.client, self.student = authenticated_client()
         _, admin = admin_client()
         exam = make_exam(admin)
@@ -83,11 +85,13 @@ class TestHistoryContract(TestCase):
         _submit_session(session)
 
     def test_history_response_fields(self):
-        response = self.client.get('/api/me/history/')
+        self.assertIsInstance(self.client.get('/api/me/history/').json(), list)
+        response = self.client.get('/api/me/history/', {'paginate': 1})
         data = response.json()
-        self.assertGreaterEqual(len(data), 1)
+        self.assertIn('next_cursor', data)
+        self.assertGreaterEqual(len(data['results']), 1)
 
-        entry = data[0]
+        entry = data['results'][0]
         required_fields = [
             'session_id', 'exam_id', 'exam_title', 'submitted_at',
             'exercises_correct', 'exercises_total',
@@ -1,5 +1,6 @@
 from django.core.cache import cache
 from django.test import TestCase, override_settings
+from django.utils import timezone
 
 from exams.models import (
     ExamSession, StudentAnswer, StudentRating, StudentStreak,
@@ -15,6 +16,7 @@ class TestDashboardHTTP(TestCase):
     """Test GET /api/me/dashboard/ response structure."""
 
     def setUp(self):
+        cache.clear()  # Reset dashboard and upcoming-exam caches between tests
         self.client, self.student = authenticated_client()
 
     def test_dashboard_new_student(self):
@@ -53,13 +55,26 @@ class TestHistoryHTTP(TestCase):
     """Test GET /api/me/history/ response structure."""
 
     def setUp(self):
+        cache.clear()  # Reset cached first history pages between tests
         self.client, self.student = authenticated_client()
         _, self.admin = admin_client()
 
     def test_empty_history(self):
+        response = self.client.get('/api/me/history/', {'paginate': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': [], 'next_cursor': None})
+
+    def test_history_without_paginate_is_a_list(self):
+        exam = make_exam(self.admin)
+        ExamSession.objects.create(
+            student=self.student, exam=exam, status='submitted', submitted_at=timezone.now(),
+            points=3, exercises_correct=3,
+        )
         response = self.client.get('/api/me/history/')
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), [])
+        data = response.json()
+        self.assertIsInstance(data, list)
+        self.assertEqual([e['exam_title'] for e in data], [exam.title])
 
     def test_history_after_exam(self):
         exam = make_exam(self.admin)
@@ -71,14 +86,45 @@ class TestHistoryHTTP(TestCase):
         )
         _submit_session(session)
 
-        response = self.client.get('/api/me/history/')
+        response = self.client.get('/api/me/history/', {'paginate': 1})
         self.assertEqual(response.status_code, 200)
-        data = response.json()
+        data = response.json()['results']
         self.assertEqual(len(data), 1)
         self.assertIn('exam_title', data[0])
         self.assertIn('exercises_correct', data[0])
         self.assertIn('elo_delta', data[0])
 
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/me/history/', {'cursor': '%%%'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_with_bad_session_id_or_naive_time(self):
+        import base64
+        for raw in ('2026-01-01T10:00:00+00:00|not-a-uuid', '2026-01-01T10:00:00|' + str(self.student.id)):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            response = self.client.get('/api/me/history/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 400, raw)
+
+    def test_first_page_cached_until_submission(self):
+        from tests.helpers import run_post_submit
+
+        first = make_exam(self.admin, title='First')
+        session = ExamSession.objects.create(student=self.student, exam=first, status='in_progress')
+        with run_post_submit(self):
+            _submit_session(session)
+        self.assertEqual(len(self.client.get('/api/me/history/', {'paginate': 1}).json()['results']), 1)
+
+        # Served from cache: no session query
+        with self.assertNumQueries(0):
+            self.client.get('/api/me/history/', {'paginate': 1})
+
+        second = make_exam(self.admin, title='Second')
+        session = ExamSession.objects.create(student=self.student, exam=second, status='in_progress')
+        with run_post_submit(self):
+            _submit_session(session)
+        results = self.client.get('/api/me/history/', {'paginate': 1}).json()['results']
+        self.assertEqual([r['exam_title'] for r in results], ['Second', 'First'])
+
 
 @override_settings(SECURE_SSL_REDIRECT=False)
 class TestAchievementsHTTP(TestCase):
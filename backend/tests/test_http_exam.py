@@ -5,7 +5,7 @@ from django.test import TestCase, override_settings
 from django.utils import timezone
 
 from exams.models import ExamSession, StudentAnswer, StudentRating, EloHistory
-from tests.helpers import authenticated_client, admin_client, make_exam, make_student
+from tests.helpers import authenticated_client, admin_client, make_exam, make_student, run_post_submit
 
 
 @override_settings(SECURE_SSL_REDIRECT=False)
@@ -44,7 +44,8 @@ class TestExamLifecycleHTTP(TestCase):
                 self.assertEqual(r.status_code, 200, f"Q{q}{sub} save failed: {r.json()}")
 
         # 3. Submit
-        response = self.client.post(f'/api/sessions/{session_id}/submit/')
+        with run_post_submit(self):
+            response = self.client.post(f'/api/sessions/{session_id}/submit/')
         self.assertEqual(response.status_code, 200)
 
         # 4. Verify DB state
@@ -176,6 +177,67 @@ class TestAnswerValidation(TestCase):
         self.assertEqual(answer.answer, 'B')
 
 
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TestBulkAnswerSave(TestCase):
+    """Test the batch answer endpoint used when replaying an offline queue."""
+
+    def setUp(self):
+        self.client, self.student = authenticated_client()
+        _, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+        r = self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.session_id = r.json()['session_id']
+        self.url = f'/api/sessions/{self.session_id}/answers/bulk/'
+
+    def test_saves_all_answers(self):
+        StudentAnswer.objects.create(session_id=self.session_id, question_number=1, answer='B')
+        response = self.client.post(self.url, {'answers': [
+            {'question_number': 1, 'answer': 'A'},
+            {'question_number': 2, 'answer': 'C'},
+            {'question_number': 36, 'sub_part': 'a', 'answer': '5'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['saved'], 3)
+        saved = {
+            (a.question_number, a.sub_part): a.answer
+            for a in StudentAnswer.objects.filter(session_id=self.session_id)
+        }
+        self.assertEqual(saved, {(1, None): 'A', (2, None): 'C', (36, 'a'): '5'})
+
+    def test_reports_invalid_items_and_saves_the_rest(self):
+        response = self.client.post(self.url, {'answers': [
+            {'question_number': 3, 'answer': 'D'},
+            {'question_number': 46, 'answer': 'X'},
+            {'question_number': 40, 'answer': '5'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        statuses = [r['status'] for r in response.json()['results']]
+        self.assertEqual(statuses, ['saved', 'invalid', 'invalid'])
+        self.assertEqual(StudentAnswer.objects.filter(session_id=self.session_id).count(), 1)
+
+    def test_later_duplicate_wins(self):
+        self.client.post(self.url, {'answers': [
+            {'question_number': 1, 'answer': 'A'},
+            {'question_number': 1, 'answer': 'B'},
+        ]}, format='json')
+        answer = StudentAnswer.objects.get(session_id=self.session_id, question_number=1)
+        self.assertEqual(answer.answer, 'B')
+
+    def test_empty_or_oversized_batch_rejected(self):
+        self.assertEqual(self.client.post(self.url, {'answers': []}, format='json').status_code, 400)
+        too_many = [{'question_number': 1, 'answer': 'A'}] * 101
+        self.assertEqual(self.client.post(self.url, {'answers': too_many}, format='json').status_code, 400)
+
+    def test_submitted_session_rejected(self):
+        self.client.post(f'/api/sessions/{self.session_id}/submit/')
+        response = self.client.post(self.url, {'answers': [
+            {'question_number': 1, 'answer': 'A'},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
 @override_settings(SECURE_SSL_REDIRECT=False)
 class TestLateStart(TestCase):
     """Test exam with reduced time for late starters."""
@@ -238,3 +300,125 @@ class TestOtherStudentIsolation(TestCase):
 
         response = self.client_b.get(f'/api/sessions/{session_id}/results/')
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TestResultsCaching(TestCase):
+    """Closed-exam results are rendered once, revalidated with 304s and replaced on recalibration."""
+
+    def setUp(self):
+        self.client, self.student = authenticated_client()
+        self.admin_api, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+        response = self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.session_id = response.json()['session_id']
+        self.client.post(f'/api/sessions/{self.session_id}/answers/', {
+            'question_number': 1, 'answer': 'A',
+        }, format='json')
+        with run_post_submit(self):
+            self.client.post(f'/api/sessions/{self.session_id}/submit/')
+        self.exam.scheduled_end = timezone.now() - timedelta(minutes=1)
+        self.exam.save()
+        self.url = f'/api/sessions/{self.session_id}/results/'
+
+    def test_closed_results_rendered_once(self):
+        from exams import student_views
+        with patch('exams.student_views._render_results', wraps=student_views._render_results) as render:
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.json(), second.json())
+        self.assertIsNotNone(first.json()['elo'])
+
+    def test_conditional_requests_get_304(self):
+        response = self.client.get(self.url)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_calibration_replaces_cached_results(self):
+        from exams import student_views
+        from exams.tasks import calibrate_exam_rasch
+        with patch('exams.student_views._render_results', wraps=student_views._render_results) as render:
+            self.client.get(self.url)
+            calibrate_exam_rasch(str(self.exam.id))
+            self.client.get(self.url)
+        self.assertEqual(render.call_count, 2)
+
+    def test_answer_key_upload_replaces_cached_results(self):
+        self.assertEqual(self.client.get(self.url).json()['breakdown'][0]['correct_answer'], 'A')
+        self.admin_api.post(f'/api/admin/exams/{self.exam.id}/answers/', {
+            'answers': [{'question_number': 1, 'sub_part': None, 'correct_answer': 'B'}],
+        }, format='json')
+        self.assertEqual(self.client.get(self.url).json()['breakdown'][0]['correct_answer'], 'B')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TestExamPdfDelivery(TestCase):
+    """PDF is served with Range support, or handed to the proxy after permission checks."""
+
+    PDF_BYTES = b'%PDF-1.4 fake pdf content for range tests'
+
+    def setUp(self):
+        import tempfile
+        from django.core.files.base import ContentFile
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.client, self.student = authenticated_client()
+        _, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+        self.exam.pdf_file.save('exam.pdf', ContentFile(self.PDF_BYTES))
+        self.client.post(f'/api/exams/{self.exam.id}/start/')
+        self.url = f'/api/exams/{self.exam.id}/pdf/'
+
+    def test_full_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.PDF_BYTES)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_byte_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+        self.assertEqual(response['Content-Range'], f'bytes 0-3/{len(self.PDF_BYTES)}')
+
+    def test_suffix_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), self.PDF_BYTES[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={len(self.PDF_BYTES)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.PDF_BYTES)}')
+
+    @override_settings(PDF_DELIVERY='x-accel', PDF_ACCEL_PREFIX='/protected-media/')
+    def test_x_accel_redirect(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.exam.pdf_file.name}')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(PDF_DELIVERY='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], self.exam.pdf_file.path)
+
+    @override_settings(PDF_DELIVERY='x-accel')
+    def test_proxy_mode_still_checks_session(self):
+        other_client, _ = authenticated_client(make_student(telegram_id=999001, full_name='Other'))
+        response = other_client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('X-Accel-Redirect', response)
@@ -3,7 +3,7 @@ from django.test import TestCase, override_settings
 from exams.models import ExamSession, StudentAnswer, StudentRating, EloHistory
 from exams.student_views import _submit_session
 from exams.scoring import compute_letter_grade
-from tests.helpers import authenticated_client, admin_client, make_student, make_exam
+from tests.helpers import authenticated_client, admin_client, make_student, make_exam, run_post_submit
 
 
 class TestMultiStudentExam(TestCase):
@@ -39,7 +39,8 @@ class TestMultiStudentExam(TestCase):
 
     def test_all_students_get_elo_updates(self):
         for session in self.sessions:
-            _submit_session(session)
+            with run_post_submit(self):
+                _submit_session(session)
 
         for student in self.students:
             self.assertTrue(
@@ -53,7 +54,8 @@ class TestMultiStudentExam(TestCase):
 
     def test_better_scores_get_higher_elo(self):
         for session in self.sessions:
-            _submit_session(session)
+            with run_post_submit(self):
+                _submit_session(session)
 
         elos = [
             StudentRating.objects.get(student=s).elo
@@ -105,8 +107,10 @@ class TestMultiStudentHTTP(TestCase):
             }, format='json')
 
         # Both submit
-        self.assertEqual(client_a.post(f'/api/sessions/{sid_a}/submit/').status_code, 200)
-        self.assertEqual(client_b.post(f'/api/sessions/{sid_b}/submit/').status_code, 200)
+        with run_post_submit(self):
+            self.assertEqual(client_a.post(f'/api/sessions/{sid_a}/submit/').status_code, 200)
+        with run_post_submit(self):
+            self.assertEqual(client_b.post(f'/api/sessions/{sid_b}/submit/').status_code, 200)
 
         # Both have ELO
         rating_a = StudentRating.objects.get(student=student_a)
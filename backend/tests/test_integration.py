@@ -7,11 +7,12 @@ from django.contrib.auth.models import User
 
 from exams.models import (
     MockExam, ExamSession, StudentAnswer, CorrectAnswer,
-    Student, StudentRating, EloHistory, StudentStreak,
+    Student, StudentRating, EloHistory, StudentStreak, ExamScoreAggregate,
 )
 from exams.student_views import _submit_session
 from exams.gamification import update_streak, check_streak_broken
 from exams.scoring import compute_score, compute_letter_grade
+from tests.helpers import run_post_submit
 
 
 class TestFullExamFlow(TestCase):
@@ -64,7 +65,8 @@ class TestFullExamFlow(TestCase):
                 session=session, question_number=q, sub_part='b', answer='10'
             )
 
-        _submit_session(session)
+        with run_post_submit(self):
+            _submit_session(session)
         session.refresh_from_db()
 
         self.assertEqual(session.status, 'submitted')
@@ -314,7 +316,8 @@ class TestEloCalculation(TestCase):
         StudentAnswer.objects.create(
             session=session, question_number=1, sub_part=None, answer='A'
         )
-        _submit_session(session)
+        with run_post_submit(self):
+            _submit_session(session)
 
         elo_record = EloHistory.objects.get(session=session)
         self.assertEqual(elo_record.k_factor, 40)
@@ -330,7 +333,8 @@ class TestEloCalculation(TestCase):
             status=ExamSession.Status.IN_PROGRESS,
         )
         # Don't answer any questions (0/55 score)
-        _submit_session(session)
+        with run_post_submit(self):
+            _submit_session(session)
 
         rating.refresh_from_db()
         self.assertGreaterEqual(rating.elo, 100)
@@ -341,7 +345,8 @@ class TestEloCalculation(TestCase):
             student=self.student, exam=self.exam,
             status=ExamSession.Status.IN_PROGRESS,
         )
-        _submit_session(session)
+        with run_post_submit(self):
+            _submit_session(session)
 
         self.assertTrue(EloHistory.objects.filter(session=session).exists())
         elo_record = EloHistory.objects.get(session=session)
@@ -349,3 +354,69 @@ class TestEloCalculation(TestCase):
         self.assertEqual(elo_record.elo_before, 1200)
         self.assertIsNotNone(elo_record.elo_after)
         self.assertEqual(elo_record.elo_delta, elo_record.elo_after - elo_record.elo_before)
+
+    def test_exam_average_uses_running_aggregate(self):
+        """Opponent average comes from the other sessions' running totals."""
+        other = Student.objects.create(full_name="Other", telegram_id=12346)
+        other_session = ExamSession.objects.create(student=other, exam=self.exam)
+        StudentAnswer.objects.create(
+            session=other_session, question_number=1, sub_part=None, answer='A'
+        )
+        session = ExamSession.objects.create(student=self.student, exam=self.exam)
+        _submit_session(other_session)
+        with run_post_submit(self):
+            _submit_session(session)
+
+        aggregate = ExamScoreAggregate.objects.get(exam=self.exam)
+        self.assertEqual((aggregate.submitted_count, aggregate.correct_sum), (2, 1))
+        elo_record = EloHistory.objects.get(session=session)
+        self.assertEqual(elo_record.exam_avg_percent, round(1 / 55, 4))
+
+    def test_reconcile_recomputes_from_answers(self):
+        from exams.elo import reconcile_exam_aggregate
+
+        session = ExamSession.objects.create(student=self.student, exam=self.exam)
+        StudentAnswer.objects.create(
+            session=session, question_number=1, sub_part=None, answer='A'
+        )
+        _submit_session(session)
+        ExamScoreAggregate.objects.filter(exam=self.exam).update(submitted_count=7, correct_sum=40)
+
+        before, after = reconcile_exam_aggregate(self.exam.id)
+        self.assertEqual(before, (7, 40))
+        self.assertEqual(after, (1, 1))
+
+
+class TestPostSubmitPipeline(TestCase):
+    """Elo, streak and achievements run after commit, not inside submission."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser('admin_pipe', 'pipe@test.com', 'pass')
+        self.student = Student.objects.create(full_name="Pipeline Student", telegram_id=54321)
+        now = timezone.now()
+        self.exam = MockExam.objects.create(
+            title="Pipeline Exam",
+            scheduled_start=now - timedelta(minutes=5),
+            scheduled_end=now + timedelta(hours=3),
+            duration=150,
+            created_by=self.admin,
+        )
+        self.session = ExamSession.objects.create(student=self.student, exam=self.exam)
+
+    def test_submit_defers_post_submit_work(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            _submit_session(self.session)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(EloHistory.objects.filter(session=self.session).exists())
+
+    def test_pipeline_is_idempotent(self):
+        from exams.tasks import process_submission
+
+        _submit_session(self.session)
+        process_submission(str(self.session.id))
+        process_submission(str(self.session.id))
+
+        self.assertEqual(EloHistory.objects.filter(session=self.session).count(), 1)
+        self.assertEqual(StudentRating.objects.get(student=self.student).exams_taken, 1)
+        self.assertEqual(StudentStreak.objects.get(student=self.student).current_streak, 1)
@@ -128,6 +128,12 @@ class LeaderboardPrivacyTest(TestCase):
         self.assertEqual(my['full_name'], 'Student 54')
         self.assertNotIn('*', my['full_name'])
 
+    def test_neighbors_around_current_user(self):
+        c, _ = authenticated_client(self.students[52])
+        resp = c.get('/api/leaderboard/?limit=10&around=2')
+        self.assertEqual([n['rank'] for n in resp.data['neighbors']], [51, 52, 53, 54, 55])
+        self.assertEqual(resp.data['neighbors'][2]['full_name'], 'Student 52')
+
     def test_mask_name_single_word(self):
         from exams.leaderboard_views import _mask_name
         self.assertEqual(_mask_name('Alisher'), 'A*****r')
@@ -139,3 +145,199 @@ class LeaderboardPrivacyTest(TestCase):
     def test_mask_name_short(self):
         from exams.leaderboard_views import _mask_name
         self.assertEqual(_mask_name('Al'), 'A*')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, LEADERBOARD_REDIS_ENABLED=True)
+class LeaderboardRedisTest(TestCase):
+    """Rankings served from Redis sorted sets."""
+
+    def setUp(self):
+        from exams import leaderboard_store
+        self.store = leaderboard_store
+        cache.clear()
+        self._clear_boards()
+        _, self.admin = admin_client()
+        self.students = []
+        for i in range(6):
+            s = make_student(telegram_id=3000 + i, full_name=f"Redis {i}")
+            StudentRating.objects.create(student=s, elo=1500 - i * 20, exams_taken=i + 1)
+            self.students.append(s)
+
+    def tearDown(self):
+        self._clear_boards()
+
+    def _clear_boards(self):
+        from exams import leaderboard_store
+        leaderboard_store._get_client().delete(*leaderboard_store.BOARD_KEYS.values(), leaderboard_store.READY_KEY)
+
+    def test_top_rated_matches_database_order(self):
+        resp = authenticated_client(self.students[0])[0].get('/api/leaderboard/')
+        self.assertEqual([e['full_name'] for e in resp.data['entries']], [f"Redis {i}" for i in range(6)])
+        self.assertEqual([e['rank'] for e in resp.data['entries']], list(range(1, 7)))
+
+    def test_my_rank_outside_top(self):
+        c, _ = authenticated_client(self.students[4])
+        resp = c.get('/api/leaderboard/?limit=2')
+        self.assertEqual(resp.data['my_entry']['rank'], 5)
+
+        resp = c.get('/api/leaderboard/?tab=most_active&limit=2')
+        # Most active is reversed: student 4 has the second most exams
+        self.assertEqual(resp.data['entries'][0]['full_name'], 'Redis 5')
+        self.assertEqual(resp.data['entries'][1]['rank'], 2)
+
+    def test_neighbors_around_me(self):
+        c, _ = authenticated_client(self.students[3])
+        resp = c.get('/api/leaderboard/?limit=1&around=1')
+        neighbors = resp.data['neighbors']
+        self.assertEqual([n['rank'] for n in neighbors], [3, 4, 5])
+        self.assertTrue(neighbors[1]['is_current_user'])
+
+    def test_neighbors_around_me_with_ties(self):
+        tied = self.students[1:4]
+        StudentRating.objects.filter(student__in=tied).update(elo=1480)
+        # Last of the tied students in the sorted set, though it shares rank 2
+        last = min(tied, key=lambda s: str(s.id))
+        c, _ = authenticated_client(last)
+        resp = c.get('/api/leaderboard/?limit=1&around=1')
+        self.assertEqual(resp.data['my_entry']['rank'], 2)
+        self.assertTrue(any(n['is_current_user'] for n in resp.data['neighbors']))
+
+    def test_readers_use_database_while_another_rebuilds(self):
+        from unittest.mock import patch
+
+        self.store._get_client().set(self.store.REBUILD_LOCK_KEY, 1)
+        self.addCleanup(self.store._get_client().delete, self.store.REBUILD_LOCK_KEY)
+        with patch.object(self.store, 'rebuild') as rebuild:
+            resp = authenticated_client(self.students[4])[0].get('/api/leaderboard/?limit=2&around=1')
+        rebuild.assert_not_called()
+        self.assertEqual([e['full_name'] for e in resp.data['entries']], ['Redis 0', 'Redis 1'])
+        self.assertEqual(resp.data['my_entry']['rank'], 5)
+
+    def test_one_readiness_check_per_request(self):
+        from unittest.mock import patch
+        c, _ = authenticated_client(self.students[4])
+        with patch.object(self.store, 'available', wraps=self.store.available) as available:
+            c.get('/api/leaderboard/?limit=2&around=1')
+        self.assertEqual(available.call_count, 1)
+
+    def test_elo_update_refreshes_board_without_rebuild(self):
+        from exams.student_views import _submit_session
+        from tests.helpers import run_post_submit
+
+        self.store.ensure_built()
+        exam = make_exam(self.admin)
+        session = ExamSession.objects.create(student=self.students[5], exam=exam)
+        with run_post_submit(self):
+            _submit_session(session)
+
+        rating = StudentRating.objects.get(student=self.students[5])
+        self.assertEqual(self.store.score('top_rated', self.students[5].id), rating.elo)
+        delta = EloHistory.objects.get(session=session).elo_delta
+        self.assertEqual(self.store.score('most_improved', self.students[5].id), delta)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LeaderboardCacheTest(TestCase):
+    """One versioned board per tab, rebuilt single-flight on change."""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(5):
+            s = make_student(telegram_id=4000 + i, full_name=f"Cached {i}")
+            StudentRating.objects.create(student=s, elo=1400 - i, exams_taken=1)
+
+    def _get(self, query=''):
+        from rest_framework.test import APIClient
+        return APIClient().get(f'/api/leaderboard/{query}')
+
+    def test_all_limits_share_one_build(self):
+        from unittest.mock import patch
+        from exams import leaderboard_views
+
+        with patch.object(leaderboard_views, '_build_board', wraps=leaderboard_views._build_board) as build:
+            self.assertEqual(len(self._get('?limit=2').data['entries']), 2)
+            self.assertEqual(len(self._get('?limit=50').data['entries']), 5)
+        self.assertEqual(build.call_count, 1)
+
+    def test_version_bump_rebuilds(self):
+        from exams import leaderboard_store
+
+        self._get()
+        StudentRating.objects.filter(student__full_name='Cached 4').update(elo=2000)
+        self.assertEqual(self._get().data['entries'][0]['full_name'], 'Cached 0')
+
+        leaderboard_store.bump_version()
+        self.assertEqual(self._get().data['entries'][0]['full_name'], 'Cached 4')
+
+    def test_concurrent_rebuild_serves_previous_board(self):
+        from unittest.mock import patch
+        from exams import leaderboard_store, leaderboard_views
+
+        self._get()
+        leaderboard_store.bump_version()
+        # Another request is already rebuilding the new version
+        cache.add('leaderboard_top_rebuild', 1)
+
+        with patch.object(leaderboard_views, '_build_board') as build:
+            resp = self._get()
+        build.assert_not_called()
+        self.assertEqual(len(resp.data['entries']), 5)
+
+    def test_rebuild_lock_spans_versions(self):
+        from unittest.mock import patch
+        from exams import leaderboard_store, leaderboard_views
+
+        self._get()
+        cache.add('leaderboard_top_rebuild', 1)  # A rebuild for an earlier version is running
+        leaderboard_store.bump_version()
+        leaderboard_store.bump_version()
+
+        with patch.object(leaderboard_views, '_build_board') as build:
+            self._get()
+            self._get()
+        build.assert_not_called()
+
+
+class ImprovementCounterTest(TestCase):
+    """StudentRating improvement counters follow EloHistory inserts."""
+
+    def test_counters_track_total_and_recent_window(self):
+        _, admin = admin_client()
+        student = make_student(telegram_id=5001)
+        StudentRating.objects.create(student=student, elo=1200, exams_taken=7)
+        for delta in range(1, 8):
+            exam = make_exam(admin, title=f"Exam {delta}")
+            session = ExamSession.objects.create(student=student, exam=exam, status='submitted')
+            EloHistory.objects.create(
+                student=student, session=session,
+                elo_before=1200, elo_after=1200 + delta, elo_delta=delta,
+                score_percent=0.5, exam_avg_percent=0.5, k_factor=40,
+            )
+
+        rating = StudentRating.objects.get(student=student)
+        self.assertEqual(rating.improvement_total, sum(range(1, 8)))
+        self.assertEqual(rating.improvement_recent, sum(range(3, 8)))
+
+
+class TrendWindowTest(TestCase):
+    """Trends use only the last three Elo deltas per student."""
+
+    def test_only_recent_deltas_are_fetched(self):
+        from exams.leaderboard_views import _prefetch_trends
+
+        _, admin = admin_client()
+        student = make_student(telegram_id=6001)
+        for i, delta in enumerate([50, 40, -5, -6, -7]):
+            exam = make_exam(admin, title=f"Trend {i}")
+            session = ExamSession.objects.create(student=student, exam=exam, status='submitted')
+            EloHistory.objects.create(
+                student=student, session=session,
+                elo_before=1200, elo_after=1200 + delta, elo_delta=delta,
+                score_percent=0.5, exam_avg_percent=0.5, k_factor=40,
+            )
+        idle = make_student(telegram_id=6002)
+
+        with self.assertNumQueries(1):
+            trends = _prefetch_trends([student.id, idle.id])
+        self.assertEqual(trends[student.id], ('down', -7))
+        self.assertEqual(trends[idle.id], ('stable', 0))
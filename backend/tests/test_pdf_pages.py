@@ -0,0 +1,153 @@
+import io
+import tempfile
+from datetime import timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from exams.models import ExamPdfPage, ExamSession
+from tests.helpers import admin_client, authenticated_client, make_exam
+
+try:
+    import pikepdf
+except ImportError:  # pragma: no cover - optional in minimal environments
+    pikepdf = None
+
+
+def _make_pdf(page_count):
+    pdf = pikepdf.new()
+    for _ in range(page_count):
+        pdf.add_blank_page(page_size=(200, 300))
+    buf = io.BytesIO()
+    pdf.save(buf)
+    return buf.getvalue()
+
+
+class PdfTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media.name, SECURE_SSL_REDIRECT=False)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.client, self.student = authenticated_client()
+        _, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+
+
+@skipUnless(pikepdf, 'pikepdf is not installed')
+class PreparePdfTest(PdfTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.exam.pdf_file.save('exam.pdf', ContentFile(_make_pdf(3)))
+
+    def test_prepare_splits_pages_and_linearizes(self):
+        from exams.tasks import prepare_exam_pdf
+        prepare_exam_pdf(str(self.exam.id))
+
+        self.exam.refresh_from_db()
+        self.assertIsNotNone(self.exam.pdf_prepared_at)
+        with self.exam.pdf_web.open('rb') as f, pikepdf.open(f) as web:
+            self.assertTrue(web.is_linearized)
+        pages = list(ExamPdfPage.objects.filter(exam=self.exam))
+        self.assertEqual([p.page_number for p in pages], [1, 2, 3])
+        for page in pages:
+            with page.file.open('rb') as f, pikepdf.open(f) as single:
+                self.assertEqual(len(single.pages), 1)
+
+    def test_reprepare_replaces_pages(self):
+        from exams.tasks import prepare_exam_pdf
+        prepare_exam_pdf(str(self.exam.id))
+        self.exam.pdf_file.save('exam2.pdf', ContentFile(_make_pdf(2)))
+        prepare_exam_pdf(str(self.exam.id))
+        self.assertEqual(ExamPdfPage.objects.filter(exam=self.exam).count(), 2)
+
+    def _prepared_file_names(self):
+        from exams import pdf_pages
+        pdf_pages.prepare(self.exam)
+        self.exam.refresh_from_db()
+        names = [page.file.name for page in ExamPdfPage.objects.filter(exam=self.exam)]
+        return names + [self.exam.pdf_web.name]
+
+    def test_reprepare_deletes_old_files_after_commit(self):
+        from exams import pdf_pages
+        old_names = self._prepared_file_names()
+        with self.captureOnCommitCallbacks(execute=True):
+            pdf_pages.prepare(self.exam)
+        storage = self.exam.pdf_file.storage
+        self.assertFalse(any(storage.exists(name) for name in old_names))
+        for page in ExamPdfPage.objects.filter(exam=self.exam):
+            self.assertTrue(storage.exists(page.file.name))
+
+    def test_rolled_back_reprepare_keeps_old_files(self):
+        from django.db import transaction
+        from exams import pdf_pages
+        old_names = self._prepared_file_names()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                pdf_pages.prepare(self.exam)
+                raise RuntimeError
+        storage = self.exam.pdf_file.storage
+        self.assertTrue(all(storage.exists(name) for name in old_names))
+        self.assertEqual(
+            sorted(page.file.name for page in ExamPdfPage.objects.filter(exam=self.exam)),
+            sorted(old_names[:-1]),
+        )
+
+    def test_warmup_scheduled_before_start(self):
+        from exams.tasks import prepare_exam_pdf
+        self.exam.scheduled_start = timezone.now() + timedelta(hours=2)
+        self.exam.scheduled_end = timezone.now() + timedelta(hours=5)
+        self.exam.save()
+        with patch('exams.tasks.warm_exam_pdf.apply_async') as apply_async:
+            prepare_exam_pdf(str(self.exam.id))
+        eta = apply_async.call_args.kwargs['eta']
+        self.assertEqual(eta, self.exam.scheduled_start - timedelta(minutes=10))
+
+    def test_pages_served_from_warm_cache(self):
+        from exams.tasks import prepare_exam_pdf, warm_exam_pdf
+        with patch('exams.tasks.warm_exam_pdf.delay'):
+            prepare_exam_pdf(str(self.exam.id))
+        warm_exam_pdf(str(self.exam.id))
+        ExamSession.objects.create(student=self.student, exam=self.exam)
+
+        manifest = self.client.get(f'/api/exams/{self.exam.id}/pdf/manifest/').json()
+        self.assertTrue(manifest['ready'])
+        self.assertEqual(manifest['page_count'], 3)
+        self.assertEqual(manifest['pages'][1]['url'], f'/exams/{self.exam.id}/pdf/pages/2/')
+
+        with self.assertNumQueries(2):  # exam + session check; page bytes come from the cache
+            response = self.client.get(f'/api/exams/{self.exam.id}/pdf/pages/2/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(len(response.content), manifest['pages'][1]['size'])
+
+        response = self.client.get(f'/api/exams/{self.exam.id}/pdf/pages/9/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_pdf_is_skipped(self):
+        from exams.tasks import prepare_exam_pdf
+        self.exam.pdf_file.save('broken.pdf', ContentFile(b'%PDF-1.4 not really a pdf'))
+        prepare_exam_pdf(str(self.exam.id))
+        self.assertFalse(ExamPdfPage.objects.filter(exam=self.exam).exists())
+
+
+class PdfManifestAccessTest(PdfTestCase):
+
+    def test_manifest_not_ready_without_pages(self):
+        ExamSession.objects.create(student=self.student, exam=self.exam)
+        data = self.client.get(f'/api/exams/{self.exam.id}/pdf/manifest/').json()
+        self.assertEqual(data, {'ready': False, 'page_count': 0, 'pages': []})
+
+    def test_pages_require_started_session(self):
+        response = self.client.get(f'/api/exams/{self.exam.id}/pdf/pages/1/')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(f'/api/exams/{self.exam.id}/pdf/manifest/')
+        self.assertEqual(response.status_code, 403)
@@ -11,6 +11,7 @@ from datetime import timedelta
 from django.test import TestCase, override_settings
 from django.utils import timezone
 
+from exams import question_sampler
 from exams.models import Question, PracticeSession
 from tests.helpers import make_student, authenticated_client
 
@@ -754,7 +755,7 @@ class TestUnauthenticatedAccess(TestCase):
 
 @override_settings(SECURE_SSL_REDIRECT=False)
 class TestQuestionBalancing(TestCase):
-    """_assemble_questions should try to pick from diverse topics."""
+    """start_practice should try to pick from diverse topics."""
 
     def setUp(self):
         self.client, self.student = authenticated_client()
@@ -796,6 +797,38 @@ class TestQuestionBalancing(TestCase):
         self.assertEqual(len(data['questions']), 4)
 
 
+class TestQuestionSampler(TestCase):
+    """Cached topic index: ids are drawn first, only the chosen rows are queried."""
+
+    def setUp(self):
+        Question.objects.all().delete()
+        for topic in ('algebra', 'geometry', 'calculus'):
+            _make_questions(count=10, topic=topic)
+
+    def test_sample_is_balanced_by_topic(self):
+        ids = question_sampler.sample(6)
+        self.assertEqual(len(set(ids)), 6)
+        topics = list(Question.objects.filter(id__in=ids).values_list('topic', flat=True))
+        self.assertEqual(sorted(topics), ['algebra', 'algebra', 'calculus', 'calculus', 'geometry', 'geometry'])
+
+    def test_index_is_cached(self):
+        question_sampler.sample(6)
+        with self.assertNumQueries(1):  # Existence check of the drawn ids only
+            question_sampler.sample(6)
+
+    def test_new_question_invalidates_index(self):
+        question_sampler.sample(6)
+        extra = _make_questions(count=1, topic='probability')[0]
+        self.assertIn(str(extra.id), question_sampler.topic_index()['probability'])
+
+    def test_bulk_deleted_questions_are_not_drawn(self):
+        question_sampler.sample(6)
+        Question.objects.filter(topic='algebra').delete()  # Queryset delete skips Question.delete()
+        ids = question_sampler.sample(30)
+        self.assertEqual(len(ids), 20)
+        self.assertEqual(Question.objects.filter(id__in=ids).count(), 20)
+
+
 @override_settings(SECURE_SSL_REDIRECT=False)
 class TestScoringAccuracy(TestCase):
     """Verify that _submit_practice scores answers correctly with edge cases."""
@@ -3,10 +3,13 @@ Comprehensive unit tests for the Rasch psychometric engine.
 
 Tests cover:
 - rasch_probability: known values, symmetry, extreme inputs, monotonicity
+- rasch_probabilities: agreement with the scalar kernel, broadcasting
 - estimate_theta: perfect/zero scores, mixed responses, ability recovery
-- estimate_item_difficulties: JMLE recovery, centering, ordering, missing data
+- estimate_item_difficulties: JMLE recovery, centering, ordering, missing data,
+  batched (matrix-form) mode agreeing with the per-row loops
 - compute_item_fit: well-fitting data, misfitting items, edge cases
 - large-scale recovery matching real exam dimensions (500 x 55)
+- build_score_table: raw-score sufficiency, monotonicity, standard errors
 """
 
 import math
@@ -14,9 +17,11 @@ import numpy as np
 import pytest
 from exams.rasch import (
     rasch_probability,
+    rasch_probabilities,
     estimate_theta,
     estimate_item_difficulties,
     compute_item_fit,
+    build_score_table,
 )
 
 
@@ -92,6 +97,32 @@ class TestRaschProbability:
             prev = p
 
 
+class TestRaschProbabilities:
+
+    def test_matches_scalar_kernel(self):
+        """Vectorized kernel should agree with rasch_probability element-wise."""
+        betas = np.linspace(-4, 4, 55)
+        for theta in (-3.0, 0.0, 1.7):
+            expected = [rasch_probability(theta, b) for b in betas]
+            np.testing.assert_allclose(rasch_probabilities(theta, betas), expected, atol=1e-12)
+
+    def test_broadcasts_students_by_items(self):
+        """A column of thetas against a row of betas yields an NxJ matrix."""
+        thetas = np.array([-1.0, 0.0, 1.0])
+        betas = np.array([-0.5, 0.5])
+        probs = rasch_probabilities(thetas[:, None], betas[None, :])
+        assert probs.shape == (3, 2)
+        assert probs[1, 0] == pytest.approx(rasch_probability(0.0, -0.5), abs=1e-12)
+
+    def test_extreme_values_are_finite(self):
+        """Huge logit differences should saturate without overflow warnings."""
+        with np.errstate(over='raise'):
+            probs = rasch_probabilities(np.array([-1000.0, 1000.0]), 0.0)
+        assert np.all(np.isfinite(probs))
+        assert probs[0] == pytest.approx(0.0, abs=1e-6)
+        assert probs[1] == pytest.approx(1.0, abs=1e-6)
+
+
 # ---------------------------------------------------------------------------
 # 2. estimate_theta -- edge cases and recovery
 # ---------------------------------------------------------------------------
@@ -233,6 +264,24 @@ class TestEstimateItemDifficulties:
         assert np.all(np.isfinite(est_betas)), "Betas contain non-finite values"
         assert np.all(np.isfinite(est_thetas)), "Thetas contain non-finite values"
 
+    def test_batched_matches_loop_estimates(self):
+        """Matrix-form JMLE should reproduce the per-student/per-item loops."""
+        rng = np.random.default_rng(2468)
+        true_betas = rng.normal(0, 1.2, size=12)
+        true_thetas = rng.normal(0, 1.0, size=150)
+
+        matrix = _generate_response_matrix(true_thetas, true_betas, rng)
+        matrix[rng.random(matrix.shape) < 0.05] = np.nan
+        matrix[0, :] = 0            # zero score
+        matrix[1, :] = 1            # perfect score
+        matrix[2, :] = np.nan       # no responses at all
+
+        batched_betas, batched_thetas = estimate_item_difficulties(matrix)
+        loop_betas, loop_thetas = estimate_item_difficulties(matrix, batched=False)
+
+        np.testing.assert_allclose(batched_betas, loop_betas, atol=1e-9)
+        np.testing.assert_allclose(batched_thetas, loop_thetas, atol=1e-9)
+
 
 # ---------------------------------------------------------------------------
 # 4. compute_item_fit -- infit/outfit MNSQ
@@ -353,3 +402,40 @@ class TestLargeScaleRecovery:
         assert corr > 0.90, (
             f"Large-scale theta correlation {corr:.4f} below 0.90"
         )
+
+
+# ---------------------------------------------------------------------------
+# 6. build_score_table -- raw score -> theta conversion
+# ---------------------------------------------------------------------------
+
+class TestBuildScoreTable:
+
+    def test_one_row_per_raw_score(self):
+        betas = np.linspace(-2, 2, 10)
+        table = build_score_table(betas)
+        assert [row['raw_score'] for row in table] == list(range(11))
+
+    def test_matches_estimate_theta_for_any_response_pattern(self):
+        """Raw score is sufficient: a shuffled pattern gives the tabulated theta."""
+        rng = np.random.default_rng(99)
+        betas = rng.normal(0, 1.2, size=20)
+        table = build_score_table(betas)
+
+        for raw_score in (0, 5, 13, 20):
+            responses = np.zeros(20)
+            responses[rng.choice(20, size=raw_score, replace=False)] = 1
+            assert estimate_theta(responses, betas) == pytest.approx(
+                table[raw_score]['theta'], abs=1e-9
+            )
+
+    def test_theta_increases_with_raw_score(self):
+        table = build_score_table(np.linspace(-2, 2, 15))
+        thetas = [row['theta'] for row in table]
+        assert all(a < b for a, b in zip(thetas, thetas[1:]))
+
+    def test_standard_error_smallest_mid_scale(self):
+        """Information peaks near the middle of the item range."""
+        table = build_score_table(np.linspace(-2, 2, 15))
+        errors = [row['standard_error'] for row in table]
+        assert errors[7] < errors[1]
+        assert errors[7] < errors[-2]
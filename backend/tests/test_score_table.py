@@ -0,0 +1,99 @@
+from io import StringIO
+
+from django.test import TestCase, override_settings
+
+from exams.models import ExamSession, StudentAnswer, ScoreConversion
+from exams.scoring import compute_rasch_score, _estimate_rasch_score, POINTS_TOTAL
+from exams.student_views import _submit_session
+from exams.tasks import calibrate_exam_rasch
+from tests.helpers import admin_client, make_exam, make_student
+
+
+def _submitted_session(exam, student, points):
+    """Submit a session answering the first `points` MCQs correctly and the rest wrong."""
+    session = ExamSession.objects.create(student=student, exam=exam)
+    for q in range(1, 36):
+        StudentAnswer.objects.create(
+            session=session, question_number=q,
+            answer='A' if q <= points else 'B',
+        )
+    for q in range(36, 46):
+        for sub in ('a', 'b'):
+            StudentAnswer.objects.create(
+                session=session, question_number=q, sub_part=sub, answer='wrong',
+            )
+    _submit_session(session)
+    return session
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class TestScoreConversionTable(TestCase):
+
+    def setUp(self):
+        self.client, self.admin = admin_client()
+        self.exam = make_exam(self.admin)
+        self.sessions = [
+            _submitted_session(self.exam, make_student(telegram_id=7000 + i, full_name=f"Student {i}"), 3 * i + 2)
+            for i in range(12)
+        ]
+        calibrate_exam_rasch(str(self.exam.id))
+
+    def test_calibration_persists_full_table(self):
+        raw_scores = list(
+            ScoreConversion.objects.filter(exam=self.exam).values_list('raw_score', flat=True)
+        )
+        self.assertEqual(raw_scores, list(range(POINTS_TOTAL + 1)))
+
+    def test_lookup_matches_newton_raphson(self):
+        for session in self.sessions:
+            self.assertEqual(compute_rasch_score(session), _estimate_rasch_score(session))
+
+    def test_answer_key_upload_drops_table(self):
+        response = self.client.post(f'/api/admin/exams/{self.exam.id}/answers/', {
+            'answers': [{'question_number': 1, 'sub_part': None, 'correct_answer': 'B'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(ScoreConversion.objects.filter(exam=self.exam).exists())
+        # Newton-Raphson fallback still scores against the calibrated items
+        self.assertIsNotNone(compute_rasch_score(self.sessions[0]))
+
+    def test_admin_score_table_endpoint(self):
+        response = self.client.get(f'/api/admin/exams/{self.exam.id}/score-table/')
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['rows']
+        self.assertEqual(len(rows), POINTS_TOTAL + 1)
+        self.assertEqual(set(rows[0]), {'raw_score', 'theta', 'standard_error', 'rasch_scaled', 'letter_grade'})
+        self.assertEqual(rows[-1]['letter_grade'], 'A+')
+
+    def test_grading_and_calibration_store_session_scores(self):
+        session = ExamSession.objects.get(id=self.sessions[3].id)
+        self.assertEqual((session.points, session.exercises_correct), (11, 11))
+        self.assertIsNotNone(session.theta)
+        self.assertIsNotNone(session.rasch_scaled)
+
+    def test_backfill_command_restores_columns(self):
+        from django.core.management import call_command
+
+        ExamSession.objects.filter(exam=self.exam).update(
+            points=None, exercises_correct=None, theta=None, rasch_scaled=None,
+        )
+        call_command('backfill_session_scores', batch_size=5, stdout=StringIO())
+
+        session = ExamSession.objects.get(id=self.sessions[3].id)
+        conversion = ScoreConversion.objects.get(exam=self.exam, raw_score=11)
+        self.assertEqual((session.points, session.exercises_correct), (11, 11))
+        self.assertEqual(session.rasch_scaled, conversion.rasch_scaled)
+
+    def test_blank_answers_count_as_incorrect_in_stored_score(self):
+        student = make_student(telegram_id=7100, full_name="Mostly Blank")
+        session = ExamSession.objects.create(student=student, exam=self.exam)
+        StudentAnswer.objects.create(session=session, question_number=30, answer='A')  # A hard item
+        _submit_session(session)
+        calibrate_exam_rasch(str(self.exam.id))
+
+        session.refresh_from_db()
+        conversion = ScoreConversion.objects.get(exam=self.exam, raw_score=1)
+        self.assertEqual(session.points, 1)
+        self.assertEqual((session.theta, session.rasch_scaled), (conversion.theta, conversion.rasch_scaled))
+        self.assertEqual(compute_rasch_score(session)['rasch_scaled'], session.rasch_scaled)
+        self.assertEqual(conversion.letter_grade, 'D')
@@ -1,12 +1,27 @@
+import asyncio
 import json
+from unittest.mock import patch
 
+from asgiref.sync import async_to_sync
 from django.test import TestCase, RequestFactory, override_settings
-from exams.bot_views import telegram_webhook
+from django.utils import timezone
+from exams import telegram_client, update_queue
+from exams.bot_views import telegram_webhook, telegram_webhook_async
+from exams.models import Student
+from exams.tasks import process_telegram_updates
+from tests.helpers import StubBot
 
 
 WEBHOOK_SECRET = 'test-secret-token'
 
 
+def clear_update_queue():
+    client = update_queue._get_client()
+    keys = list(client.scan_iter('telegram_updates:*'))
+    if keys:
+        client.delete(*keys)
+
+
 @override_settings(
     TELEGRAM_WEBHOOK_SECRET=WEBHOOK_SECRET,
     TELEGRAM_BOT_TOKEN='fake:token',
@@ -15,6 +30,8 @@ WEBHOOK_SECRET = 'test-secret-token'
 class TestTelegramWebhook(TestCase):
     def setUp(self):
         self.factory = RequestFactory()
+        clear_update_queue()
+        self.addCleanup(clear_update_queue)
 
     def _post(self, payload, secret=WEBHOOK_SECRET):
         headers = {}
@@ -86,6 +103,48 @@ class TestTelegramWebhook(TestCase):
         response = telegram_webhook(request)
         self.assertEqual(response.status_code, 200)
 
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_block_and_unblock_update_reachability(self, apply_async):
+        student = Student.objects.create(full_name='Ali', telegram_id=123)
+
+        def member_update(update_id, new_status):
+            return {
+                'update_id': update_id,
+                'my_chat_member': {
+                    'chat': {'id': 123, 'type': 'private'},
+                    'new_chat_member': {'status': new_status},
+                },
+            }
+
+        telegram_webhook(self._post(member_update(2, 'kicked')))
+        process_telegram_updates()
+        student.refresh_from_db()
+        self.assertIsNotNone(student.telegram_unreachable_at)
+
+        telegram_webhook(self._post(member_update(3, 'member')))
+        process_telegram_updates()
+        student.refresh_from_db()
+        self.assertIsNone(student.telegram_unreachable_at)
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_private_message_marks_student_reachable(self, apply_async):
+        student = Student.objects.create(full_name='Ali', telegram_id=123, telegram_unreachable_at=timezone.now())
+        payload = {
+            'update_id': 1,
+            'message': {'message_id': 1, 'chat': {'id': 123, 'type': 'private'}, 'date': 1},
+        }
+        telegram_webhook(self._post(payload))
+        student.refresh_from_db()
+        self.assertIsNotNone(student.telegram_unreachable_at)  # Only queued so far
+
+        process_telegram_updates()
+        student.refresh_from_db()
+        self.assertIsNone(student.telegram_unreachable_at)
+
+    def test_missing_update_id_returns_400(self):
+        response = telegram_webhook(self._post({'message': {'chat': {'id': 123}}}))
+        self.assertEqual(response.status_code, 400)
+
     def test_empty_body_returns_400(self):
         request = self.factory.post(
             '/api/telegram/webhook/',
@@ -109,3 +168,165 @@ class TestTelegramWebhook(TestCase):
         request = self._post({'update_id': 1}, secret=None)
         response = telegram_webhook(request)
         self.assertEqual(response.status_code, 500)
+
+
+@override_settings(
+    TELEGRAM_WEBHOOK_SECRET=WEBHOOK_SECRET,
+    TELEGRAM_BOT_TOKEN='fake:token',
+    TELEGRAM_WEBAPP_URL='https://example.com',
+)
+class TestWebhookQueue(TestCase):
+    """Updates are acknowledged at once and answered by process_telegram_updates."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        clear_update_queue()
+        self.addCleanup(clear_update_queue)
+        self.bot = StubBot()
+        patcher = patch('exams.telegram_client.get_bot', return_value=self.bot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _post(self, text, update_id=1, chat_id=123):
+        payload = {
+            'update_id': update_id,
+            'message': {'message_id': 1, 'chat': {'id': chat_id, 'type': 'private'}, 'text': text, 'date': 1},
+        }
+        return self.factory.post(
+            '/api/telegram/webhook/', data=json.dumps(payload), content_type='application/json',
+            HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=WEBHOOK_SECRET,
+        )
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_acknowledges_without_calling_bot(self, apply_async):
+        response = telegram_webhook(self._post('/start'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.bot.attempts, [])
+        self.assertEqual(update_queue.pending(), 1)
+        apply_async.assert_called_once()
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_redelivered_update_is_queued_once(self, apply_async):
+        for _ in range(3):
+            self.assertEqual(telegram_webhook(self._post('/start')).status_code, 200)
+        self.assertEqual(update_queue.pending(), 1)
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_one_drain_task_per_burst(self, apply_async):
+        for update_id in range(1, 6):
+            telegram_webhook(self._post('/start', update_id=update_id, chat_id=100 + update_id))
+        self.assertEqual(apply_async.call_count, 1)
+
+        process_telegram_updates()
+        self.assertEqual(sorted(self.bot.sent), [101, 102, 103, 104, 105])
+        self.assertEqual(update_queue.pending(), 0)
+
+    @override_settings(TELEGRAM_UPDATE_BATCH_SIZE=2)
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_batches_update_reachability(self, apply_async):
+        students = [
+            Student.objects.create(full_name=f'S{i}', telegram_id=200 + i, telegram_unreachable_at=timezone.now())
+            for i in range(3)
+        ]
+        for i, student in enumerate(students):
+            telegram_webhook(self._post('hi', update_id=10 + i, chat_id=student.telegram_id))
+
+        process_telegram_updates()
+        self.assertFalse(Student.objects.filter(telegram_unreachable_at__isnull=False).exists())
+        self.assertEqual(self.bot.attempts, [])  # Plain text gets no reply
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_sync_view_replies_to_start(self, apply_async):
+        response = telegram_webhook(self._post('/start'))
+        self.assertEqual(response.status_code, 200)
+        process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123])
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_async_view_replies_to_help(self, apply_async):
+        response = async_to_sync(telegram_webhook_async)(self._post('/help'))
+        self.assertEqual(response.status_code, 200)
+        process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123])
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_failed_batch_is_requeued(self, apply_async):
+        telegram_webhook(self._post('/start'))
+        with patch('exams.bot_views.process_updates', side_effect=RuntimeError('db down')):
+            process_telegram_updates()
+        self.assertEqual(update_queue.pending(), 1)
+        self.assertEqual(self.bot.sent, [])
+
+        process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123])
+        self.assertEqual(update_queue.pending(), 0)
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_only_failed_updates_are_retried(self, apply_async):
+        telegram_webhook(self._post('/start', update_id=1, chat_id=123))
+        telegram_webhook(self._post('/help', update_id=2, chat_id=456))
+
+        async def broken_help(chat_id):
+            raise RuntimeError('send failed')
+
+        with patch('exams.bot_views._send_help', broken_help):
+            process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123])
+        self.assertEqual(update_queue.pending(), 1)
+
+        process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123, 456])  # /start is not answered twice
+        self.assertEqual(update_queue.pending(), 0)
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_failing_update_is_dropped_after_max_attempts(self, apply_async):
+        telegram_webhook(self._post('/start'))
+        with patch('exams.bot_views.process_updates', side_effect=RuntimeError('bad update')):
+            for _ in range(update_queue.MAX_ATTEMPTS):
+                process_telegram_updates()
+        self.assertEqual(update_queue.pending(), 0)
+
+    @patch('exams.tasks.process_telegram_updates.apply_async')
+    def test_batch_of_killed_worker_is_requeued(self, apply_async):
+        telegram_webhook(self._post('/start'))
+        update_queue.pop_batch(10)  # Claimed, then the worker dies before ack()
+        self.assertEqual(update_queue.pending(), 0)
+
+        self.assertEqual(update_queue.requeue_stale(max_age=60), 0)  # Still fresh
+        self.assertEqual(update_queue.requeue_stale(max_age=-1), 1)
+        process_telegram_updates()
+        self.assertEqual(self.bot.sent, [123])
+
+    def test_async_view_rejects_wrong_secret(self):
+        request = self._post('/start')
+        request.META['HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN'] = 'wrong'
+        response = async_to_sync(telegram_webhook_async)(request)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(update_queue.pending(), 0)
+
+
+@override_settings(TELEGRAM_BOT_TOKEN='123:fake')
+class TestTelegramClient(TestCase):
+
+    def setUp(self):
+        telegram_client.reset()
+        self.addCleanup(telegram_client.reset)
+
+    def test_bot_and_loop_are_reused(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        self.assertIs(telegram_client.get_bot(), telegram_client.get_bot())
+        self.assertIs(telegram_client.run(current_loop()), telegram_client.run(current_loop()))
+
+    def test_submit_from_another_loop(self):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        bot_loop = telegram_client.run(current_loop())
+        self.assertIs(asyncio.run(telegram_client.submit(current_loop())), bot_loop)
+
+    def test_reset_builds_a_new_client(self):
+        bot = telegram_client.get_bot()
+        telegram_client.reset()
+        self.assertIsNot(telegram_client.get_bot(), bot)
@@ -71,8 +71,18 @@ export function enqueue(item: Omit<QueueItem, 'timestamp'>): void {
   notifyListeners()
 }
 
+/** Max answers per bulk request (matches the backend limit) */
+const BULK_BATCH_SIZE = 100
+
+interface BulkResult {
+  question_number: number
+  sub_part: string | null
+  status: 'saved' | 'invalid'
+}
+
 /**
- * Replay all queued items via POST. Remove successful ones, keep failed ones.
+ * Replay all queued items, one bulk POST per session (chunked).
+ * Remove items the server reports as saved, keep the rest.
  * Guarded against concurrent execution.
  */
 export async function flush(): Promise<void> {
@@ -80,24 +90,48 @@ export async function flush(): Promise<void> {
   isFlushing = true
 
   try {
-    // Snapshot the current queue items to process
-    const items = [...queue]
+    // Snapshot the current queue items to process, grouped by session
+    const bySession = new Map<string, QueueItem[]>()
+    for (const item of queue) {
+      const items = bySession.get(item.sessionId) ?? []
+      items.push(item)
+      bySession.set(item.sessionId, items)
+    }
     const succeeded = new Set<string>()
 
-    await Promise.allSettled(
-      items.map(async (item) => {
-        try {
-          await api.post(`/sessions/${item.sessionId}/answers/`, {
-            question_number: item.questionNumber,
-            sub_part: item.subPart,
-            answer: item.answer,
-          })
-          succeeded.add(dedupKey(item))
-        } catch {
-          // Keep this item in the queue for the next flush
-        }
-      })
-    )
+    const requests: Promise<void>[] = []
+    for (const [sessionId, items] of bySession) {
+      for (let i = 0; i < items.length; i += BULK_BATCH_SIZE) {
+        const batch = items.slice(i, i + BULK_BATCH_SIZE)
+        requests.push((async () => {
+          try {
+            const { data } = await api.post<{ results: BulkResult[] }>(
+              `/sessions/${sessionId}/answers/bulk/`,
+              {
+                answers: batch.map((item) => ({
+                  question_number: item.questionNumber,
+                  sub_part: item.subPart,
+                  answer: item.answer,
+                })),
+              },
+            )
+            for (const result of data.results) {
+              if (result.status === 'saved') {
+                succeeded.add(dedupKey({
+                  sessionId,
+                  questionNumber: result.question_number,
+                  subPart: result.sub_part,
+                }))
+              }
+            }
+          } catch {
+            // Keep this batch in the queue for the next flush
+          }
+        })())
+      }
+    }
+
+    await Promise.allSettled(requests)
 
     if (succeeded.size > 0) {
       // Remove succeeded items; keep any that failed or were added during flush
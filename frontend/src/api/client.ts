@@ -12,7 +12,10 @@ api.interceptors.request.use((config) => {
   return config
 })
 
+const TOKEN_REFRESH_MARGIN_MS = 60 * 1000
+
 let isRefreshing = false
+let refreshPromise: Promise<string> | null = null
 let failedQueue: Array<{
   resolve: (token: string) => void
   reject: (err: unknown) => void
@@ -26,6 +29,51 @@ function processQueue(error: unknown, token: string | null) {
   failedQueue = []
 }
 
+function tokenExpiresAt(token: string): number {
+  try {
+    const payload = token.split('.')[1].replace(/-/g, '+').replace(/_/g, '/')
+    return JSON.parse(atob(payload)).exp * 1000
+  } catch {
+    return 0
+  }
+}
+
+/** Exchange the refresh token for a new access token; concurrent callers share one request */
+export function refreshAccessToken(): Promise<string> {
+  if (!refreshPromise) {
+    refreshPromise = axios
+      .post(`${api.defaults.baseURL}/token/refresh/`, {
+        refresh: localStorage.getItem('refresh_token'),
+      })
+      .then(({ data }) => {
+        localStorage.setItem('access_token', data.access)
+        if (data.refresh) {
+          localStorage.setItem('refresh_token', data.refresh)
+        }
+        return data.access as string
+      })
+      .finally(() => {
+        refreshPromise = null
+      })
+  }
+  return refreshPromise
+}
+
+/**
+ * Access token for requests made outside this client (pdf.js), refreshed
+ * first when it is about to expire or when `force` is set.
+ */
+export async function freshAccessToken(force = false): Promise<string | null> {
+  const token = localStorage.getItem('access_token')
+  if (!token || !localStorage.getItem('refresh_token')) return token
+  if (!force && tokenExpiresAt(token) - Date.now() > TOKEN_REFRESH_MARGIN_MS) return token
+  try {
+    return await refreshAccessToken()
+  } catch {
+    return token  // The request fails with 401 and the viewer shows its error
+  }
+}
+
 api.interceptors.response.use(
   (response) => response,
   async (error) => {
@@ -66,14 +114,7 @@ api.interceptors.response.use(
     isRefreshing = true
 
     try {
-      const { data } = await axios.post(`${api.defaults.baseURL}/token/refresh/`, {
-        refresh: refreshToken,
-      })
-      const newToken = data.access
-      localStorage.setItem('access_token', newToken)
-      if (data.refresh) {
-        localStorage.setItem('refresh_token', data.refresh)
-      }
+      const newToken = await refreshAccessToken()
       originalRequest.headers.Authorization = `Bearer ${newToken}`
       processQueue(null, newToken)
       return api(originalRequest)
@@ -85,6 +85,11 @@ export interface ExamHistoryEntry {
   is_auto_submitted: boolean
 }
 
+export interface ExamHistoryPage {
+  results: ExamHistoryEntry[]
+  next_cursor: string | null
+}
+
 // Leaderboard types
 export interface LeaderboardEntry {
   rank: number
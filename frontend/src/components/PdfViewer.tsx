@@ -2,7 +2,7 @@ import { useState, useEffect, useRef, useCallback } from 'react'
 import { Document, Page, pdfjs } from 'react-pdf'
 import 'react-pdf/dist/Page/AnnotationLayer.css'
 import 'react-pdf/dist/Page/TextLayer.css'
-import api from '../api/client'
+import api, { freshAccessToken } from '../api/client'
 import LoadingSpinner from './LoadingSpinner'
 import { useMobileDetect } from '../hooks/useMobileDetect'
 
@@ -16,20 +16,48 @@ export interface PageInfo {
 
 interface PdfViewerProps {
   url: string
+  /** Page manifest; when ready, pages are fetched one by one instead of the whole file */
+  manifestUrl?: string
   currentQuestion?: number
   onPageInfo?: (info: PageInfo) => void
 }
 
 type SlideDir = 'left' | 'right' | null
 
-export default function PdfViewer({ url, currentQuestion, onPageInfo }: PdfViewerProps) {
+interface PdfSource {
+  url: string
+  httpHeaders: Record<string, string>
+}
+
+interface PdfManifest {
+  ready: boolean
+  page_count: number
+  pages: { page: number; size: number; url: string }[]
+}
+
+// pdf.js fetches outside the api client, so the token is refreshed here when it is close to expiry
+async function pdfSourceFor(path: string, forceRefresh = false): Promise<PdfSource> {
+  const token = await freshAccessToken(forceRefresh)
+  return {
+    url: `${api.defaults.baseURL}${path}`,
+    httpHeaders: { Authorization: `Bearer ${token}` },
+  }
+}
+
+export default function PdfViewer({ url, manifestUrl, currentQuestion, onPageInfo }: PdfViewerProps) {
   const { isMobile } = useMobileDetect()
   const [numPages, setNumPages] = useState<number>(0)
   const [pageNumber, setPageNumber] = useState(1)
-  const [pdfBlob, setPdfBlob] = useState<string | null>(null)
+  // Whole file, or one path per page when the manifest is ready
+  const [filePath, setFilePath] = useState<string | null>(null)
+  const [pagePaths, setPagePaths] = useState<string[] | null>(null)
+  // Source of the document on screen; built per page so each fetch carries a current token
+  const [docSource, setDocSource] = useState<PdfSource | null>(null)
+  const [retryTick, setRetryTick] = useState(0)
+  const forceRefreshRef = useRef(false)
+  const retriedPathRef = useRef<string | null>(null)
   const [zoom, setZoom] = useState(700)
   const [containerWidth, setContainerWidth] = useState(0)
-  const blobRef = useRef<string | null>(null)
   const containerRef = useRef<HTMLDivElement>(null)
   // eslint-disable-next-line @typescript-eslint/no-explicit-any
   const pdfDocRef = useRef<any>(null)
@@ -88,20 +116,50 @@ export default function PdfViewer({ url, currentQuestion, onPageInfo }: PdfViewe
   const [pdfError, setPdfError] = useState(false)
 
   useEffect(() => {
-    let currentBlobUrl: string | null = null
-    api.get(url, { responseType: 'blob' }).then(({ data }) => {
-      currentBlobUrl = URL.createObjectURL(data)
-      blobRef.current = currentBlobUrl
-      setPdfBlob(currentBlobUrl)
+    let cancelled = false
+    // The first request goes through the api client (permission checks, token refresh);
+    // pdf.js then fetches page-sized PDFs, or the whole file with Range requests
+    const check = manifestUrl
+      ? api.get<PdfManifest>(manifestUrl).then(({ data }) => data)
+      : api.head(url).then(() => null)
+    check.then((manifest) => {
+      if (cancelled) return
+      if (manifest?.ready) {
+        setPagePaths(manifest.pages.map(p => p.url))
+        setNumPages(manifest.page_count)
+      } else {
+        setFilePath(url)
+      }
     }).catch(() => {
       setPdfError(true)
     })
     return () => {
-      if (currentBlobUrl) {
-        URL.revokeObjectURL(currentBlobUrl)
-      }
+      cancelled = true
     }
-  }, [url])
+  }, [url, manifestUrl])
+
+  const currentPath = pagePaths ? pagePaths[pageNumber - 1] : filePath
+
+  useEffect(() => {
+    if (!currentPath) return
+    let cancelled = false
+    const forceRefresh = forceRefreshRef.current
+    forceRefreshRef.current = false
+    pdfSourceFor(currentPath, forceRefresh).then((source) => {
+      if (!cancelled) setDocSource(source)
+    })
+    return () => {
+      cancelled = true
+    }
+  }, [currentPath, retryTick]) // eslint-disable-line react-hooks/exhaustive-deps
+
+  // A load that fails (e.g. the token expired anyway) is retried once with a refreshed token
+  function handleDocLoadError() {
+    if (!currentPath || retriedPathRef.current === currentPath) return
+    retriedPathRef.current = currentPath
+    forceRefreshRef.current = true
+    setRetryTick(n => n + 1)
+  }
 
   // Track container width
   useEffect(() => {
@@ -118,45 +176,62 @@ export default function PdfViewer({ url, currentQuestion, onPageInfo }: PdfViewe
   // ── Text extraction: build question → page mapping ──
   const pageToQuestions = useRef<Map<number, number[]>>(new Map())
 
+  // A question is mapped to the first page that mentions it
+  const addPageText = useCallback((p: number, content: { items: { str?: string }[] }) => {
+    const map = questionPageMap.current
+    const reverseMap = pageToQuestions.current
+    const text = content.items.map((item) => item.str ?? '').join(' ')
+    const regex = /(?:^|\s)(\d{1,2})[.)]\s/g
+    let match
+    while ((match = regex.exec(text)) !== null) {
+      const qNum = parseInt(match[1], 10)
+      if (qNum < 1 || qNum > 99 || map.has(qNum)) continue
+      map.set(qNum, p)
+      const list = reverseMap.get(p) || []
+      list.push(qNum)
+      reverseMap.set(p, list)
+    }
+  }, [])
+
+  const reportPageInfo = useCallback(() => {
+    onPageInfo?.({
+      page: pageNumber,
+      totalPages: numPages,
+      questions: pageToQuestions.current.get(pageNumber)?.sort((a, b) => a - b) || [],
+    })
+  }, [onPageInfo, pageNumber, numPages])
+
+  // Map every page up front. Whole-file mode reads the open document; page mode opens the
+  // linearized whole file with Range requests only, so pdf.js fetches the text and fonts
+  // it needs rather than the page images already downloaded for display
   useEffect(() => {
-    const doc = pdfDocRef.current
-    if (!doc) return
+    if (numPages === 0 || (!pagePaths && !pdfDocRef.current)) return
     let cancelled = false
 
     async function extractMapping() {
-      const map = new Map<number, number>()
-      const reverseMap = new Map<number, number[]>()
-      for (let p = 1; p <= doc.numPages; p++) {
-        const page = await doc.getPage(p)
-        const content = await page.getTextContent()
-        const text = content.items.map((item: { str?: string }) => item.str ?? '').join(' ')
-        const regex = /(?:^|\s)(\d{1,2})[.)]\s/g
-        let match
-        while ((match = regex.exec(text)) !== null) {
-          const qNum = parseInt(match[1], 10)
-          if (qNum >= 1 && qNum <= 99 && !map.has(qNum)) {
-            map.set(qNum, p)
-            const list = reverseMap.get(p) || []
-            list.push(qNum)
-            reverseMap.set(p, list)
-          }
-        }
+      let doc = pdfDocRef.current
+      // eslint-disable-next-line @typescript-eslint/no-explicit-any
+      let textDoc: any = null
+      if (pagePaths) {
+        const source = await pdfSourceFor(url)
+        textDoc = await pdfjs.getDocument({ ...source, disableAutoFetch: true, disableStream: true }).promise
+        doc = textDoc
       }
-      if (!cancelled) {
-        questionPageMap.current = map
-        pageToQuestions.current = reverseMap
-        // Report initial page info
-        onPageInfo?.({
-          page: pageNumber,
-          totalPages: doc.numPages,
-          questions: reverseMap.get(pageNumber)?.sort((a, b) => a - b) || [],
-        })
+      try {
+        for (let p = 1; p <= numPages; p++) {
+          if (cancelled) return
+          const page = await doc.getPage(p)
+          addPageText(p, await page.getTextContent())
+        }
+        if (!cancelled) reportPageInfo()
+      } finally {
+        textDoc?.destroy()
       }
     }
 
-    extractMapping()
+    extractMapping().catch(() => {})
     return () => { cancelled = true }
-  }, [numPages]) // eslint-disable-line react-hooks/exhaustive-deps
+  }, [numPages, pagePaths]) // eslint-disable-line react-hooks/exhaustive-deps
 
   // Report page info when page changes
   useEffect(() => {
@@ -289,7 +364,7 @@ export default function PdfViewer({ url, currentQuestion, onPageInfo }: PdfViewe
     lastTapRef.current = now
   }
 
-  if (!pdfBlob) {
+  if (!docSource) {
     if (pdfError) {
       return (
         <div className="flex items-center justify-center h-full bg-slate-100">
@@ -393,12 +468,18 @@ export default function PdfViewer({ url, currentQuestion, onPageInfo }: PdfViewe
           } : undefined}
         >
           <Document
-            file={pdfBlob}
-            onLoadSuccess={(pdf) => { pdfDocRef.current = pdf; setNumPages(pdf.numPages) }}
+            file={docSource}
+            onLoadSuccess={(pdf) => {
+              // In page mode each document is a single page; the count comes from the manifest
+              if (pagePaths) return
+              pdfDocRef.current = pdf
+              setNumPages(pdf.numPages)
+            }}
+            onLoadError={handleDocLoadError}
             loading={<LoadingSpinner label="Yuklanmoqda..." />}
           >
             <Page
-              pageNumber={pageNumber}
+              pageNumber={pagePaths ? 1 : pageNumber}
               width={pageWidth}
               className={isMobile ? '' : 'shadow-sm rounded-sm'}
             />
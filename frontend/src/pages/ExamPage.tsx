@@ -501,7 +501,7 @@ export default function ExamPage() {
 
         {/* PDF viewer */}
         <div className="flex-1 min-h-0 overflow-hidden">
-          <PdfViewer url={`/exams/${examId}/pdf/?v=2`} currentQuestion={currentQuestion} />
+          <PdfViewer url={`/exams/${examId}/pdf/?v=2`} manifestUrl={`/exams/${examId}/pdf/manifest/`} currentQuestion={currentQuestion} />
         </div>
 
         {/* Answer bar */}
@@ -558,7 +558,7 @@ export default function ExamPage() {
 
       <div className="flex-1 flex overflow-hidden">
         <div className="w-[65%] h-full">
-          <PdfViewer url={`/exams/${examId}/pdf/?v=2`} currentQuestion={activeQuestion} onPageInfo={setPageInfo} />
+          <PdfViewer url={`/exams/${examId}/pdf/?v=2`} manifestUrl={`/exams/${examId}/pdf/manifest/`} currentQuestion={activeQuestion} onPageInfo={setPageInfo} />
         </div>
         <div className="w-[35%] border-l border-slate-200/80 bg-white flex flex-col">
           <AnswerSidebar
@@ -3,7 +3,7 @@ import { useNavigate } from 'react-router-dom'
 import api from '../api/client'
 import { useToast } from '../context/ToastContext'
 import { useTelegram } from '../hooks/useTelegram'
-import type { ExamHistoryEntry } from '../api/types'
+import type { ExamHistoryEntry, ExamHistoryPage } from '../api/types'
 import LoadingSpinner from '../components/LoadingSpinner'
 import BackButton from '../components/BackButton'
 import DotPattern from '../components/DotPattern'
@@ -51,6 +51,8 @@ export default function HistoryPage() {
   const [entries, setEntries] = useState<ExamHistoryEntry[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(false)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     if (isTelegram) {
@@ -60,8 +62,11 @@ export default function HistoryPage() {
   }, [isTelegram, showBackButton, hideBackButton, navigate])
 
   useEffect(() => {
-    api.get<ExamHistoryEntry[]>('/me/history/')
-      .then(({ data }) => setEntries(data))
+    api.get<ExamHistoryPage>('/me/history/', { params: { paginate: 1 } })
+      .then(({ data }) => {
+        setEntries(data.results)
+        setNextCursor(data.next_cursor)
+      })
       .catch(() => {
         setError(true)
         toast('Tarix yuklanmadi', 'error')
@@ -69,6 +74,18 @@ export default function HistoryPage() {
       .finally(() => setLoading(false))
   }, [toast])
 
+  const loadMore = () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    api.get<ExamHistoryPage>('/me/history/', { params: { paginate: 1, cursor: nextCursor } })
+      .then(({ data }) => {
+        setEntries(prev => [...prev, ...data.results])
+        setNextCursor(data.next_cursor)
+      })
+      .catch(() => toast('Tarix yuklanmadi', 'error'))
+      .finally(() => setLoadingMore(false))
+  }
+
   if (loading) {
     return <LoadingSpinner fullScreen label="Tarix yuklanmoqda..." />
   }
@@ -183,6 +200,15 @@ export default function HistoryPage() {
                 </div>
               )
             })}
+            {nextCursor && (
+              <button
+                onClick={loadMore}
+                disabled={loadingMore}
+                className="w-full py-3 text-sm font-semibold text-primary-600 border-t border-slate-100 hover:bg-slate-50 transition-colors disabled:opacity-50"
+              >
+                {loadingMore ? 'Yuklanmoqda...' : "Ko'proq ko'rsatish"}
+              </button>
+            )}
           </div>
         )}
       </div>